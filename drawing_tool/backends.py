@@ -0,0 +1,25 @@
+from canvas import Canvas
+
+BACKENDS = ('bytearray', 'numpy', 'tiled', 'mmap', 'rle')
+
+
+def get_canvas_class(backend: str) -> type:
+    """Returns canvas class of the backend, optional backends are imported only when asked for."""
+    if backend == 'bytearray':
+        return Canvas
+    if backend == 'numpy':
+        try:
+            from numpy_canvas import NumpyCanvas
+        except ImportError as error:
+            raise ImportError(f'The numpy backend requires numpy to be installed ({error}).') from error
+        return NumpyCanvas
+    if backend == 'tiled':
+        from tiled_canvas import TiledCanvas
+        return TiledCanvas
+    if backend == 'mmap':
+        from mmap_canvas import MmapCanvas
+        return MmapCanvas
+    if backend == 'rle':
+        from rle_canvas import RleCanvas
+        return RleCanvas
+    raise ValueError(f'Unknown backend "{backend}", choose one of {", ".join(BACKENDS)}.')
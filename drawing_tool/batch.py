@@ -0,0 +1,74 @@
+from validation import Line, Rectangle
+
+
+class StrokeBatch:
+    """Collects line and rectangle commands and paints them onto the canvas in one pass.
+
+    Every stroke paints "x", so strokes between two fills can be applied in any order.
+    Only lines which passed validation are expected, so a line is either horizontal or vertical.
+    Segments are kept per row and per column, overlapping and touching segments of the
+    same row or column are merged into one span when the batch is flushed.
+    """
+
+    def __init__(self, limit: int = 100000) -> None:
+        self.limit = limit
+        self.rows = {}
+        self.columns = {}
+        self.segments = 0
+
+    def __len__(self) -> int:
+        return self.segments
+
+    def add(self, command) -> None:
+        """Adds a Line or Rectangle command."""
+        cell_1, row_1, cell_2, row_2 = command
+        if cell_1 > cell_2:
+            cell_1, cell_2 = cell_2, cell_1
+        if row_1 > row_2:
+            row_1, row_2 = row_2, row_1
+        rows, columns = self.rows, self.columns
+        if type(command) is Line:
+            if row_1 == row_2:
+                rows.setdefault(row_1, []).append((cell_1, cell_2))
+            else:
+                columns.setdefault(cell_1, []).append((row_1, row_2))
+            self.segments += 1
+        elif type(command) is Rectangle:
+            rows.setdefault(row_1, []).append((cell_1, cell_2))
+            rows.setdefault(row_2, []).append((cell_1, cell_2))
+            self.segments += 2
+            if row_2 - row_1 > 1:
+                columns.setdefault(cell_1, []).append((row_1 + 1, row_2 - 1))
+                columns.setdefault(cell_2, []).append((row_1 + 1, row_2 - 1))
+                self.segments += 2
+
+    def is_full(self) -> bool:
+        return self.segments >= self.limit
+
+    def flush(self, canvas) -> int:
+        """Paints collected strokes, returns number of merged spans written."""
+        written = 0
+        for row_id, segments in self.rows.items():
+            for cell_1, cell_2 in merge_segments(segments):
+                canvas.hline(cell_1, cell_2, row_id)
+                written += 1
+        for cell_id, segments in self.columns.items():
+            for row_1, row_2 in merge_segments(segments):
+                canvas.vline(cell_id, row_1, row_2)
+                written += 1
+        self.rows, self.columns, self.segments = {}, {}, 0
+        return written
+
+
+def merge_segments(segments: list) -> list:
+    """Returns sorted inclusive segments with overlapping and touching ones joined."""
+    segments.sort()
+    merged = [list(segments[0])]
+    for start, end in segments[1:]:
+        last = merged[-1]
+        if start <= last[1] + 1:
+            if end > last[1]:
+                last[1] = end
+        else:
+            merged.append([start, end])
+    return merged
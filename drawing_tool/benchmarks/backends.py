@@ -0,0 +1,63 @@
+"""Compares canvas backends on the same operations over a large canvas.
+
+Run from the drawing_tool directory: python -m benchmarks.backends --width 2000 --height 2000
+"""
+import argparse
+from random import Random
+from time import perf_counter
+
+from backends import BACKENDS, get_canvas_class
+from benchmarks.fill import maze_canvas
+
+
+def lines(canvas, random: Random, count: int = 2000) -> None:
+    for _ in range(count):
+        if random.random() < 0.5:
+            row_id = random.randint(1, canvas.height)
+            cell_1, cell_2 = sorted((random.randint(1, canvas.width), random.randint(1, canvas.width)))
+            canvas.hline(cell_1, cell_2, row_id)
+        else:
+            cell_id = random.randint(1, canvas.width)
+            row_1, row_2 = sorted((random.randint(1, canvas.height), random.randint(1, canvas.height)))
+            canvas.vline(cell_id, row_1, row_2)
+
+
+def open_fill(canvas, random: Random) -> None:
+    canvas.flood_fill(1, 1, 'o')
+
+
+def render(canvas, random: Random) -> None:
+    canvas.render()
+
+
+def run(width: int, height: int) -> list:
+    """Returns (operation, backend, seconds) rows, unavailable backends are skipped."""
+    results = []
+    for backend in BACKENDS:
+        try:
+            canvas_class = get_canvas_class(backend)
+        except ImportError:
+            continue
+        for name, operation in (('lines', lines), ('open fill', open_fill), ('render', render)):
+            canvas = canvas_class(width, height)
+            start = perf_counter()
+            operation(canvas, Random(0))
+            results.append((name, backend, perf_counter() - start))
+        canvas = maze_canvas(width, height, canvas_class)
+        start = perf_counter()
+        canvas.flood_fill(1, 1, 'o')
+        results.append(('maze fill', backend, perf_counter() - start))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--width', type=int, default=2000)
+    parser.add_argument('--height', type=int, default=2000)
+    arguments = parser.parse_args()
+    for operation, backend, seconds in sorted(run(arguments.width, arguments.height)):
+        print(f'{operation:<10} {backend:<10} {seconds * 1000:10.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Compares the scanline flood fill with the previous pixel by pixel fill.
+
+Run from the drawing_tool directory: python -m benchmarks.fill --width 400 --height 400
+"""
+import argparse
+from time import perf_counter
+
+from canvas import Canvas
+
+
+def legacy_flood_fill(canvas: list, cell_id: int, row_id: int, color: str) -> None:
+    """Previous fill over a list of lists, every cell pushes its 8 neighbours into a set."""
+    width, height = len(canvas[0]), len(canvas)
+    to_replace = canvas[row_id][cell_id]
+    stack = set()
+    stack.add((cell_id, row_id))
+    while stack:
+        cell_id, row_id = stack.pop()
+        if not (0 < cell_id < width and 0 < row_id < height):
+            continue
+        cell = canvas[row_id][cell_id]
+        if cell != to_replace:
+            continue
+        canvas[row_id][cell_id] = color
+        stack.add((cell_id - 1, row_id))
+        stack.add((cell_id + 1, row_id))
+        stack.add((cell_id, row_id - 1))
+        stack.add((cell_id, row_id + 1))
+        stack.add((cell_id - 1, row_id - 1))
+        stack.add((cell_id + 1, row_id - 1))
+        stack.add((cell_id - 1, row_id + 1))
+        stack.add((cell_id + 1, row_id + 1))
+
+
+def open_canvas(width: int, height: int) -> Canvas:
+    """Empty canvas, the fill covers every cell."""
+    return Canvas(width, height)
+
+
+def maze_canvas(width: int, height: int, canvas_class: type = Canvas) -> Canvas:
+    """Vertical walls on every other column with a gap alternating between bottom and top."""
+    canvas = canvas_class(width, height)
+    for number, cell_id in enumerate(range(2, width + 1, 2)):
+        if height > 1:
+            if number % 2:
+                canvas.vline(cell_id, 2, height)
+            else:
+                canvas.vline(cell_id, 1, height - 1)
+    return canvas
+
+
+def to_legacy(canvas: Canvas) -> list:
+    """Converts the canvas to the previous list of lists layout with the border."""
+    border = '-' * (canvas.width + 2)
+    body = [['|'] + list(canvas.row(row_id).decode()) + ['|'] for row_id in range(1, canvas.height + 1)]
+    return [border] + body + [border]
+
+
+def measure(function, *args) -> float:
+    start = perf_counter()
+    function(*args)
+    return perf_counter() - start
+
+
+def run(width: int, height: int) -> list:
+    """Returns (scenario, engine, seconds) rows."""
+    results = []
+    for name, build in (('open', open_canvas), ('maze', maze_canvas)):
+        legacy = to_legacy(build(width, height))
+        results.append((name, 'legacy 8', measure(legacy_flood_fill, legacy, 1, 1, 'o')))
+        for connectivity in (8, 4):
+            canvas = build(width, height)
+            results.append((name, f'scanline {connectivity}',
+                            measure(canvas.flood_fill, 1, 1, 'o', connectivity)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--width', type=int, default=400)
+    parser.add_argument('--height', type=int, default=400)
+    arguments = parser.parse_args()
+    for scenario, engine, seconds in run(arguments.width, arguments.height):
+        print(f'{scenario:<6} {engine:<12} {seconds * 1000:10.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,481 @@
+"""Differential fuzzing of canvas backends and engines against a naive reference model.
+
+Run from the drawing_tool directory: python -m benchmarks.fuzz --seed 1 --scripts 3 --size 100
+Every script is generated from its own recorded seed, U and Z instructions are mixed into it,
+and it is executed by the reference Oracle, which shares no code with the canvases, and by
+every engine, the bytearray canvas included. Engines without undo and final mode runs get the
+script without U and Z. Changed boxes are compared after every command, whole frames every
+--frame-every commands, after every undo or redo and after the last command. Final mode runs
+of main compare only the final frame. A diverging script is reported with its seed and can be
+saved for replay.
+"""
+import argparse
+import os
+import sys
+import tempfile
+from collections import deque
+from functools import partial
+from random import Random
+from time import perf_counter
+from typing import Optional
+
+from backends import BACKENDS, get_canvas_class
+from benchmarks.scripts import random_instructions
+from functions import initialize_canvas
+from journal import UNDO_STEPS
+from validation import (CommandError, Diagonal, Fill, FilledRectangle, Line, Rectangle, Redo, Undo,
+                        parse_instruction)
+
+COLORS = 'oabx -'
+# Share of U and Z instructions mixed into the generated scripts.
+UNDO_SHARE = 0.05
+# Engines which execute U and Z, the others get scripts without them.
+UNDO_ENGINES = ('journal',)
+
+
+def random_script(width: int, height: int, count: int, random: Random) -> list:
+    return list(random_instructions(width, height, count, random.randrange(2 ** 32), fill_share=0.2))
+
+
+def maze_script(width: int, height: int, count: int, random: Random) -> list:
+    """Walls every other row and column with random gaps, fills wander through the corridors."""
+    lines = []
+    for cell_id in range(2, width + 1, 2):
+        gap = random.randint(1, height)
+        if gap > 1:
+            lines.append(f'L {cell_id} 1 {cell_id} {gap - 1}\n')
+        if gap < height:
+            lines.append(f'L {cell_id} {gap + 1} {cell_id} {height}\n')
+    for row_id in range(2, height + 1, 4):
+        cell_1, cell_2 = sorted((random.randint(1, width), random.randint(1, width)))
+        lines.append(f'L {cell_1} {row_id} {cell_2} {row_id}\n')
+    while len(lines) < count:
+        lines.append(f'B {random.randint(1, width)} {random.randint(1, height)} {random.choice(COLORS)}\n')
+    return lines[:count]
+
+
+def spiral_script(width: int, height: int, count: int, random: Random) -> list:
+    """Rectangular spiral with a one cell corridor, every fill has to follow all of it."""
+    lines = []
+    left, top, right, bottom = 1, 2, width - 1, height - 1
+    while right - left >= 2 and bottom - top >= 2:
+        lines += [f'L {left} {top} {right} {top}\n', f'L {right} {top} {right} {bottom}\n',
+                  f'L {left + 2} {bottom} {right} {bottom}\n', f'L {left + 2} {top + 2} {left + 2} {bottom}\n']
+        left, top, right, bottom = left + 2, top + 2, right - 2, bottom - 2
+    while len(lines) < count:
+        lines.append(f'B {random.choice((1, width))} {random.randint(1, height)} {random.choice(COLORS)}\n')
+    return lines[:count]
+
+
+def nested_script(width: int, height: int, count: int, random: Random) -> list:
+    """Nested and filled rectangles around a random center, fills land between the walls."""
+    lines = []
+    while len(lines) < count:
+        cell_id, row_id = random.randint(1, width), random.randint(1, height)
+        step = random.randint(1, 3)
+        for distance in range(0, max(width, height), step):
+            if len(lines) >= count:
+                break
+            left, right = max(cell_id - distance, 1), min(cell_id + distance, width)
+            top, bottom = max(row_id - distance, 1), min(row_id + distance, height)
+            kind = random.random()
+            if kind < 0.6:
+                lines.append(f'R {left} {top} {right} {bottom}\n')
+            elif kind < 0.65:
+                lines.append(f'F {left} {top} {right} {bottom}\n')
+            else:
+                lines.append(f'B {random.randint(left, right)} {random.randint(top, bottom)} {random.choice(COLORS)}\n')
+    return lines
+
+
+def border_script(width: int, height: int, count: int, random: Random) -> list:
+    """Lines along and across the canvas edges with fills seeded on the edge cells."""
+    lines = []
+    while len(lines) < count:
+        kind = random.random()
+        edge_cell, edge_row = random.choice((1, width)), random.choice((1, height))
+        if kind < 0.25:
+            cell_1, cell_2 = sorted((random.randint(1, width), random.randint(1, width)))
+            lines.append(f'L {cell_1} {edge_row} {cell_2} {edge_row}\n')
+        elif kind < 0.5:
+            row_1, row_2 = sorted((random.randint(1, height), random.randint(1, height)))
+            lines.append(f'L {edge_cell} {row_1} {edge_cell} {row_2}\n')
+        elif kind < 0.6:
+            lines.append(f'D {edge_cell} {random.randint(1, height)} {random.randint(1, width)} {edge_row}\n')
+        else:
+            cell_id, row_id = random.choice(((edge_cell, random.randint(1, height)),
+                                              (random.randint(1, width), edge_row)))
+            lines.append(f'B {cell_id} {row_id} {random.choice(COLORS)}\n')
+    return lines
+
+
+def diagonal_script(width: int, height: int, count: int, random: Random) -> list:
+    """Diagonal lines leave gaps which only 8-connected fills pass through."""
+    lines = []
+    while len(lines) < count:
+        cell_1, cell_2 = random.randint(1, width), random.randint(1, width)
+        row_1, row_2 = random.randint(1, height), random.randint(1, height)
+        kind = random.random()
+        if kind < 0.5:
+            lines.append(f'D {cell_1} {row_1} {cell_2} {row_2}\n')
+        elif kind < 0.55:
+            lines.append(f'F {cell_1} {row_1} {cell_2} {row_2}\n')
+        else:
+            lines.append(f'B {cell_1} {row_1} {random.choice(COLORS)}\n')
+    return lines
+
+
+def with_undo(lines: list, random: Random, share: float = UNDO_SHARE) -> list:
+    """Mixes U and Z instructions into the script, some of them asking for more steps than are kept."""
+    mixed = []
+    for line in lines:
+        mixed.append(line)
+        if random.random() < share:
+            steps = random.choice(('', '1', '2', '3', '7', '150'))
+            mixed.append(f'{random.choice("UZ")} {steps}'.rstrip() + '\n')
+    return mixed
+
+
+GENERATORS = {
+    'random': random_script,
+    'maze': maze_script,
+    'spiral': spiral_script,
+    'nested': nested_script,
+    'border': border_script,
+    'diagonal': diagonal_script,
+}
+
+
+class Oracle:
+    """Naive model of the drawing commands, the reference the engines are compared with.
+
+    Cells are kept in a bytearray with a ring of zero bytes around them and set one by one,
+    the fill visits cell after cell from a stack, and an undo restores a copy of all the cells
+    taken before the command, the latest `limit` commands can be undone like by the journal.
+    Nothing is shared with the canvases, so the bytearray canvas is checked like every other engine.
+    """
+
+    def __init__(self, width: int, height: int, limit: int = UNDO_STEPS) -> None:
+        self.width = width
+        self.height = height
+        self.stride = width + 2
+        self.cells = bytearray(self.stride) + (b'\0' + b' ' * width + b'\0') * height + bytearray(self.stride)
+        self.done = deque(maxlen=limit)
+        self.undone = []
+
+    def rows(self, box: tuple) -> list:
+        return box_rows(self.cells, self.stride, box)
+
+    def frame(self) -> list:
+        """Returns lines of the rendered frame with its border."""
+        border = b'-' * (self.width + 2)
+        return [border, *(b'|' + row + b'|' for row in self.rows((1, 1, self.width, self.height))), border]
+
+    def paint(self, cells: list) -> Optional[tuple]:
+        """Strokes the (cell, row) cells, returns their box."""
+        for cell_id, row_id in cells:
+            self.cells[row_id * self.stride + cell_id] = ord('x')
+        return (min(cell for cell, _ in cells), min(row for _, row in cells),
+                max(cell for cell, _ in cells), max(row for _, row in cells))
+
+    def apply(self, command) -> Optional[tuple]:
+        """Executes the command, returns the box of its cells.
+
+        The box is None for an undo, a redo and a fill which changed nothing.
+        """
+        if type(command) is Undo:
+            for _ in range(command.steps):
+                if self.done:
+                    before = self.done.pop()
+                    self.undone.append((before, bytes(self.cells)))
+                    self.cells[:] = before
+            return None
+        if type(command) is Redo:
+            for _ in range(command.steps):
+                if self.undone:
+                    before, after = self.undone.pop()
+                    self.done.append(before)
+                    self.cells[:] = after
+            return None
+        self.done.append(bytes(self.cells))
+        self.undone.clear()
+        if type(command) is Fill:
+            return self.fill(*command)
+        cell_1, row_1, cell_2, row_2 = command
+        left, top, right, bottom = min(cell_1, cell_2), min(row_1, row_2), max(cell_1, cell_2), max(row_1, row_2)
+        if type(command) in (Line, FilledRectangle):
+            return self.paint([(cell_id, row_id) for cell_id in range(left, right + 1)
+                               for row_id in range(top, bottom + 1)])
+        if type(command) is Rectangle:
+            return self.paint([(cell_id, row_id) for cell_id in range(left, right + 1)
+                               for row_id in range(top, bottom + 1)
+                               if cell_id in (left, right) or row_id in (top, bottom)])
+        if type(command) is Diagonal:
+            return self.paint(diagonal_cells(cell_1, row_1, cell_2, row_2))
+        raise TypeError(f'Unknown command {command!r}.')
+
+    def fill(self, cell_id: int, row_id: int, color: str) -> Optional[tuple]:
+        """Recolors cells connected by a side or a corner which have the color of the seed.
+
+        A cell is recolored when it is found, so every cell goes on the stack once. The zero
+        ring never has the color of the seed, so the neighbours need no bounds checks.
+        """
+        cells, stride = self.cells, self.stride
+        seed = row_id * stride + cell_id
+        target, value = cells[seed], ord(color)
+        if target == value:
+            return None
+        neighbours = [row * stride + cell for row in (-1, 0, 1) for cell in (-1, 0, 1) if row or cell]
+        cells[seed] = value
+        filled, stack = [seed], [seed]
+        while stack:
+            index = stack.pop()
+            for step in neighbours:
+                if cells[index + step] == target:
+                    cells[index + step] = value
+                    filled.append(index + step)
+                    stack.append(index + step)
+        return (min(index % stride for index in filled), min(filled) // stride,
+                max(index % stride for index in filled), max(filled) // stride)
+
+
+def box_rows(cells: bytes, stride: int, box: tuple) -> list:
+    """Returns rows of the box of Oracle cells."""
+    left, top, right, bottom = box
+    return [bytes(cells[row_id * stride + left:row_id * stride + right + 1]) for row_id in range(top, bottom + 1)]
+
+
+def diagonal_cells(cell_1: int, row_1: int, cell_2: int, row_2: int) -> list:
+    """Returns cells of the line, a cell per step along the longer axis, the other one rounded half up."""
+    steep = abs(row_2 - row_1) > abs(cell_2 - cell_1)
+    if steep:
+        cell_1, row_1, cell_2, row_2 = row_1, cell_1, row_2, cell_2
+    if cell_1 > cell_2:
+        cell_1, row_1, cell_2, row_2 = cell_2, row_2, cell_1, row_1
+    length, rise = cell_2 - cell_1, row_2 - row_1
+    cells = []
+    for step in range(length + 1):
+        offset = (2 * step * abs(rise) + length) // (2 * length) if length else 0
+        cell = (cell_1 + step, row_1 + (offset if rise >= 0 else -offset))
+        cells.append(cell[::-1] if steep else cell)
+    return cells
+
+
+def trace(width: int, height: int, commands: list) -> list:
+    """Returns (box, cells) the reference has after every command."""
+    oracle = Oracle(width, height)
+    return [(oracle.apply(command), bytes(oracle.cells)) for _, command in commands]
+
+
+def canvas_engine(backend: str, **options):
+    """Returns an engine drawing on a canvas of the backend with main.execute."""
+    canvas_class = get_canvas_class(backend)
+    if options:
+        canvas_class = partial(canvas_class, **options)
+
+    def start(cleaned_data: tuple):
+        from main import execute
+        return canvas_class(*cleaned_data), execute
+    return start
+
+
+def wrapped_engine(make_wrapper):
+    """Returns an engine drawing on the reference canvas with main.execute wrapped by make_wrapper().
+
+    make_wrapper is called for every script, so the wrapper starts without state of other scripts.
+    """
+    def start(cleaned_data: tuple):
+        from main import execute
+        return initialize_canvas(cleaned_data), make_wrapper().wrap_execute(execute)
+    return start
+
+
+def engines(backends: tuple = BACKENDS, pool=None) -> dict:
+    """Returns name -> engine of the available backends and engines.
+
+    With a ParallelFill pool its fills are compared too, the pool is shared by all scripts.
+    """
+    from journal import Journal
+    from region_index import RegionIndex
+
+    found = {}
+    for backend in backends:
+        try:
+            get_canvas_class(backend)
+        except ImportError:
+            continue
+        found[backend] = canvas_engine(backend)
+    if 'tiled' in found:
+        found['tiled-8'] = canvas_engine('tiled', tile_size=8)
+    found['region-index'] = wrapped_engine(RegionIndex)
+    found['journal'] = wrapped_engine(Journal)
+    if pool is not None:
+        found['parallel'] = wrapped_engine(lambda: pool)
+    return found
+
+
+def first_difference(expected: list, found: list) -> str:
+    for row_id, (expected_row, found_row) in enumerate(zip(expected, found), 1):
+        if expected_row != found_row:
+            return f'row {row_id}: expected {bytes(expected_row)!r}, got {bytes(found_row)!r}'
+    return f'{len(expected)} rows expected, got {len(found)}'
+
+
+def compare_steps(cleaned_data: tuple, commands: list, engine, frame_every: int, expected: list) -> tuple:
+    """Runs commands on the engine and compares it with the trace of the reference.
+
+    Returns (None or divergence, engine seconds). The changed box of an undo or a redo is
+    not compared, the whole frame is.
+    """
+    width, height = cleaned_data
+    canvas, apply = engine(cleaned_data)
+    whole, stride = (1, 1, width, height), width + 2
+    seconds = 0.0
+    for step, ((line, command), (box, cells)) in enumerate(zip(commands, expected), 1):
+        start = perf_counter()
+        try:
+            apply(canvas, command)
+        except Exception as error:
+            return f'step {step} "{line.strip()}": raised {error!r}', seconds
+        seconds += perf_counter() - start
+        found_box = canvas.take_dirty()
+        undoing = type(command) in (Undo, Redo)
+        if not undoing and found_box != box:
+            return f'step {step} "{line.strip()}": changed box {found_box} instead of {box}', seconds
+        if not undoing and box is not None and box_rows(cells, stride, box) != canvas.region(box):
+            return f'step {step} "{line.strip()}": changed box {box} ' + \
+                first_difference(box_rows(cells, stride, box), canvas.region(box)), seconds
+        if undoing or step % frame_every == 0 or step == len(commands):
+            if box_rows(cells, stride, whole) != canvas.region(whole):
+                return f'step {step} "{line.strip()}": frame ' + \
+                    first_difference(box_rows(cells, stride, whole), canvas.region(whole)), seconds
+    return None, seconds
+
+
+def compare_final(script_path: str, output_path: str, options: dict, expected: list) -> tuple:
+    """Runs main in final mode with the options, returns (None or divergence, seconds)."""
+    from main import main
+
+    open(output_path, 'w').close()
+    start = perf_counter()
+    main(script_path, output_path, 'final', **options)
+    seconds = perf_counter() - start
+    with open(output_path, 'rb') as file:
+        found = file.read().splitlines()
+    if found != expected:
+        return 'final frame ' + first_difference(expected, found), seconds
+    return None, seconds
+
+
+# Final mode runs of main, their only frame is compared with the last frame of the reference.
+# They run without --undo-steps, so they get the script without U and Z.
+FINAL_ENGINES = {
+    'final-batch': {},
+    'final-optimize': {'optimize': True},
+}
+
+
+def fuzz_script(lines: list, width: int, height: int, engines_to_run: dict, finals: dict, frame_every: int,
+                directory: str, timings: dict) -> list:
+    """Compares the engines on one script, returns (engine, message) of the engines which diverged.
+
+    Seconds every engine and the reference spent drawing are added to timings.
+    """
+    commands = []
+    for line in lines:
+        try:
+            commands.append((line, parse_instruction(line.split(), (width, height))))
+        except CommandError:
+            pass
+    plain = [(line, command) for line, command in commands if type(command) not in (Undo, Redo)]
+    start = perf_counter()
+    traces = {False: trace(width, height, plain)}
+    if any(name in UNDO_ENGINES for name in engines_to_run):
+        traces[True] = trace(width, height, commands)
+    timings['reference'] = timings.get('reference', 0.0) + perf_counter() - start
+    found = []
+    for name, engine in engines_to_run.items():
+        undo = name in UNDO_ENGINES
+        message, seconds = compare_steps((width, height), commands if undo else plain, engine, frame_every,
+                                         traces[undo])
+        timings[name] += seconds
+        if message:
+            found.append((name, message))
+    if finals:
+        reference = Oracle(width, height)
+        if plain:
+            reference.cells[:] = traces[False][-1][1]
+        expected = reference.frame()
+        script_path = os.path.join(directory, 'input.txt')
+        with open(script_path, 'w') as file:
+            file.write(f'C {width} {height}\n')
+            file.writelines(line for line, _ in plain)
+        for name, options in finals.items():
+            message, seconds = compare_final(script_path, os.path.join(directory, 'output.txt'), options, expected)
+            timings[name] += seconds
+            if message:
+                found.append((name, message))
+    return found
+
+
+def fuzz(seed: int, scripts: int, width: int, height: int, count: int, generators: list, engine_names: list = None,
+         frame_every: int = 100, parallel: bool = False, save_directory: str = None) -> tuple:
+    """Runs every generator scripts times against every engine, returns (divergences, seconds per engine).
+
+    A divergence is (generator, script seed, engine, message), the script is written into
+    save_directory as <generator>-<seed>.txt if one is given.
+    """
+    pool = None
+    if parallel:
+        from parallel_fill import ParallelFill
+        pool = ParallelFill(2, min_cells=0)
+    chosen = {name: engine for name, engine in engines(pool=pool).items() if not engine_names or name in engine_names}
+    finals = {name: options for name, options in FINAL_ENGINES.items() if not engine_names or name in engine_names}
+    divergences, timings = [], dict.fromkeys([*chosen, *finals], 0.0)
+    master = Random(seed)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for generator in generators:
+                for _ in range(scripts):
+                    script_seed = master.randrange(2 ** 32)
+                    random = Random(script_seed)
+                    lines = with_undo(GENERATORS[generator](width, height, count, random), random)
+                    found = fuzz_script(lines, width, height, chosen, finals, frame_every, directory, timings)
+                    divergences += [(generator, script_seed, name, message) for name, message in found]
+                    if found and save_directory:
+                        os.makedirs(save_directory, exist_ok=True)
+                        with open(os.path.join(save_directory, f'{generator}-{script_seed}.txt'), 'w') as file:
+                            file.write(f'C {width} {height}\n')
+                            file.writelines(lines)
+    finally:
+        if pool is not None:
+            pool.close()
+    return divergences, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=0, help='seed the script seeds are drawn from (default: %(default)s)')
+    parser.add_argument('--scripts', type=int, default=2, help='scripts per generator (default: %(default)s)')
+    parser.add_argument('--size', type=int, default=100, help='canvas width and height (default: %(default)s)')
+    parser.add_argument('--commands', type=int, default=1000, help='commands per script (default: %(default)s)')
+    parser.add_argument('--generators', nargs='*', choices=sorted(GENERATORS), default=sorted(GENERATORS))
+    parser.add_argument('--engines', nargs='*', metavar='ENGINE', help='compare only these engines')
+    parser.add_argument('--frame-every', type=int, default=100,
+                        help='commands between two whole frame comparisons (default: %(default)s)')
+    parser.add_argument('--parallel', action='store_true', help='also fuzz fills split between two processes')
+    parser.add_argument('--save', metavar='DIRECTORY', help='write diverging scripts into DIRECTORY')
+    arguments = parser.parse_args()
+
+    divergences, timings = fuzz(arguments.seed, arguments.scripts, arguments.size, arguments.size,
+                                arguments.commands, arguments.generators, arguments.engines,
+                                arguments.frame_every, arguments.parallel, arguments.save)
+    for name, seconds in sorted(timings.items(), key=lambda item: item[1]):
+        print(f'{name:<16} {seconds * 1000:10.2f} ms')
+    for generator, script_seed, name, message in divergences:
+        print(f'DIVERGED {name} on {generator} script seed {script_seed}: {message}')
+    return 1 if divergences else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,27 @@
+"""Synthetic instruction scripts for benchmarks and batch runs."""
+from random import Random
+
+
+def random_instructions(width: int, height: int, count: int, seed: int = 0, fill_share: float = 0.05):
+    """Yields count random valid L, R and B instruction lines (without the canvas line)."""
+    random = Random(seed)
+    for _ in range(count):
+        cell_1, cell_2 = random.randint(1, width), random.randint(1, width)
+        row_1, row_2 = random.randint(1, height), random.randint(1, height)
+        kind = random.random()
+        if kind < fill_share:
+            yield f'B {cell_1} {row_1} {random.choice("abcdefo")}\n'
+        elif kind < 0.5:
+            if random.random() < 0.5:
+                yield f'L {cell_1} {row_1} {cell_2} {row_1}\n'
+            else:
+                yield f'L {cell_1} {row_1} {cell_1} {row_2}\n'
+        else:
+            yield f'R {cell_1} {row_1} {cell_2} {row_2}\n'
+
+
+def write_script(path: str, width: int, height: int, count: int, seed: int = 0) -> None:
+    """Writes a canvas line followed by count random instructions."""
+    with open(path, 'w') as file:
+        file.write(f'C {width} {height}\n')
+        file.writelines(random_instructions(width, height, count, seed))
@@ -0,0 +1,222 @@
+"""Benchmark suite of canvas operations and whole runs of main with time and peak memory.
+
+Run from the drawing_tool directory: python -m benchmarks --size 500 --commands 5000
+Results are compared with benchmarks/baseline.json when it was recorded with the same
+sizes, --save-baseline replaces it with the current results.
+"""
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from random import Random
+from time import perf_counter
+
+from backends import get_canvas_class
+from benchmarks.fill import maze_canvas
+from benchmarks.scripts import write_script
+from functions import add_line, add_rectangle, initialize_canvas, to_flood_fill
+from writer import FrameWriter
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+DRAWING_TOOL = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Tiny scripts run by a new process each or by one warm process, so startup dominates.
+WARM_JOBS = 10
+# Cases timing new processes, memory traced in this process says nothing about them.
+PROCESS_CASES = ('startup_python', 'startup_import_main', 'startup_cli', 'warm_jobs_x10')
+
+
+def spiral_canvas(size: int, backend: str):
+    """Rectangular spiral wall, the blank corridor between its turns is one cell wide."""
+    canvas = initialize_canvas((size, size), backend)
+    left, top, right, bottom = 1, 2, size - 1, size - 1
+    while right - left >= 2 and bottom - top >= 2:
+        add_line(canvas, (left, top, right, top))
+        add_line(canvas, (right, top, right, bottom))
+        add_line(canvas, (left + 2, bottom, right, bottom))
+        add_line(canvas, (left + 2, top + 2, left + 2, bottom))
+        left, top, right, bottom = left + 2, top + 2, right - 2, bottom - 2
+    return canvas
+
+
+def checkerboard_canvas(size: int, backend: str):
+    """Every other cell painted, blank cells are connected only through corners."""
+    canvas = initialize_canvas((size, size), backend)
+    for row_id in range(1, size + 1):
+        for cell_id in range(1 + row_id % 2, size + 1, 2):
+            canvas.set(cell_id, row_id, 'x')
+    return canvas
+
+
+def random_lines(size: int, count: int) -> list:
+    random = Random(1)
+    lines = []
+    for _ in range(count):
+        cell_1, row_1 = random.randint(1, size), random.randint(1, size)
+        if random.random() < 0.5:
+            lines.append((cell_1, row_1, random.randint(1, size), row_1))
+        else:
+            lines.append((cell_1, row_1, cell_1, random.randint(1, size)))
+    return lines
+
+
+def rectangle_sides(size: int, count: int) -> list:
+    random = Random(2)
+    rectangles = []
+    for _ in range(count):
+        cell_1, cell_2 = sorted((random.randint(1, size), random.randint(1, size)))
+        row_1, row_2 = sorted((random.randint(1, size), random.randint(1, size)))
+        rectangles.append(((cell_1, row_1, cell_2, row_1), (cell_1, row_2, cell_2, row_2),
+                           (cell_1, row_1, cell_1, row_2), (cell_2, row_1, cell_2, row_2)))
+    return rectangles
+
+
+def setup_cases(size: int, commands: int, backend: str, directory: str) -> dict:
+    """Returns name -> (prepare, run) pairs, prepare() builds what run(prepared) works on."""
+    from main import main
+
+    lines, rectangles = random_lines(size, commands), rectangle_sides(size, commands // 4)
+    script = os.path.join(directory, 'input.txt')
+    write_script(script, size, size, commands)
+
+    def draw_lines(canvas):
+        for line in lines:
+            add_line(canvas, line)
+
+    def draw_rectangles(canvas):
+        for coordinates in rectangles:
+            add_rectangle(canvas, coordinates)
+
+    def write_frames(canvas):
+        with FrameWriter(os.path.join(directory, 'frames.txt'), flush_every=0) as writer:
+            for _ in range(10):
+                writer.write_frame(canvas)
+
+    def run_main(output_mode):
+        output = os.path.join(directory, f'output_{output_mode}.txt')
+        if os.path.exists(output):
+            os.remove(output)
+        return lambda _: main(script, output, output_mode, 0, backend)
+
+    tiny = os.path.join(directory, 'tiny.txt')
+    write_script(tiny, 20, 20, 20)
+    job = ['--input', tiny, '--output', os.path.join(directory, 'tiny_output.txt'), '--output-mode', 'final',
+           '--backend', backend]
+
+    def start(*arguments, stdin=None):
+        return lambda _: subprocess.run([sys.executable, *arguments], cwd=DRAWING_TOOL, input=stdin,
+                                        stdout=subprocess.DEVNULL, text=True, check=True)
+
+    blank = lambda: initialize_canvas((size, size), backend)  # noqa: E731
+    small = max(size // 10, 10)
+    return {
+        'initialize_canvas': (lambda: None, lambda _: initialize_canvas((size, size), backend)),
+        'add_line': (blank, draw_lines),
+        'add_rectangle': (blank, draw_rectangles),
+        'fill_open': (blank, lambda canvas: to_flood_fill(canvas, 1, 1, 'o')),
+        'fill_maze': (lambda: maze_canvas(size, size, get_canvas_class(backend)),
+                      lambda canvas: to_flood_fill(canvas, 1, 1, 'o')),
+        'fill_spiral': (lambda: spiral_canvas(size, backend), lambda canvas: to_flood_fill(canvas, 1, 1, 'o')),
+        'fill_checkerboard': (lambda: checkerboard_canvas(size, backend),
+                              lambda canvas: to_flood_fill(canvas, 2, 1, 'o')),
+        'draw_into_output_x10': (blank, write_frames),
+        'main_final': (lambda: None, run_main('final')),
+        'main_diff': (lambda: None, run_main('diff')),
+        'main_full_small': (lambda: None, lambda _: main_full_small(directory, small, commands // 10, backend)),
+        'startup_python': (lambda: None, start('-c', 'pass')),
+        'startup_import_main': (lambda: None, start('-c', 'import main')),
+        'startup_cli': (lambda: None, start('main.py', *job)),
+        'warm_jobs_x10': (lambda: None, start('main.py', '--jobs', stdin=f'{shlex.join(job)}\n' * WARM_JOBS)),
+    }
+
+
+def main_full_small(directory: str, size: int, commands: int, backend: str) -> None:
+    """Full frame output writes a frame per command, so it runs on a tenth of the canvas and script."""
+    from main import main
+
+    script, output = os.path.join(directory, 'small.txt'), os.path.join(directory, 'output_full.txt')
+    if not os.path.exists(script):
+        write_script(script, size, size, commands)
+    if os.path.exists(output):
+        os.remove(output)
+    main(script, output, 'full', 0, backend)
+
+
+def measure(prepare, run, repeat: int, traced: bool = True) -> dict:
+    """Returns best time of repeat runs and peak traced memory of one more run, None if not traced."""
+    best = None
+    for _ in range(repeat):
+        prepared = prepare()
+        start = perf_counter()
+        run(prepared)
+        elapsed = perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    if not traced:
+        return {'seconds': best, 'peak_bytes': None}
+    prepared = prepare()
+    tracemalloc.start()
+    run(prepared)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'seconds': best, 'peak_bytes': peak}
+
+
+def run_suite(size: int, commands: int, backend: str, repeat: int, only: list = None) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        cases = setup_cases(size, commands, backend, directory)
+        return {name: measure(prepare, run, repeat, name not in PROCESS_CASES)
+                for name, (prepare, run) in cases.items() if not only or name in only}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Returns report lines, cases slower than baseline by more than tolerance are marked."""
+    report = []
+    for name, result in results.items():
+        peak = f'{result["peak_bytes"] / 2 ** 20:10.2f} MiB' if result['peak_bytes'] is not None else f'{"n/a":>14}'
+        line = f'{name:<22} {result["seconds"] * 1000:10.2f} ms {peak}'
+        previous = baseline.get(name)
+        if previous:
+            ratio = result['seconds'] / previous['seconds'] if previous['seconds'] else 1.0
+            line += f'   x{ratio:.2f} vs baseline'
+            if ratio > 1 + tolerance:
+                line += '  REGRESSION'
+        report.append(line)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=500, help='canvas width and height (default: %(default)s)')
+    parser.add_argument('--commands', type=int, default=5000,
+                        help='commands of the synthetic script (default: %(default)s)')
+    parser.add_argument('--backend', default='bytearray', help='canvas backend (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per case (default: %(default)s)')
+    parser.add_argument('--only', nargs='*', metavar='CASE', help='run only these cases')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline file (default: benchmarks/baseline.json)')
+    parser.add_argument('--save-baseline', action='store_true', help='write results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown before a case is marked as regression (default: %(default)s)')
+    arguments = parser.parse_args()
+
+    meta = {'size': arguments.size, 'commands': arguments.commands, 'backend': arguments.backend}
+    results = run_suite(arguments.size, arguments.commands, arguments.backend, arguments.repeat, arguments.only)
+    baseline = {}
+    if os.path.exists(arguments.baseline):
+        with open(arguments.baseline) as file:
+            stored = json.load(file)
+        if stored.get('meta') == meta:
+            baseline = stored['results']
+        else:
+            print(f'Baseline was recorded with {stored.get("meta")}, not comparing.')
+    print('\n'.join(compare(results, baseline, arguments.tolerance)))
+    if arguments.save_baseline:
+        with open(arguments.baseline, 'w') as file:
+            json.dump({'meta': meta, 'results': results}, file, indent=2, sort_keys=True)
+            file.write('\n')
+    regressions = [name for name in results
+                   if name in baseline and baseline[name]['seconds']
+                   and results[name]['seconds'] / baseline[name]['seconds'] > 1 + arguments.tolerance]
+    return 1 if regressions else 0
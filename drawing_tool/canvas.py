@@ -0,0 +1,209 @@
+from typing import Optional
+
+from fill import scanline_fill
+
+BLANK = ' '
+STROKE = 'x'
+
+
+class Canvas:
+    """Drawing surface stored in one contiguous bytearray, one byte per cell.
+
+    Coordinates are 1-based like in the instructions. The border is not stored,
+    it is only added when the canvas is rendered. Every change widens the dirty
+    (left, top, right, bottom) box until it is taken with take_dirty().
+    """
+
+    __slots__ = ('width', 'height', 'stride', 'origin', 'cells', 'dirty')
+
+    # Canvases too large to be rendered into one buffer set this and provide frame_chunks().
+    STREAMED = False
+    # Cells are one flat buffer addressed by index(), so a diagonal is one strided slice.
+    FLAT = True
+
+    def __init__(self, width: int, height: int) -> None:
+        self.width = width
+        self.height = height
+        self.stride = width
+        self.origin = 0
+        self.cells = bytearray(BLANK.encode()) * (width * height)
+        self.dirty = None
+
+    def index(self, cell_id: int, row_id: int) -> int:
+        """Returns position of the cell in the storage."""
+        return self.origin + (row_id - 1) * self.stride + cell_id - 1
+
+    def get(self, cell_id: int, row_id: int) -> str:
+        """Returns color of the cell."""
+        return chr(self.cells[self.index(cell_id, row_id)])
+
+    def set(self, cell_id: int, row_id: int, color: str) -> None:
+        """Paints a single cell."""
+        self.cells[self.index(cell_id, row_id)] = ord(color)
+        self.touch(cell_id, row_id, cell_id, row_id)
+
+    def hline(self, cell_1: int, cell_2: int, row_id: int, color: str = STROKE) -> None:
+        """Paints cells from cell_1 to cell_2 of the row with one slice assignment."""
+        start = self.index(cell_1, row_id)
+        self.cells[start:start + cell_2 - cell_1 + 1] = color.encode() * (cell_2 - cell_1 + 1)
+        self.touch(cell_1, row_id, cell_2, row_id)
+
+    def vline(self, cell_id: int, row_1: int, row_2: int, color: str = STROKE) -> None:
+        """Paints cells from row_1 to row_2 of the column with one strided slice assignment."""
+        start = self.index(cell_id, row_1)
+        count = row_2 - row_1 + 1
+        self.cells[start:start + (count - 1) * self.stride + 1:self.stride] = color.encode() * count
+        self.touch(cell_id, row_1, cell_id, row_2)
+
+    def fill_rect(self, left: int, top: int, right: int, bottom: int, color: str = STROKE) -> None:
+        """Paints every cell of the box clipped to the canvas, a row part is one slice assignment.
+
+        One row of cells is reused for all rows, a single slice over whole rows would first
+        have to build a copy as large as the box.
+        """
+        box = clip_box((left, top, right, bottom), self.width, self.height)
+        if box is None:
+            return
+        left, top, right, bottom = box
+        count = right - left + 1
+        value, start = color.encode() * count, self.index(left, top)
+        for _ in range(bottom - top + 1):
+            self.cells[start:start + count] = value
+            start += self.stride
+        self.touch(left, top, right, bottom)
+
+    def line(self, cell_1: int, row_1: int, cell_2: int, row_2: int, color: str = STROKE) -> None:
+        """Paints the Bresenham line between the cells, its cells outside the canvas are skipped.
+
+        Every run of the line is painted with hline or vline, an exact diagonal of a FLAT
+        canvas with one strided slice assignment.
+        """
+        if self.FLAT and abs(cell_2 - cell_1) == abs(row_2 - row_1):
+            self.diagonal(cell_1, row_1, cell_2, row_2, color)
+            return
+        for run in line_runs(cell_1, row_1, cell_2, row_2):
+            box = clip_box(run, self.width, self.height)
+            if box is None:
+                continue
+            left, top, right, bottom = box
+            if top == bottom:
+                self.hline(left, right, top, color)
+            else:
+                self.vline(left, top, bottom, color)
+
+    def diagonal(self, cell_1: int, row_1: int, cell_2: int, row_2: int, color: str) -> None:
+        """Paints the 45 degree line between the cells, clipped to the canvas before painting."""
+        if row_1 > row_2:
+            cell_1, row_1, cell_2, row_2 = cell_2, row_2, cell_1, row_1
+        step = 1 if cell_2 >= cell_1 else -1
+        low = max(0, 1 - row_1, 1 - cell_1 if step == 1 else cell_1 - self.width)
+        high = min(row_2 - row_1, self.height - row_1, self.width - cell_1 if step == 1 else cell_1 - 1)
+        if low > high:
+            return
+        count, cell_id, row_id = high - low + 1, cell_1 + step * low, row_1 + low
+        stride = self.stride + step if count > 1 else 1
+        start = self.index(cell_id, row_id)
+        self.cells[start:start + (count - 1) * stride + 1:stride] = color.encode() * count
+        last_cell = cell_id + step * (count - 1)
+        self.touch(min(cell_id, last_cell), row_id, max(cell_id, last_cell), row_id + count - 1)
+
+    def flood_fill(self, cell_id: int, row_id: int, color: str, connectivity: int = 8) -> list:
+        """Fills the area connected to the cell, returns filled (row, left, right) spans."""
+        spans = scanline_fill(self.cells, self.origin, self.stride, self.width, self.height,
+                              [(cell_id - 1, row_id - 1)], self.cells[self.index(cell_id, row_id)],
+                              ord(color), connectivity)
+        if spans:
+            self.touch(min(left for _, left, _ in spans) + 1, min(row for row, _, _ in spans) + 1,
+                       max(right for _, _, right in spans) + 1, max(row for row, _, _ in spans) + 1)
+        return [(row + 1, left + 1, right + 1) for row, left, right in spans]
+
+    def touch(self, left: int, top: int, right: int, bottom: int) -> None:
+        """Widens the dirty box to cover the given box."""
+        if self.dirty is None:
+            self.dirty = left, top, right, bottom
+        else:
+            dirty_left, dirty_top, dirty_right, dirty_bottom = self.dirty
+            self.dirty = (min(left, dirty_left), min(top, dirty_top),
+                          max(right, dirty_right), max(bottom, dirty_bottom))
+
+    def take_dirty(self) -> Optional[tuple]:
+        """Returns the box changed since the previous call and starts tracking anew."""
+        dirty, self.dirty = self.dirty, None
+        return dirty
+
+    def row(self, row_id: int) -> bytes:
+        """Returns cells of the row without the border."""
+        start = self.index(1, row_id)
+        return bytes(self.cells[start:start + self.width])
+
+    def load_row(self, row_id: int, cells: bytes) -> None:
+        """Replaces cells of the row, the dirty box is left untouched."""
+        start = self.index(1, row_id)
+        self.cells[start:start + self.width] = cells
+
+    def region(self, box: tuple) -> list:
+        """Returns cells of the (left, top, right, bottom) box row by row."""
+        left, top, right, bottom = box
+        return [self.cells[self.index(left, row_id):self.index(right, row_id) + 1]
+                for row_id in range(top, bottom + 1)]
+
+    def lines(self) -> list:
+        """Returns rendered canvas as list of strings including the border."""
+        return self.render().decode().splitlines()
+
+    def frame_size(self) -> int:
+        """Returns length of the rendered canvas in bytes."""
+        return (self.width + 3) * (self.height + 2)
+
+    def render_into(self, frame: bytearray) -> None:
+        """Copies cells into a frame rendered before, the border is left untouched."""
+        line, width, stride = self.width + 3, self.width, self.stride
+        view = memoryview(self.cells)
+        start, position = self.origin, line + 1
+        for _ in range(self.height):
+            frame[position:position + width] = view[start:start + width]
+            start += stride
+            position += line
+
+    def render(self) -> bytes:
+        """Returns rendered canvas including the border, every line ends with a newline."""
+        border = b'-' * (self.width + 2) + b'\n'
+        frame = bytearray(border + (b'|' + b' ' * self.width + b'|\n') * self.height + border)
+        self.render_into(frame)
+        return bytes(frame)
+
+
+def clip_box(box: tuple, width: int, height: int) -> Optional[tuple]:
+    """Returns the part of the (left, top, right, bottom) box inside the canvas, None if nothing is."""
+    left, top, right, bottom = max(box[0], 1), max(box[1], 1), min(box[2], width), min(box[3], height)
+    if left > right or top > bottom:
+        return None
+    return left, top, right, bottom
+
+
+def line_runs(cell_1: int, row_1: int, cell_2: int, row_2: int) -> list:
+    """Returns (left, top, right, bottom) boxes of the runs of the Bresenham line between the cells.
+
+    A line closer to horizontal has a run per row, a steeper one a run per column. Every run
+    is computed from its row or column directly, the cells do not depend on the end the line
+    is drawn from.
+    """
+    if abs(cell_2 - cell_1) >= abs(row_2 - row_1):
+        return [(start, minor, end, minor) for start, end, minor in major_runs(cell_1, row_1, cell_2, row_2)]
+    return [(minor, start, minor, end) for start, end, minor in major_runs(row_1, cell_1, row_2, cell_2)]
+
+
+def major_runs(major_1: int, minor_1: int, major_2: int, minor_2: int) -> list:
+    """Returns (start, end, minor) runs along the major axis, the minor coordinate is rounded half up."""
+    if major_1 > major_2:
+        major_1, minor_1, major_2, minor_2 = major_2, minor_2, major_1, minor_1
+    length, rise = major_2 - major_1, abs(minor_2 - minor_1)
+    if not rise:
+        return [(major_1, major_2, minor_1)]
+    step = 1 if minor_2 > minor_1 else -1
+    runs, start = [], 0
+    for run in range(rise + 1):
+        end = length if run == rise else -(-(2 * run + 1) * length // (2 * rise)) - 1
+        runs.append((major_1 + start, major_1 + end, minor_1 + step * run))
+        start = end + 1
+    return runs
@@ -0,0 +1,118 @@
+"""Snapshots of the canvas and of the read position, so a long run can resume after a crash.
+
+A checkpoint file is a fixed size header followed by the cells row by row, one byte each,
+and by the errors reported so far. The cells start at HEADER.size, so the file can be
+memory mapped and a row read without parsing anything else.
+"""
+import mmap
+import os
+import struct
+from collections import namedtuple
+from typing import BinaryIO, Iterator, Optional
+
+from validation import CommandError
+
+MAGIC = b'DTCP'
+VERSION = 1
+# magic, version, width, height, next line number, input offset, output size, errors length
+HEADER = struct.Struct('<4sHxxQQQQQQ8x')
+
+Checkpoint = namedtuple('Checkpoint', 'width height line_number input_offset output_size errors')
+
+
+class InstructionReader:
+    """Yields split instructions of a file opened in binary mode starting at offset.
+
+    offset is the position right after the last line yielded.
+    """
+
+    def __init__(self, file: BinaryIO, offset: int) -> None:
+        file.seek(offset)
+        self.file = file
+        self.offset = offset
+
+    def __iter__(self) -> Iterator[list]:
+        for line in self.file:
+            self.offset += len(line)
+            yield line.decode().split()
+
+
+class Checkpointer:
+    """Saves a checkpoint after every `every` instructions of a run.
+
+    errors are the errors of the lines before first_line, reported by the run which was resumed.
+    """
+
+    def __init__(self, path: str, every: int, reader: InstructionReader, first_line: int = 2,
+                 errors: Optional[list] = None) -> None:
+        self.path = path
+        self.every = every
+        self.reader = reader
+        self.first_line = first_line
+        self.errors = errors or []
+
+    def track(self, instructions: Iterator[list], canvas, writer, errors: list, flush=None) -> Iterator[list]:
+        """Yields the instructions and saves a checkpoint when every-th of them has been executed.
+
+        flush paints strokes which were collected but not painted yet before the canvas is saved.
+        """
+        for count, instruction in enumerate(instructions, 1):
+            yield instruction
+            if count % self.every == 0:
+                if flush is not None:
+                    flush(canvas)
+                self.save(canvas, writer, self.first_line + count, errors)
+
+    def save(self, canvas, writer, line_number: int, errors: list) -> None:
+        """Writes the checkpoint into a temporary file and moves it over the previous one."""
+        writer.file.flush()
+        write_checkpoint(self.path, canvas, line_number, self.reader.offset, writer.file.tell(),
+                         self.errors + errors)
+
+    def remove(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def write_checkpoint(path: str, canvas, line_number: int, input_offset: int, output_size: int,
+                     errors: list) -> None:
+    encoded = ''.join(f'{error.line_number}\t{error.message}\n' for error in errors).encode()
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, canvas.width, canvas.height, line_number,
+                               input_offset, output_size, len(encoded)))
+        for row_id in range(1, canvas.height + 1):
+            file.write(canvas.row(row_id))
+        file.write(encoded)
+    os.replace(temporary, path)
+
+
+def read_checkpoint(path: str, canvas=None) -> Checkpoint:
+    """Reads the checkpoint header and errors, cells are loaded into the canvas when it is given."""
+    if os.path.getsize(path) < HEADER.size:
+        raise CommandError(f'Checkpoint "{path}" is truncated.')
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as cells:
+        magic, version, width, height, line_number, input_offset, output_size, errors_length = \
+            HEADER.unpack_from(cells)
+        if magic != MAGIC or version != VERSION:
+            raise CommandError(f'"{path}" is not a checkpoint of this version.')
+        end = HEADER.size + width * height
+        if len(cells) != end + errors_length:
+            raise CommandError(f'Checkpoint "{path}" is truncated.')
+        if canvas is not None:
+            if (canvas.width, canvas.height) != (width, height):
+                raise CommandError(f'Checkpoint "{path}" was made for a {width}x{height} canvas.')
+            for row_id, start in enumerate(range(HEADER.size, end, width), 1):
+                canvas.load_row(row_id, cells[start:start + width])
+        errors = []
+        for line in cells[end:].decode().splitlines():
+            number, message = line.split('\t', 1)
+            errors.append(CommandError(message, int(number)))
+    return Checkpoint(width, height, line_number, input_offset, output_size, errors)
+
+
+def truncate_output(path: str, size: int) -> None:
+    """Drops output written after the checkpoint was saved."""
+    if not os.path.exists(path) or os.path.getsize(path) < size:
+        raise CommandError(f'Output "{path}" is shorter than when the checkpoint was saved.')
+    os.truncate(path, size)
@@ -0,0 +1,68 @@
+import re
+
+CONNECTIVITIES = (4, 8)
+# Neighbouring row windows up to this width are scanned cell by cell, which is cheaper than
+# starting a regular expression search for the one or two cells of a narrow corridor.
+NARROW = 8
+
+
+def scanline_fill(cells, origin: int, stride: int, width: int, height: int,
+                  seeds: list, target: int, color: int, connectivity: int = 8) -> list:
+    """Recolors every run of target cells connected to the seeds, returns filled spans.
+
+    Cells are stored row by row starting at origin, every row is stride bytes long.
+    Seeds and returned (row, left, right) spans use 0-based coordinates, spans are inclusive.
+    Whole horizontal runs are filled with one slice assignment and only one seed per run of
+    the neighbouring rows is pushed to the stack.
+    """
+    if connectivity not in CONNECTIVITIES:
+        raise ValueError(f'Connectivity must be one of {CONNECTIVITIES}, got {connectivity}.')
+    spans = []
+    if target == color:
+        return spans
+    target_byte, color_byte = bytes((target,)), bytes((color,))
+    search = re.compile(b'[^' + re.escape(target_byte) + b']').search
+    find_runs = re.compile(re.escape(target_byte) + b'+').finditer
+    reach = 1 if connectivity == 8 else 0
+    last_row = height - 1
+    stack = [(cell_id, row_id, 0, 0, 0) for cell_id, row_id in seeds]
+    push, pop = stack.append, stack.pop
+    while stack:
+        cell_id, row_id, direction, parent_low, parent_high = pop()
+        start = origin + row_id * stride
+        position = start + cell_id
+        if cells[position] != target:
+            continue
+        end = start + width
+        match = search(cells, position, end)
+        right = match.start() if match else end
+        if position == start or cells[position - 1] != target:
+            left = position
+        else:
+            left = start + len(cells[start:position].rstrip(target_byte))
+        cells[left:right] = color_byte * (right - left)
+        left -= start
+        right -= start
+        spans.append((row_id, left, right - 1))
+
+        low = left - reach if left > reach else 0
+        high = right + reach if right + reach < width else width
+        for step in (-1, 1):
+            next_row = row_id + step
+            if not 0 <= next_row <= last_row:
+                continue
+            if step == -direction and parent_low <= low and high <= parent_high:
+                # The span this seed came from and its two bounding cells hold no target cells.
+                continue
+            next_start = origin + next_row * stride
+            if high - low > NARROW:
+                for run in find_runs(cells, next_start + low, next_start + high):
+                    push((run.start() - next_start, next_row, step, left - 1, right + 1))
+                continue
+            previous = -1
+            for position in range(next_start + low, next_start + high):
+                cell = cells[position]
+                if cell == target and previous != target:
+                    push((position - next_start, next_row, step, left - 1, right + 1))
+                previous = cell
+    return spans
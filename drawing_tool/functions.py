@@ -1,22 +1,33 @@
-from typing import Union
+from typing import Iterator, Optional, TextIO, Union
 
+from backends import get_canvas_class
+from canvas import Canvas, STROKE
 
-def initialize_canvas(cleaned_data: tuple) -> list:
-    """Initializes and returns canvas."""
+
+def initialize_canvas(cleaned_data: tuple, backend: str = 'bytearray') -> Canvas:
+    """Initializes and returns canvas of the backend."""
     width, height = cleaned_data
-    canvas = []
-    canvas.extend(['-' * (width + 2)])
-    body = [(['|'] + [' ' for _ in range(width)] + ['|']) for _ in range(height)]
-    canvas.extend(body)
-    canvas.extend(['-' * (width + 2)])
-    return canvas
+    return get_canvas_class(backend)(width, height)
 
 
-def draw_into_output(canvas: list) -> None:
+def draw_into_output(canvas: Canvas) -> None:
     """Writes data into specified file."""
     with open('output.txt', 'a') as file:
-        for line in canvas:
-            file.write(''.join(line) + '\n')
+        file.write(canvas.render().decode())
+
+
+def draw_diff_into_output(canvas: Canvas, box: Optional[tuple]) -> None:
+    """Writes only the changed box of the canvas into specified file.
+
+    The block starts with "@ left top right bottom" line followed by cells of the box
+    row by row, a command which changed nothing is written as a single "@" line.
+    """
+    with open('output.txt', 'a') as file:
+        if box is None:
+            file.write('@\n')
+        else:
+            file.write('@ %d %d %d %d\n' % box)
+            file.write(''.join(row.decode() + '\n' for row in canvas.region(box)))
 
 
 def get_instructions() -> list:
@@ -25,6 +36,12 @@ def get_instructions() -> list:
         return file.readlines()[1:]
 
 
+def read_instructions(file: TextIO) -> Iterator[list]:
+    """Lazily yields the remaining lines of an opened file split into words."""
+    for line in file:
+        yield line.split()
+
+
 def get_coordinates_to_draw_rect_with_addline_function(cleaned_data: list) -> tuple:
     """Decomposes the data to the desired values ​​for the add_rectangle function."""
     value_1, value_2, value_3, value_4 = cleaned_data
@@ -35,43 +52,38 @@ def get_coordinates_to_draw_rect_with_addline_function(cleaned_data: list) -> tu
     return first_horiz_coords, second_horiz_coords, first_vertical_coords, second_vertical_coords
 
 
-def add_rectangle(canvas: list, coordinates: tuple) -> None:
+def add_rectangle(canvas: Canvas, coordinates: tuple) -> None:
     """Adds values ​​to the canvas that will be visible as a rectangle."""
     for coordinate in coordinates:
         add_line(canvas, coordinate)
 
 
-def add_line(canvas: list, instructions: Union[list, tuple]) -> None:
+def add_line(canvas: Canvas, instructions: Union[list, tuple]) -> None:
     """Adds values ​​to the canvas that will be visible as a line."""
     cell_1, row_1, cell_2, row_2 = instructions
     if row_1 == row_2:
-        for cell_id in range(min(cell_1, cell_2), max(cell_1, cell_2) + 1):
-            canvas[row_1][cell_id] = 'x'
+        canvas.hline(min(cell_1, cell_2), max(cell_1, cell_2), row_1, STROKE)
 
     elif cell_1 == cell_2:
-        for row_id in range(min(row_1, row_2), max(row_1, row_2) + 1):
-            canvas[row_id][cell_1] = 'x'
-
-
-def to_flood_fill(canvas: list, cell_id: int, row_id: int, color: str) -> None:
-    """Should fill the entire area connected to (x,y) with "colour"."""
-    width, height = len(canvas[0]), len(canvas)
-    to_replace = canvas[row_id][cell_id]
-    stack = set()
-    stack.add((cell_id, row_id))
-    while stack:
-        cell_id, row_id = stack.pop()
-        if not (0 < cell_id < width and 0 < row_id < height):
-            continue
-        cell = canvas[row_id][cell_id]
-        if cell != to_replace:
-            continue
-        canvas[row_id][cell_id] = color
-        stack.add((cell_id - 1, row_id))
-        stack.add((cell_id + 1, row_id))
-        stack.add((cell_id, row_id - 1))
-        stack.add((cell_id, row_id + 1))
-        stack.add((cell_id - 1, row_id - 1))
-        stack.add((cell_id + 1, row_id - 1))
-        stack.add((cell_id - 1, row_id + 1))
-        stack.add((cell_id + 1, row_id + 1))
+        canvas.vline(cell_1, min(row_1, row_2), max(row_1, row_2), STROKE)
+
+
+def add_filled_rectangle(canvas: Canvas, instructions: Union[list, tuple]) -> None:
+    """Paints every cell of the rectangle."""
+    cell_1, row_1, cell_2, row_2 = instructions
+    canvas.fill_rect(min(cell_1, cell_2), min(row_1, row_2), max(cell_1, cell_2), max(row_1, row_2), STROKE)
+
+
+def add_diagonal(canvas: Canvas, instructions: Union[list, tuple]) -> None:
+    """Adds a line between any two cells."""
+    canvas.line(*instructions, STROKE)
+
+
+def to_flood_fill(canvas: Canvas, cell_id: int, row_id: int, color: str, connectivity: int = 8) -> int:
+    """Should fill the entire area connected to (x,y) with "colour", returns number of filled cells.
+
+    Cells touching by a corner are connected by default, pass connectivity=4 to connect
+    only cells sharing a side.
+    """
+    spans = canvas.flood_fill(cell_id, row_id, color, connectivity)
+    return sum(right - left + 1 for _, left, right in spans)
@@ -0,0 +1,172 @@
+import json
+from random import Random
+from time import perf_counter
+
+from validation import CommandError, Diagonal, FilledRectangle, Line, Rectangle
+
+PHASES = ('parse', 'draw', 'fill', 'output')
+
+
+class CommandStats:
+    """Count, total time and a bounded reservoir of latencies of one command type."""
+
+    __slots__ = ('count', 'seconds', 'longest', 'cells', 'samples', 'random', 'limit')
+
+    def __init__(self, limit: int) -> None:
+        self.count = 0
+        self.seconds = 0.0
+        self.longest = 0.0
+        self.cells = 0
+        self.samples = []
+        self.random = Random(0)
+        self.limit = limit
+
+    def add(self, seconds: float, cells: int) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.cells += cells
+        if seconds > self.longest:
+            self.longest = seconds
+        if len(self.samples) < self.limit:
+            self.samples.append(seconds)
+        else:
+            position = self.random.randrange(self.count)
+            if position < self.limit:
+                self.samples[position] = seconds
+
+    def percentile(self, share: float) -> float:
+        ordered = sorted(self.samples)
+        return ordered[min(int(share * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'total_seconds': self.seconds,
+            'p50_seconds': self.percentile(0.5),
+            'p90_seconds': self.percentile(0.9),
+            'p99_seconds': self.percentile(0.99),
+            'max_seconds': self.longest,
+            'cells': self.cells,
+        }
+
+
+class Profiler:
+    """Times the parse, draw, fill and output steps of a run and the commands they belong to.
+
+    main.run only wraps its steps with the profiler when one is given, so a run without
+    profiling calls exactly the same functions as before.
+    """
+
+    def __init__(self, samples: int = 10000) -> None:
+        self.samples = samples
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.commands = {}
+        self.bytes_written = 0
+        self.started = perf_counter()
+        self.name = None
+        self.seconds = 0.0
+        self.cells = 0
+        self.held = None
+
+    def commit(self) -> None:
+        """Records the command which is being timed."""
+        if self.name is not None:
+            stats = self.commands.get(self.name)
+            if stats is None:
+                stats = self.commands[self.name] = CommandStats(self.samples)
+            stats.add(self.seconds, self.cells)
+        self.name, self.seconds, self.cells = None, 0.0, 0
+
+    def hold(self) -> None:
+        """Sets the command being timed aside, it is executed later by release or not at all."""
+        self.held, self.name, self.seconds, self.cells = (self.name, self.seconds, self.cells), None, 0.0, 0
+
+    def release(self, execute=None, canvas=None, command=None):
+        """Records the held command, executed by the timed execute first if it is given.
+
+        Time and cells of the held command go to it and not to the command being timed now.
+        """
+        current = self.name, self.seconds, self.cells
+        (self.name, self.seconds, self.cells), self.held = self.held, None
+        try:
+            return execute(canvas, command) if execute is not None else None
+        finally:
+            self.commit()
+            self.name, self.seconds, self.cells = current
+
+    def spent(self, phase: str, seconds: float) -> None:
+        self.phases[phase] += seconds
+        self.seconds += seconds
+
+    def wrap_parse(self, parse):
+        """Wraps parse_instruction, every call starts timing of a new command."""
+        def timed_parse(instruction: list, cleaned_data: tuple):
+            self.commit()
+            start = perf_counter()
+            try:
+                command = parse(instruction, cleaned_data)
+            except CommandError:
+                self.name = 'Error'
+                raise
+            finally:
+                self.spent('parse', perf_counter() - start)
+            self.name = type(command).__name__
+            if type(command) is Line:
+                self.cells = abs(command.cell_2 - command.cell_1) + abs(command.row_2 - command.row_1) + 1
+            elif type(command) is Rectangle:
+                width = abs(command.cell_2 - command.cell_1) + 1
+                height = abs(command.row_2 - command.row_1) + 1
+                self.cells = 2 * (width + height) - 4 if width > 1 and height > 1 else width * height
+            elif type(command) is FilledRectangle:
+                self.cells = (abs(command.cell_2 - command.cell_1) + 1) * (abs(command.row_2 - command.row_1) + 1)
+            elif type(command) is Diagonal:
+                self.cells = max(abs(command.cell_2 - command.cell_1), abs(command.row_2 - command.row_1)) + 1
+            return command
+        return timed_parse
+
+    def wrap_execute(self, execute):
+        """Wraps execute, fills return number of painted cells."""
+        def timed_execute(canvas, command):
+            start = perf_counter()
+            cells = execute(canvas, command)
+            self.spent('draw' if cells is None else 'fill', perf_counter() - start)
+            if cells is not None:
+                self.cells = cells
+            return cells
+        return timed_execute
+
+    def wrap_draw(self, draw):
+        """Wraps stroke batch methods, their time counts as drawing."""
+        def timed_draw(*arguments):
+            start = perf_counter()
+            result = draw(*arguments)
+            self.spent('draw', perf_counter() - start)
+            return result
+        return timed_draw
+
+    def wrap_output(self, output, writer):
+        """Wraps a writing function, counts bytes the writer wrote during the call."""
+        def timed_output(*arguments):
+            start, written = perf_counter(), writer.bytes_written
+            result = output(*arguments)
+            self.spent('output', perf_counter() - start)
+            self.bytes_written += writer.bytes_written - written
+            return result
+        return timed_output
+
+    def report(self, **sections) -> dict:
+        """Returns statistics of the run, sections other parts of the run reported are added as they are."""
+        self.commit()
+        return {
+            **sections,
+            'total_seconds': perf_counter() - self.started,
+            'phases_seconds': dict(self.phases),
+            'bytes_written': self.bytes_written,
+            'cells_touched': sum(stats.cells for stats in self.commands.values()),
+            'commands': {name: stats.to_dict() for name, stats in sorted(self.commands.items())},
+        }
+
+    def dump(self, path: str, **sections) -> None:
+        with open(path, 'w') as file:
+            json.dump(self.report(**sections), file, indent=2)
+            file.write('\n')
@@ -0,0 +1,120 @@
+from collections import deque, namedtuple
+
+from canvas import STROKE, line_runs
+from region_index import command_box
+from rle_canvas import RUNS
+from validation import Diagonal, Fill, FilledRectangle, Line, Redo, Undo
+
+# Default number of steps a drawing session can undo.
+UNDO_STEPS = 100
+
+# segments are (left, top, right, bottom, prior color) boxes of a single row or column
+# which the command changed, cells it painted the color they already had are left out.
+Step = namedtuple('Step', 'command segments')
+
+
+class Journal:
+    """Undo and redo of drawing commands, steps keep only the changed cells with their prior colors.
+
+    A stroke keeps the runs of cells it painted over, a fill keeps its spans which all had the
+    color of the seed cell, so undoing or redoing a step costs as much as the cells it changed.
+    Only the `limit` latest steps can be undone, a new command drops the steps to redo.
+    """
+
+    def __init__(self, limit: int = UNDO_STEPS) -> None:
+        self.done = deque(maxlen=limit)
+        self.undone = []
+
+    def record(self, canvas, command) -> Step:
+        """Collects the runs of stroke cells which are not painted yet, call it before the stroke is drawn."""
+        stroke, segments = ord(STROKE), []
+        for left, top, right, bottom in stroke_boxes(command):
+            cells = b''.join(canvas.region((left, top, right, bottom)))
+            for run in RUNS.finditer(cells):
+                if cells[run.start()] != stroke:
+                    if top == bottom:
+                        segments.append((left + run.start(), top, left + run.end() - 1, top, chr(cells[run.start()])))
+                    else:
+                        segments.append((left, top + run.start(), left, top + run.end() - 1, chr(cells[run.start()])))
+        return Step(command, segments)
+
+    def fill(self, canvas, cell_id: int, row_id: int, color: str) -> int:
+        """Fills like functions.to_flood_fill and keeps the filled spans, returns number of filled cells."""
+        prior = canvas.get(cell_id, row_id)
+        spans = canvas.flood_fill(cell_id, row_id, color)
+        self.push(Step(Fill(cell_id, row_id, color), [(left, row, right, row, prior) for row, left, right in spans]))
+        return sum(right - left + 1 for _, left, right in spans)
+
+    def push(self, step: Step) -> None:
+        self.done.append(step)
+        self.undone.clear()
+
+    def undo(self, canvas, steps: int = 1) -> int:
+        """Restores the prior colors of the latest steps, returns number of undone steps."""
+        count = 0
+        while count < steps and self.done:
+            step = self.done.pop()
+            for segment in step.segments:
+                paint(canvas, *segment)
+            self.undone.append(step)
+            count += 1
+        return count
+
+    def redo(self, canvas, execute, steps: int = 1) -> int:
+        """Applies the latest undone steps again, returns number of redone steps.
+
+        The canvas is just like when the step was done first, so its strokes are drawn again
+        by execute and its fill spans are painted without searching.
+        """
+        count = 0
+        while count < steps and self.undone:
+            step = self.undone.pop()
+            if type(step.command) is Fill:
+                for left, top, right, bottom, _ in step.segments:
+                    paint(canvas, left, top, right, bottom, step.command.color)
+            else:
+                execute(canvas, step.command)
+            self.done.append(step)
+            count += 1
+        return count
+
+    def wrap_execute(self, execute):
+        """Wraps main.execute, commands are recorded before they are drawn and U and Z move through them."""
+        def journaled_execute(canvas, command):
+            if type(command) is Undo:
+                self.undo(canvas, command.steps)
+            elif type(command) is Redo:
+                self.redo(canvas, execute, command.steps)
+            elif type(command) is Fill:
+                return self.fill(canvas, *command)
+            else:
+                step = self.record(canvas, command)
+                execute(canvas, command)
+                self.push(step)
+        return journaled_execute
+
+
+def stroke_boxes(command) -> list:
+    """Returns boxes of the single rows and columns a stroke paints, each cell once."""
+    if type(command) is Diagonal:
+        return line_runs(*command)
+    left, top, right, bottom = command_box(command)
+    if type(command) is Line:
+        return [(left, top, right, bottom)]
+    if type(command) is FilledRectangle:
+        return [(left, row_id, right, row_id) for row_id in range(top, bottom + 1)]
+    boxes = [(left, top, right, top)]
+    if bottom > top:
+        boxes.append((left, bottom, right, bottom))
+    if bottom - top > 1:
+        boxes.append((left, top + 1, left, bottom - 1))
+        if right > left:
+            boxes.append((right, top + 1, right, bottom - 1))
+    return boxes
+
+
+def paint(canvas, left: int, top: int, right: int, bottom: int, color: str) -> None:
+    if top == bottom:
+        canvas.hline(left, right, top, color)
+    else:
+        canvas.vline(left, top, bottom, color)
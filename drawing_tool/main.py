@@ -1,51 +1,346 @@
+"""Draws instructions of the input file into the output file.
+
+Modules of optional features are imported only by the runs which use them, so a plain run
+of the command line starts without them. --jobs runs many scripts in one warm process.
+"""
+import os
+import sys
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional, TextIO
+
 from validation import (
-    canvas_instruction_validator,
-    pre_validate_instruction,
-    line_validator,
-    rectangle_validator,
-    flood_fill_validator,
+    Line,
+    Rectangle,
+    Fill,
+    FilledRectangle,
+    Diagonal,
+    Undo,
+    Redo,
+    Command,
+    CommandError,
+    parse_canvas,
+    parse_instruction,
 )
 from functions import (
     initialize_canvas,
-    draw_into_output,
-    get_instructions,
+    read_instructions,
     add_line,
     get_coordinates_to_draw_rect_with_addline_function,
     add_rectangle,
+    add_filled_rectangle,
+    add_diagonal,
     to_flood_fill,
 )
+from writer import COMPRESSIONS, OUTPUT_FORMATS, FrameWriter, open_writer
+from batch import StrokeBatch
+from backends import BACKENDS, get_canvas_class
+
+if TYPE_CHECKING:
+    import argparse
+    from instrumentation import Profiler
+    from region_index import RegionIndex
+    from parallel_fill import ParallelFill
+    from checkpoint import Checkpointer
+    from journal import Journal
+    from optimizer import Optimizer
+
+# full - the whole canvas after every command, diff - the whole canvas once and then only
+# the box changed by every command, final - the whole canvas once after the last command.
+OUTPUT_MODES = ('full', 'diff', 'final')
+
+
+def output_command(writer: FrameWriter, canvas, output_mode: str) -> None:
+    """Writes result of a successful command according to the output mode."""
+    if output_mode == 'full':
+        writer.write_frame(canvas)
+    elif output_mode == 'diff':
+        writer.write_diff(canvas, canvas.take_dirty())
+
+
+def format_error(error: CommandError) -> str:
+    """Returns the error prefixed by the line of the instruction when it is known."""
+    return f'line {error.line_number}: {error}' if error.line_number else str(error)
+
+
+def execute(canvas, command: Command) -> Optional[int]:
+    """Applies a parsed command to the canvas, a fill returns number of filled cells."""
+    if type(command) is Line:
+        add_line(canvas, command)
+    elif type(command) is Rectangle:
+        add_rectangle(canvas, get_coordinates_to_draw_rect_with_addline_function(command))
+    elif type(command) is Fill:
+        return to_flood_fill(canvas, *command)
+    elif type(command) is FilledRectangle:
+        add_filled_rectangle(canvas, command)
+    elif type(command) is Diagonal:
+        add_diagonal(canvas, command)
+    elif type(command) in (Undo, Redo):
+        raise CommandError('Undo and redo need the journal, run with --undo-steps.')
+
+
+def main(input_path: str = 'input.txt', output_path: str = 'output.txt', output_mode: str = 'full',
+         flush_every: int = 1, backend: str = 'bytearray', profile_path: Optional[str] = None,
+         checkpoint_path: Optional[str] = None, checkpoint_every: int = 10000, resume: bool = False,
+         region_index: bool = False, fill_workers: int = 0, output_format: str = 'text',
+         compression: Optional[str] = None, undo_steps: int = 0, optimize: bool = False) -> list:
+    """Draws the input file into the output file, returns errors of instructions which were skipped.
+
+    With profile_path the run is timed and its statistics are written there as JSON.
+    With checkpoint_path the canvas and the read position are saved after every checkpoint_every
+    instructions, resume continues from the saved checkpoint if there is one. The checkpoint
+    is removed when the run completes. region_index lets repeated fills of an area repaint it
+    without searching. With fill_workers large canvases are filled by that many processes, fills
+    the region index has not seen yet included.
+    output_format and compression choose the writer, see writer.open_writer. A compressed output
+    can not be truncated, so it can not be combined with a checkpoint. With undo_steps that many
+    latest commands can be undone by U and redone by Z instructions, a resumed run can not undo
+    commands from before the checkpoint. optimize skips commands of a final mode run which can
+    not change the final frame, what was skipped is added to the profile.
+    """
+    try:
+        file = open(input_path, 'rb' if checkpoint_path else 'r')
+    except FileNotFoundError:
+        return [CommandError(f'No such file or directory: "{input_path}"')]
+    with file:
+        try:
+            header = file.readline()
+            cleaned_data = parse_canvas(header.decode() if checkpoint_path else header)
+        except CommandError as error:
+            error.line_number = 1
+            return [error]
+        canvas = initialize_canvas(cleaned_data, backend)
+        profiler = None
+        if profile_path:
+            from instrumentation import Profiler
+            profiler = Profiler()
+        checkpointer = None
+        if checkpoint_path:
+            from checkpoint import Checkpointer, InstructionReader, read_checkpoint, truncate_output
+            first_line, offset, previous_errors = 2, len(header), []
+            if resume and os.path.exists(checkpoint_path):
+                try:
+                    saved = read_checkpoint(checkpoint_path, canvas)
+                    truncate_output(output_path, saved.output_size)
+                except CommandError as error:
+                    return [error]
+                first_line, offset, previous_errors = saved.line_number, saved.input_offset, saved.errors
+            reader = InstructionReader(file, offset)
+            checkpointer = Checkpointer(checkpoint_path, checkpoint_every, reader, first_line, previous_errors)
+            instructions = iter(reader)
+        else:
+            instructions = read_instructions(file)
+        index, parallel_fill, journal, optimizer = None, None, None, None
+        if fill_workers:
+            from parallel_fill import ParallelFill
+            parallel_fill = ParallelFill(fill_workers)
+        if region_index:
+            from region_index import RegionIndex
+            index = RegionIndex(flood_fill=parallel_fill.flood_fill if parallel_fill is not None else None)
+        if undo_steps:
+            from journal import Journal
+            journal = Journal(undo_steps)
+        if optimize and output_mode == 'final':
+            from optimizer import Optimizer
+            optimizer = Optimizer(profiler)
+        try:
+            with open_writer(output_path, flush_every, output_format, compression) as writer:
+                errors = run(writer, canvas, cleaned_data, instructions, output_mode, profiler, checkpointer,
+                             index, parallel_fill, journal, optimizer)
+        finally:
+            if parallel_fill is not None:
+                parallel_fill.close()
+        if profiler is not None:
+            sections = {'optimizer': optimizer.report()} if optimizer is not None else {}
+            profiler.dump(profile_path, **sections)
+        if checkpointer is not None:
+            checkpointer.remove()
+            errors = checkpointer.errors + errors
+        return errors
+
+
+def run(writer: FrameWriter, canvas, cleaned_data: tuple, instructions: Iterator[list],
+        output_mode: str, profiler: Optional['Profiler'] = None,
+        checkpointer: Optional['Checkpointer'] = None, region_index: Optional['RegionIndex'] = None,
+        parallel_fill: Optional['ParallelFill'] = None, journal: Optional['Journal'] = None,
+        optimizer: Optional['Optimizer'] = None) -> list:
+    """Executes instructions one by one as they are read and writes the results, returns errors.
+
+    In final mode nothing is written until the end, so consecutive lines and rectangles are
+    collected into a StrokeBatch and painted together right before the next fill.
+    A run resumed by the checkpointer starts at its line and does not write the first frame again.
+    The journal records every command as it is executed, so strokes are not batched with it.
+    The optimizer drops final mode commands before they are batched or executed, it wraps the
+    profiler, so a held fill executed later is not timed as a part of the command after it.
+    """
+    errors = []
+    batch = StrokeBatch() if output_mode == 'final' and journal is None else None
+    parse, apply, output, write_frame = parse_instruction, execute, output_command, writer.write_frame
+    add_stroke, flush_strokes = (batch.add, batch.flush) if batch is not None else (None, None)
+    if parallel_fill is not None:
+        apply = parallel_fill.wrap_execute(apply)
+    if region_index is not None:
+        apply = region_index.wrap_execute(apply)
+        if batch is not None:
+            add_stroke = region_index.wrap_stroke(add_stroke)
+    if journal is not None:
+        apply = journal.wrap_execute(apply)
+    if profiler is not None:
+        parse, apply = profiler.wrap_parse(parse), profiler.wrap_execute(apply)
+        output, write_frame = profiler.wrap_output(output, writer), profiler.wrap_output(write_frame, writer)
+        if batch is not None:
+            add_stroke, flush_strokes = profiler.wrap_draw(add_stroke), profiler.wrap_draw(flush_strokes)
+    if optimizer is not None and batch is not None:
+        apply, add_stroke = optimizer.wrap_execute(apply), optimizer.wrap_stroke(add_stroke)
+
+    first_line = 2
+    if checkpointer is not None:
+        first_line = checkpointer.first_line
+        instructions = checkpointer.track(instructions, canvas, writer, errors, flush_strokes)
+
+    if output_mode != 'final' and first_line == 2:
+        write_frame(canvas)
+
+    for line_number, instruction in enumerate(instructions, first_line):
+        try:
+            command = parse(instruction, cleaned_data)
+        except CommandError as error:
+            error.line_number = line_number
+            errors.append(error)
+            continue
+        if batch is not None:
+            if type(command) in (Line, Rectangle):
+                add_stroke(command)
+                if batch.is_full():
+                    flush_strokes(canvas)
+                continue
+            flush_strokes(canvas)
+        try:
+            apply(canvas, command)
+        except CommandError as error:
+            error.line_number = line_number
+            errors.append(error)
+            continue
+        output(writer, canvas, output_mode)
+
+    if profiler is not None:
+        profiler.commit()
+    if output_mode == 'final':
+        if optimizer is not None:
+            optimizer.finish()
+        if batch is not None:
+            flush_strokes(canvas)
+        write_frame(canvas)
+    return errors
 
 
-def main():
-    if canvas_instruction_validator():
-        cleaned_data = canvas_instruction_validator()
-        canvas = initialize_canvas(cleaned_data)
-        draw_into_output(canvas)
+def parse_arguments(arguments: list = None) -> 'argparse.Namespace':
+    import argparse
 
-        all_instructions = get_instructions()
-        if all_instructions:
+    parser = argparse.ArgumentParser(description='Draws instructions of the input file into the output file.')
+    parser.add_argument('--input', dest='input_path', default='input.txt',
+                        help='file with the canvas instruction and drawing commands (default: %(default)s)')
+    parser.add_argument('--output', dest='output_path', default='output.txt',
+                        help='file the frames are appended to (default: %(default)s)')
+    parser.add_argument('--output-mode', choices=OUTPUT_MODES, default='full',
+                        help='what is written after every command (default: %(default)s)')
+    parser.add_argument('--flush-every', type=int, default=1, metavar='FRAMES',
+                        help='flush the output after every FRAMES frames, 0 flushes only at the end '
+                             '(default: %(default)s)')
+    parser.add_argument('--backend', choices=BACKENDS, default='bytearray',
+                        help='canvas storage (default: %(default)s)')
+    parser.add_argument('--profile', dest='profile_path', metavar='PATH',
+                        help='write per command counts, latencies, cells and bytes as JSON to PATH')
+    parser.add_argument('--checkpoint', dest='checkpoint_path', metavar='PATH',
+                        help='save the canvas and the read position to PATH while running')
+    parser.add_argument('--checkpoint-every', type=int, default=10000, metavar='INSTRUCTIONS',
+                        help='instructions between two checkpoints (default: %(default)s)')
+    parser.add_argument('--resume', action='store_true',
+                        help='continue from the checkpoint at --checkpoint PATH if there is one')
+    parser.add_argument('--region-index', action='store_true',
+                        help='remember areas found by fills, so filling them again is a repaint')
+    parser.add_argument('--fill-workers', type=int, default=0, metavar='PROCESSES',
+                        help='fill canvases of over a million cells in bands by this many processes, '
+                             '0 fills in the main process (default: %(default)s)')
+    parser.add_argument('--output-format', choices=OUTPUT_FORMATS, default='text',
+                        help='text frames, or binary records with raw or run-length encoded cells '
+                             '(default: %(default)s)')
+    parser.add_argument('--compress', dest='compression', choices=sorted(COMPRESSIONS),
+                        help='compress the output while writing it, flush less often for a better ratio')
+    parser.add_argument('--undo-steps', type=int, default=0, metavar='STEPS',
+                        help='let U [n] and Z [n] instructions undo and redo up to STEPS latest commands '
+                             '(default: %(default)s)')
+    parser.add_argument('--optimize', action='store_true',
+                        help='skip commands which can not change the final frame, final output mode only')
+    parser.add_argument('--jobs', action='store_true',
+                        help='read the options of one job per line from stdin and run the jobs in this process, '
+                             'printing a JSON result line for each')
+    parsed = parser.parse_args(arguments)
+    if parsed.jobs and any(value != parser.get_default(name) for name, value in vars(parsed).items()
+                           if name != 'jobs'):
+        parser.error('--jobs takes the options of every job from its line.')
+    if parsed.optimize and (parsed.output_mode != 'final' or parsed.undo_steps or parsed.checkpoint_path):
+        parser.error('--optimize needs --output-mode final and can not be combined with --undo-steps '
+                     'or --checkpoint.')
+    if parsed.undo_steps < 0:
+        parser.error('--undo-steps must not be negative.')
+    if parsed.undo_steps and (parsed.region_index or parsed.fill_workers):
+        parser.error('--undo-steps can not be combined with --region-index or --fill-workers.')
+    if parsed.compression and parsed.checkpoint_path:
+        parser.error('--compress can not be combined with --checkpoint.')
+    if parsed.fill_workers < 0:
+        parser.error('--fill-workers must not be negative.')
+    if parsed.checkpoint_every < 1:
+        parser.error('--checkpoint-every must be positive.')
+    if parsed.resume and not parsed.checkpoint_path:
+        parser.error('--resume requires --checkpoint.')
+    try:
+        get_canvas_class(parsed.backend)
+    except ImportError as error:
+        parser.error(str(error))
+    return parsed
 
-            for instruction in all_instructions:
-                instruction = instruction.split()
-                if pre_validate_instruction(instruction):
-                    command, parameters = pre_validate_instruction(instruction)
 
-                    if command == 'L' and line_validator(cleaned_data, parameters):
-                        clean_parameters = line_validator(cleaned_data, parameters)
-                        add_line(canvas, clean_parameters)
-                        draw_into_output(canvas)
+def serve_jobs(lines: Iterable[str], output: TextIO) -> int:
+    """Runs a job of command line options per line in this process, returns number of failed jobs.
 
-                    elif command == 'R' and rectangle_validator(cleaned_data, parameters):
-                        clean_parameters = rectangle_validator(cleaned_data, parameters)
-                        coordinates = get_coordinates_to_draw_rect_with_addline_function(clean_parameters)
-                        add_rectangle(canvas, coordinates)
-                        draw_into_output(canvas)
+    Modules are imported and warmed up once for all the jobs. After every job one JSON line
+    is written to output and flushed: the line number of the job, its seconds, errors of the
+    instructions it skipped and its failure, the parser message of invalid options or the
+    exception which stopped it. Empty lines and # comments are skipped.
+    """
+    import json
+    import shlex
+    from contextlib import redirect_stderr, redirect_stdout
+    from io import StringIO
+    from time import perf_counter
 
-                    elif command == 'B' and flood_fill_validator(cleaned_data, parameters):
-                        pos_x, pos_y, color = flood_fill_validator(cleaned_data, parameters)
-                        to_flood_fill(canvas, pos_x, pos_y, color)
-                        draw_into_output(canvas)
+    failed = 0
+    for line_number, line in enumerate(lines, 1):
+        start, errors, failure = perf_counter(), [], None
+        messages = StringIO()
+        try:
+            arguments = shlex.split(line, comments=True)
+            if not arguments:
+                continue
+            with redirect_stdout(messages), redirect_stderr(messages):
+                options = vars(parse_arguments(arguments))
+            if options.pop('jobs'):
+                failure = '--jobs can not be an option of a job.'
+            else:
+                errors = [format_error(error) for error in main(**options)]
+        except SystemExit as exit:
+            failure = messages.getvalue().strip().splitlines()[-1] if exit.code else '--help is not a job.'
+        except Exception as error:
+            failure = f'{type(error).__name__}: {error}'
+        failed += failure is not None
+        output.write(json.dumps({'line': line_number, 'seconds': perf_counter() - start,
+                                 'errors': errors, 'failure': failure}) + '\n')
+        output.flush()
+    return failed
 
 
 if __name__ == '__main__':
-    main()
+    options = vars(parse_arguments())
+    if options.pop('jobs'):
+        sys.exit(1 if serve_jobs(sys.stdin, sys.stdout) else 0)
+    for error in main(**options):
+        print(f'ERROR! {format_error(error)}')
@@ -0,0 +1,52 @@
+import mmap
+import tempfile
+from typing import Optional
+
+from canvas import BLANK, Canvas
+
+
+class MmapCanvas(Canvas):
+    """Canvas stored in a memory mapped file laid out exactly like the rendered frame.
+
+    The border and the newlines are written into the file once, every row of cells is a
+    slice of a frame line, so stride is width + 3 and origin skips the top border and the
+    left "|". Lines and fills change the mapped bytes in place and a frame is written
+    straight from the mapping. Without a path the file is an anonymous temporary file,
+    so the canvas lives on disk and the system pages in only the parts which are used.
+    """
+
+    __slots__ = ('file',)
+
+    STREAMED = True
+
+    def __init__(self, width: int, height: int, path: Optional[str] = None) -> None:
+        self.width = width
+        self.height = height
+        self.stride = width + 3
+        self.origin = width + 4
+        self.file = open(path, 'w+b') if path else tempfile.TemporaryFile()
+        border = b'-' * (width + 2) + b'\n'
+        line = b'|' + BLANK.encode() * width + b'|\n'
+        self.file.write(border)
+        for _ in range(height):
+            self.file.write(line)
+        self.file.write(border)
+        self.file.flush()
+        self.cells = mmap.mmap(self.file.fileno(), self.frame_size())
+        self.dirty = None
+
+    def close(self) -> None:
+        """Writes the mapping back to the file and releases both."""
+        self.cells.flush()
+        self.cells.close()
+        self.file.close()
+
+    def render_into(self, frame: bytearray) -> None:
+        frame[:] = self.cells
+
+    def render(self) -> bytes:
+        return self.cells[:]
+
+    def frame_chunks(self):
+        """Yields the mapping itself, the frame is written without being copied."""
+        yield memoryview(self.cells)
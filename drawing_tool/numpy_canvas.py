@@ -0,0 +1,139 @@
+import numpy
+
+from canvas import BLANK, STROKE, Canvas, clip_box
+from fill import CONNECTIVITIES
+
+
+class NumpyCanvas(Canvas):
+    """Canvas stored in a (height, width) numpy.uint8 array.
+
+    Lines are slice assignments and the fill works on whole arrays, which pays off on
+    large canvases. Coordinates are 1-based like in Canvas.
+    """
+
+    __slots__ = ()
+
+    FLAT = False
+
+    def __init__(self, width: int, height: int) -> None:
+        self.width = width
+        self.height = height
+        self.stride = width
+        self.origin = 0
+        self.cells = numpy.full((height, width), ord(BLANK), dtype=numpy.uint8)
+        self.dirty = None
+
+    def get(self, cell_id: int, row_id: int) -> str:
+        return chr(self.cells[row_id - 1, cell_id - 1])
+
+    def set(self, cell_id: int, row_id: int, color: str) -> None:
+        self.cells[row_id - 1, cell_id - 1] = ord(color)
+        self.touch(cell_id, row_id, cell_id, row_id)
+
+    def hline(self, cell_1: int, cell_2: int, row_id: int, color: str = STROKE) -> None:
+        self.cells[row_id - 1, cell_1 - 1:cell_2] = ord(color)
+        self.touch(cell_1, row_id, cell_2, row_id)
+
+    def vline(self, cell_id: int, row_1: int, row_2: int, color: str = STROKE) -> None:
+        self.cells[row_1 - 1:row_2, cell_id - 1] = ord(color)
+        self.touch(cell_id, row_1, cell_id, row_2)
+
+    def fill_rect(self, left: int, top: int, right: int, bottom: int, color: str = STROKE) -> None:
+        box = clip_box((left, top, right, bottom), self.width, self.height)
+        if box is not None:
+            left, top, right, bottom = box
+            self.cells[top - 1:bottom, left - 1:right] = ord(color)
+            self.touch(left, top, right, bottom)
+
+    def flood_fill(self, cell_id: int, row_id: int, color: str, connectivity: int = 8) -> list:
+        """Fills the area connected to the cell, returns filled (row, left, right) spans.
+
+        Horizontal runs of the target color are labelled, runs of neighbouring rows that touch
+        each other are joined into connected components with whole-array union-find steps, and
+        the component of the seed run is recolored with one masked assignment.
+        """
+        if connectivity not in CONNECTIVITIES:
+            raise ValueError(f'Connectivity must be one of {CONNECTIVITIES}, got {connectivity}.')
+        target = self.cells[row_id - 1, cell_id - 1]
+        if target == ord(color):
+            return []
+        mask = self.cells == target
+        runs = label_runs(mask)
+        roots = join_components(runs, mask, connectivity)
+        region = roots[runs] == roots[runs[row_id - 1, cell_id - 1]]
+        region &= mask
+        self.cells[region] = ord(color)
+        spans = to_spans(region)
+        rows = numpy.flatnonzero(region.any(axis=1))
+        columns = numpy.flatnonzero(region.any(axis=0))
+        self.touch(int(columns[0]) + 1, int(rows[0]) + 1, int(columns[-1]) + 1, int(rows[-1]) + 1)
+        return spans
+
+    def row(self, row_id: int) -> bytes:
+        return self.cells[row_id - 1].tobytes()
+
+    def load_row(self, row_id: int, cells: bytes) -> None:
+        self.cells[row_id - 1] = numpy.frombuffer(cells, dtype=numpy.uint8)
+
+    def region(self, box: tuple) -> list:
+        left, top, right, bottom = box
+        return [row.tobytes() for row in self.cells[top - 1:bottom, left - 1:right]]
+
+    def render_into(self, frame: bytearray) -> None:
+        lines = numpy.frombuffer(frame, dtype=numpy.uint8).reshape(self.height + 2, self.width + 3)
+        lines[1:-1, 1:-2] = self.cells
+
+    def render(self) -> bytes:
+        lines = numpy.empty((self.height + 2, self.width + 3), dtype=numpy.uint8)
+        lines[:, -1] = ord('\n')
+        lines[[0, -1], :-1] = ord('-')
+        lines[1:-1, [0, -2]] = ord('|')
+        lines[1:-1, 1:-2] = self.cells
+        return lines.tobytes()
+
+
+def label_runs(mask: numpy.ndarray) -> numpy.ndarray:
+    """Gives every horizontal run of True cells its own positive label, other cells get 0."""
+    starts = mask.copy()
+    starts[:, 1:] &= ~mask[:, :-1]
+    dtype = numpy.int32 if mask.size < 2 ** 31 else numpy.int64
+    return numpy.cumsum(starts, axis=None, dtype=dtype).reshape(mask.shape) * mask
+
+
+def join_components(runs: numpy.ndarray, mask: numpy.ndarray, connectivity: int) -> numpy.ndarray:
+    """Returns root label of every run label, touching runs of neighbouring rows share a root."""
+    pairs = [(mask[:-1] & mask[1:], runs[:-1], runs[1:])]
+    if connectivity == 8:
+        pairs.append((mask[:-1, :-1] & mask[1:, 1:], runs[:-1, :-1], runs[1:, 1:]))
+        pairs.append((mask[:-1, 1:] & mask[1:, :-1], runs[:-1, 1:], runs[1:, :-1]))
+    first, second = [], []
+    for touching, upper, lower in pairs:
+        # Only the leftmost cell of every stretch where the same two runs touch makes an edge.
+        repeated = touching[:, :-1] & (upper[:, 1:] == upper[:, :-1]) & (lower[:, 1:] == lower[:, :-1])
+        touching[:, 1:] &= ~repeated
+        first.append(upper[touching])
+        second.append(lower[touching])
+    first, second = numpy.concatenate(first), numpy.concatenate(second)
+    roots = numpy.arange(int(runs.max()) + 1, dtype=runs.dtype)
+    while True:
+        first_roots, second_roots = roots[first], roots[second]
+        apart = first_roots != second_roots
+        if not apart.any():
+            return roots
+        first, second = first[apart], second[apart]
+        low = numpy.minimum(first_roots[apart], second_roots[apart])
+        high = numpy.maximum(first_roots[apart], second_roots[apart])
+        numpy.minimum.at(roots, high, low)
+        while True:
+            jumped = roots[roots]
+            if numpy.array_equal(jumped, roots):
+                break
+            roots = jumped
+
+
+def to_spans(region: numpy.ndarray) -> list:
+    """Returns 1-based (row, left, right) spans of True cells row by row."""
+    edges = numpy.diff(numpy.pad(region, ((0, 0), (1, 1))).astype(numpy.int8), axis=1)
+    rows, lefts = numpy.nonzero(edges == 1)
+    rights = numpy.nonzero(edges == -1)[1]
+    return [(int(row) + 1, int(left) + 1, int(right)) for row, left, right in zip(rows, lefts, rights)]
@@ -0,0 +1,178 @@
+from bisect import bisect_right
+from collections import Counter
+from typing import Optional
+
+from canvas import BLANK, STROKE
+from journal import stroke_boxes
+from validation import Diagonal, Fill, FilledRectangle
+
+
+class Strokes:
+    """Cells which are certainly painted by strokes, as merged segments per row and per column."""
+
+    def __init__(self) -> None:
+        self.rows = {}
+        self.columns = {}
+
+    def add(self, left: int, top: int, right: int, bottom: int) -> None:
+        if top == bottom:
+            insert(self.rows.setdefault(top, ([], [])), left, right)
+        else:
+            insert(self.columns.setdefault(left, ([], [])), top, bottom)
+
+    def covers(self, left: int, top: int, right: int, bottom: int) -> bool:
+        """Tells if every cell of the row or column segment is painted."""
+        if top == bottom and covers(self.rows.get(top), left, right):
+            return True
+        if left == right and covers(self.columns.get(left), top, bottom):
+            return True
+        return False
+
+
+def insert(segments: tuple, start: int, end: int) -> None:
+    """Adds the segment to sorted disjoint (starts, ends), joining the ones it overlaps or touches."""
+    starts, ends = segments
+    first = bisect_right(ends, start - 2)
+    last = bisect_right(starts, end + 1)
+    if first < last:
+        start, end = min(start, starts[first]), max(end, ends[last - 1])
+    starts[first:last] = [start]
+    ends[first:last] = [end]
+
+
+def covers(segments: Optional[tuple], start: int, end: int) -> bool:
+    if segments is None:
+        return False
+    starts, ends = segments
+    position = bisect_right(starts, start) - 1
+    return position >= 0 and ends[position] >= end
+
+
+class Optimizer:
+    """Drops commands of a final mode run which can not change the final frame.
+
+    Only facts which hold on every canvas the script can draw are used:
+
+    - a stroke is dropped if strokes since the last fill which could recolor "x" cells
+      already painted all of its cells,
+    - a fill is dropped if its seed certainly has the fill color already, the seed color is
+      known for stroke cells, the seeds of earlier fills and cells of a canvas no fill has
+      changed yet; a fill of a known color never changes cells of another color,
+    - a fill directly followed by a fill of the same seed is dropped if its color was not
+      on the canvas before it, its area is then exactly the area the next fill recolors.
+
+    The frame is only written after the last command, so nothing in between is observed.
+    A fill is held back until the next command shows whether it is needed, finish()
+    executes the held fill at the end of the run. With a profiler the held fill is set aside
+    by Profiler.hold, so its time and cells are recorded for it when it is executed or dropped.
+    """
+
+    def __init__(self, profiler=None) -> None:
+        self.profiler = profiler
+        self.strokes = Strokes()
+        self.known = {}
+        self.pristine = True
+        self.colors = {BLANK}
+        self.held = None
+        self.fresh = False
+        self.commands = 0
+        self.removed = Counter()
+        self.cells = 0
+
+    def color(self, cell_id: int, row_id: int) -> Optional[str]:
+        """Returns the color the cell certainly has, None if it is not known."""
+        if self.strokes.covers(cell_id, row_id, cell_id, row_id):
+            return STROKE
+        if (cell_id, row_id) in self.known:
+            return self.known[(cell_id, row_id)]
+        return BLANK if self.pristine else None
+
+    def keep_stroke(self, command) -> bool:
+        self.commands += 1
+        boxes = stroke_boxes(command)
+        if all(self.strokes.covers(*box) for box in boxes):
+            self.removed[type(command).__name__] += 1
+            self.cells += sum(right - left + bottom - top + 1 for left, top, right, bottom in boxes)
+            return False
+        for box in boxes:
+            self.strokes.add(*box)
+        self.colors.add(STROKE)
+        return True
+
+    def keep_fill(self, command: Fill) -> bool:
+        """Tells if the fill may change the canvas and learns what it does, drops the held fill it replaces."""
+        self.commands += 1
+        cell_id, row_id, color = command
+        target = self.color(cell_id, row_id)
+        if target == color:
+            self.removed['Fill'] += 1
+            return False
+        if self.held is not None and self.fresh and self.held[2][:2] == command[:2]:
+            self.removed['Fill'] += 1
+            self.held = None
+            if self.profiler is not None:
+                self.profiler.release()
+        if target is None or target == STROKE:
+            strokes, self.strokes = self.strokes, Strokes()
+            self.known = {cell: known for cell, known in self.known.items()
+                          if known != STROKE and not strokes.covers(*cell, *cell)}
+        if target is None:
+            self.known.clear()
+        elif target != STROKE:
+            self.known = {cell: known for cell, known in self.known.items() if known != target}
+        self.known[(cell_id, row_id)] = color
+        self.pristine = False
+        self.fresh = color not in self.colors
+        self.colors.add(color)
+        return True
+
+    def forget(self) -> None:
+        """Drops everything known about the canvas, for commands the optimizer does not follow."""
+        self.strokes, self.known, self.pristine = Strokes(), {}, False
+
+    def finish(self) -> None:
+        """Executes the held fill."""
+        if self.held is not None:
+            (execute, canvas, command), self.held = self.held, None
+            if self.profiler is not None:
+                self.profiler.release(execute, canvas, command)
+            else:
+                execute(canvas, command)
+
+    def wrap_execute(self, execute):
+        """Wraps main.execute, a fill is held back and other commands are executed after the held fill.
+
+        Filled rectangles and diagonals are strokes which are not batched.
+        """
+        def optimized_execute(canvas, command):
+            if type(command) in (FilledRectangle, Diagonal):
+                if self.keep_stroke(command):
+                    self.finish()
+                    return execute(canvas, command)
+                return None
+            if type(command) is not Fill:
+                self.finish()
+                self.forget()
+                return execute(canvas, command)
+            if self.keep_fill(command):
+                self.finish()
+                self.held = execute, canvas, command
+                if self.profiler is not None:
+                    self.profiler.hold()
+            return 0
+        return optimized_execute
+
+    def wrap_stroke(self, add_stroke):
+        """Wraps StrokeBatch.add, a stroke which is kept goes after the held fill."""
+        def optimized_add(command):
+            if self.keep_stroke(command):
+                self.finish()
+                add_stroke(command)
+        return optimized_add
+
+    def report(self) -> dict:
+        return {
+            'commands': self.commands,
+            'removed': dict(sorted(self.removed.items())),
+            'stroke_cells_saved': self.cells,
+        }
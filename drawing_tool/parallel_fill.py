@@ -0,0 +1,163 @@
+"""Flood fill of large canvases split into horizontal bands handled by worker processes.
+
+The cells are copied into shared memory once. Every worker first finds the connected areas
+of the target color inside its band, the areas of neighbouring bands which touch across
+the band edge are joined, and then every band fills the areas joined with the area of
+the seed cell. The result is the same as of Canvas.flood_fill.
+"""
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Optional
+
+from fill import CONNECTIVITIES, scanline_fill
+from validation import Fill
+
+# Smaller canvases are filled in this process, starting the workers would cost more.
+PARALLEL_CELLS = 2 ** 20
+
+
+class ParallelFill:
+    """Process pool filling canvases stored in one buffer, other canvases are filled as usual."""
+
+    def __init__(self, workers: Optional[int] = None, min_cells: int = PARALLEL_CELLS) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.min_cells = min_cells
+        self.executor = ProcessPoolExecutor(self.workers)
+
+    def __enter__(self) -> 'ParallelFill':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.executor.shutdown()
+
+    def flood_fill(self, canvas, cell_id: int, row_id: int, color: str, connectivity: int = 8) -> list:
+        """Fills like canvas.flood_fill and returns filled 1-based (row, left, right) spans."""
+        if (not isinstance(canvas.cells, (bytearray, mmap.mmap)) or canvas.width * canvas.height < self.min_cells
+                or canvas.height < 2):
+            return canvas.flood_fill(cell_id, row_id, color, connectivity)
+        if connectivity not in CONNECTIVITIES:
+            raise ValueError(f'Connectivity must be one of {CONNECTIVITIES}, got {connectivity}.')
+        target, value = canvas.cells[canvas.index(cell_id, row_id)], ord(color)
+        if target == value:
+            return []
+        bands = min(self.workers, canvas.height)
+        edges = [canvas.height * band // bands for band in range(bands + 1)]
+        size = len(canvas.cells)
+        memory = shared_memory.SharedMemory(create=True, size=size)
+        try:
+            memory.buf[:size] = canvas.cells
+            layout = memory.name, canvas.origin, canvas.stride, canvas.width
+            seed_band = next(band for band in range(bands) if edges[band] <= row_id - 1 < edges[band + 1])
+            labelled = list(self.executor.map(
+                label_band, *zip(*[(*layout, edges[band], edges[band + 1], target, value, connectivity,
+                                    (cell_id - 1, row_id - 1) if band == seed_band else None)
+                                   for band in range(bands)])))
+            seeds = joined_seeds(labelled, 1 if connectivity == 8 else 0, seed_band)
+            jobs = [(*layout, edges[band], edges[band + 1], seeds[band], target, value, connectivity)
+                    for band in range(bands) if seeds[band]]
+            spans = [span for band_spans in self.executor.map(fill_band, *zip(*jobs)) for span in band_spans]
+            canvas.cells[:] = memory.buf[:size]
+        finally:
+            memory.close()
+            memory.unlink()
+        canvas.touch(min(left for _, left, _ in spans) + 1, min(row for row, _, _ in spans) + 1,
+                     max(right for _, _, right in spans) + 1, max(row for row, _, _ in spans) + 1)
+        return [(row + 1, left + 1, right + 1) for row, left, right in spans]
+
+    def wrap_execute(self, execute):
+        """Wraps main.execute, fills go through the workers."""
+        def parallel_execute(canvas, command):
+            if type(command) is Fill:
+                spans = self.flood_fill(canvas, *command)
+                return sum(right - left + 1 for _, left, right in spans)
+            return execute(canvas, command)
+        return parallel_execute
+
+
+def copy_band(name: str, origin: int, stride: int, width: int, first_row: int, last_row: int) -> tuple:
+    """Returns the shared memory and a copy of rows first_row to last_row - 1 with their position."""
+    memory = shared_memory.SharedMemory(name)
+    start = origin + first_row * stride
+    end = origin + (last_row - 1) * stride + width
+    return memory, bytearray(memory.buf[start:end]), start, end
+
+
+def label_band(name: str, origin: int, stride: int, width: int, first_row: int, last_row: int,
+               target: int, marker: int, connectivity: int, seed: Optional[tuple]) -> tuple:
+    """Finds connected areas of target cells in a copy of the band, nothing is written back.
+
+    Returns (areas, seed area), an area is (cell, row) of one of its cells counted from the band
+    start with its spans on the first and on the last row of the band, seed area is the index
+    of the area holding the seed.
+    """
+    memory, band, _, _ = copy_band(name, origin, stride, width, first_row, last_row)
+    memory.close()
+    height = last_row - first_row
+    search = re.compile(re.escape(bytes((target,)))).search
+    seed_position = None if seed is None else (seed[1] - first_row) * stride + seed[0]
+    areas, seed_area = [], None
+    for row in range(height):
+        start = row * stride
+        end = start + width
+        match = search(band, start, end)
+        while match:
+            spans = scanline_fill(band, 0, stride, width, height, [(match.start() - start, row)], target, marker,
+                                  connectivity)
+            areas.append(((match.start() - start, row),
+                          [(left, right) for span_row, left, right in spans if span_row == 0],
+                          [(left, right) for span_row, left, right in spans if span_row == height - 1]))
+            if seed_area is None and seed_position is not None and band[seed_position] == marker:
+                seed_area = len(areas) - 1
+            match = search(band, match.end(), end)
+    return areas, seed_area
+
+
+def joined_seeds(labelled: list, reach: int, seed_band: int) -> list:
+    """Joins areas touching across band edges, returns seeds of the areas joined with the seed area per band."""
+    offsets, total = [], 0
+    for areas, _ in labelled:
+        offsets.append(total)
+        total += len(areas)
+    parent = list(range(total))
+
+    def find(area: int) -> int:
+        while parent[area] != area:
+            parent[area] = parent[parent[area]]
+            area = parent[area]
+        return area
+
+    for band in range(len(labelled) - 1):
+        upper = sorted((left, right, offsets[band] + area)
+                       for area, (_, _, bottom) in enumerate(labelled[band][0]) for left, right in bottom)
+        lower = sorted((left, right, offsets[band + 1] + area)
+                       for area, (_, top, _) in enumerate(labelled[band + 1][0]) for left, right in top)
+        upper_index = lower_index = 0
+        while upper_index < len(upper) and lower_index < len(lower):
+            upper_left, upper_right, upper_area = upper[upper_index]
+            lower_left, lower_right, lower_area = lower[lower_index]
+            if upper_left <= lower_right + reach and lower_left <= upper_right + reach:
+                parent[find(upper_area)] = find(lower_area)
+            if upper_right < lower_right:
+                upper_index += 1
+            else:
+                lower_index += 1
+
+    root = find(offsets[seed_band] + labelled[seed_band][1])
+    return [[cell for area, (cell, _, _) in enumerate(areas) if find(offsets[band] + area) == root]
+            for band, (areas, _) in enumerate(labelled)]
+
+
+def fill_band(name: str, origin: int, stride: int, width: int, first_row: int, last_row: int, seeds: list,
+              target: int, color: int, connectivity: int) -> list:
+    """Fills areas of the seeds inside the band in shared memory, returns 0-based spans."""
+    memory, band, start, end = copy_band(name, origin, stride, width, first_row, last_row)
+    spans = scanline_fill(band, 0, stride, width, last_row - first_row, seeds, target, color, connectivity)
+    memory.buf[start:end] = band
+    memory.close()
+    return [(row + first_row, left, right) for row, left, right in spans]
@@ -0,0 +1,156 @@
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import compress
+from typing import Callable, Optional
+
+from batch import merge_segments
+from validation import Fill, Redo, Undo
+
+
+class Component:
+    """Cells of one maximal connected area of a single color, kept as merged spans per row."""
+
+    __slots__ = ('color', 'connectivity', 'rows', 'box', 'cells', 'borders')
+
+    def __init__(self, color: str, connectivity: int, spans: list) -> None:
+        rows = {}
+        for row_id, left, right in spans:
+            rows.setdefault(row_id, []).append((left, right))
+        self.rows = {row_id: [tuple(span) for span in merge_segments(segments)] for row_id, segments in rows.items()}
+        self.color = color
+        self.connectivity = connectivity
+        self.box = (min(left for _, left, _ in spans), min(rows), max(right for _, _, right in spans), max(rows))
+        self.cells = sum(right - left + 1 for _, left, right in spans)
+        self.borders = None
+
+    def __contains__(self, cell: tuple) -> bool:
+        cell_id, row_id = cell
+        return self.covers(row_id, cell_id, cell_id)
+
+    def reaches(self, box: tuple) -> bool:
+        """Tells if the box overlaps the component or the cells around it."""
+        left, top, right, bottom = self.box
+        return not (box[2] < left - 1 or box[0] > right + 1 or box[3] < top - 1 or box[1] > bottom + 1)
+
+    def border_colors(self, canvas) -> set:
+        """Returns colors of the cells next to the component which are not part of it.
+
+        Cells next to the spans of a row and of the rows around it are marked in a bytearray,
+        the spans themselves are unmarked and the colors of the marked cells are collected.
+        """
+        reach = 1 if self.connectivity == 8 else 0
+        width, rows = canvas.width, self.rows
+        ones, zeros = b'\1' * (width + 2), bytes(width + 2)
+        colors = set()
+        top, bottom = max(self.box[1] - 1, 1), min(self.box[3] + 1, canvas.height)
+        for row_id in range(top, bottom + 1):
+            marks = bytearray(width + 2)
+            for step, grow in ((-1, reach), (0, 1), (1, reach)):
+                for left, right in rows.get(row_id + step, ()):
+                    marks[left - grow:right + grow + 1] = ones[:right - left + 1 + 2 * grow]
+            for left, right in rows.get(row_id, ()):
+                marks[left:right + 1] = zeros[:right - left + 1]
+            colors.update(chr(cell) for cell in compress(canvas.row(row_id), marks[1:width + 1]))
+        return colors
+
+    def covers(self, row_id: int, left: int, right: int) -> bool:
+        """Tells if cells from left to right of the row all belong to the component."""
+        segments = self.rows.get(row_id)
+        if not segments:
+            return False
+        position = bisect_right(segments, (left, float('inf'))) - 1
+        return position >= 0 and segments[position][1] >= right
+
+    def spans(self) -> list:
+        return [(row_id, left, right) for row_id, segments in self.rows.items() for left, right in segments]
+
+
+class RegionIndex:
+    """Remembers the connected areas bucket fills have found, so a later fill of one is a plain repaint.
+
+    After a fill the filled area is kept if it is a whole area of its new color. A component
+    stays valid as long as nothing is drawn on it or on the cells around it, so every stroke
+    and fill drops the components its box reaches. A fill seeded inside a kept component with
+    the same connectivity recolors its spans without searching the canvas.
+    Only the `limit` most recently used components are kept. Fills which miss search the canvas
+    with flood_fill(canvas, cell_id, row_id, color, connectivity), ParallelFill.flood_fill for
+    one, or with canvas.flood_fill when it is not given.
+    """
+
+    def __init__(self, limit: int = 64, flood_fill: Optional[Callable] = None) -> None:
+        self.limit = limit
+        self.flood_fill = flood_fill
+        self.components = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def find(self, cell_id: int, row_id: int, connectivity: int):
+        for key, component in self.components.items():
+            if component.connectivity == connectivity and (cell_id, row_id) in component:
+                self.components.move_to_end(key)
+                return component
+        return None
+
+    def forget(self, box: tuple) -> None:
+        """Drops components the box of changed cells reaches."""
+        for key in [key for key, component in self.components.items() if component.reaches(box)]:
+            del self.components[key]
+
+    def remember(self, canvas, component: Component) -> None:
+        """Keeps the component if it is a whole area of its color.
+
+        Cells around a kept component do not change, so their colors are collected only once.
+        """
+        if component.borders is None:
+            component.borders = component.border_colors(canvas)
+        if component.color not in component.borders:
+            self.components[id(component)] = component
+            while len(self.components) > self.limit:
+                self.components.popitem(last=False)
+
+    def fill(self, canvas, cell_id: int, row_id: int, color: str, connectivity: int = 8) -> int:
+        """Fills like functions.to_flood_fill and returns number of filled cells."""
+        component = self.find(cell_id, row_id, connectivity)
+        if component is None:
+            self.misses += 1
+            if self.flood_fill is None:
+                spans = canvas.flood_fill(cell_id, row_id, color, connectivity)
+            else:
+                spans = self.flood_fill(canvas, cell_id, row_id, color, connectivity)
+            if not spans:
+                return 0
+            component = Component(color, connectivity, spans)
+        else:
+            self.hits += 1
+            if component.color == color:
+                return 0
+            spans = component.spans()
+            for row_id, left, right in spans:
+                canvas.hline(left, right, row_id, color)
+            component.color = color
+        self.forget(component.box)
+        self.remember(canvas, component)
+        return component.cells
+
+    def wrap_execute(self, execute):
+        """Wraps main.execute, fills go through the index and strokes drop the components they reach."""
+        def indexed_execute(canvas, command):
+            if type(command) is Fill:
+                return self.fill(canvas, *command)
+            if type(command) not in (Undo, Redo):
+                self.forget(command_box(command))
+            return execute(canvas, command)
+        return indexed_execute
+
+    def wrap_stroke(self, add_stroke):
+        """Wraps StrokeBatch.add, a batched stroke is painted before the next fill anyway."""
+        def indexed_add(command):
+            self.forget(command_box(command))
+            return add_stroke(command)
+        return indexed_add
+
+
+def command_box(command) -> tuple:
+    """Returns (left, top, right, bottom) box of a stroke."""
+    cell_1, row_1, cell_2, row_2 = command
+    return min(cell_1, cell_2), min(row_1, row_2), max(cell_1, cell_2), max(row_1, row_2)
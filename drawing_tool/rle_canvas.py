@@ -0,0 +1,161 @@
+import re
+from bisect import bisect_right
+
+from canvas import BLANK, STROKE, Canvas, clip_box
+from fill import CONNECTIVITIES
+
+RUNS = re.compile(rb'(.)\1*', re.DOTALL)
+
+
+class RleCanvas(Canvas):
+    """Canvas storing every row as runs of one color.
+
+    A row is a pair of lists, 0-based starts of its runs and their colors, a run lasts until
+    the start of the next one or the end of the row and neighbouring runs always differ in
+    color. Lines are interval insertions, the fill walks whole runs and a row is expanded
+    only when it is rendered, so memory and time grow with the number of runs instead of
+    the canvas width. Coordinates are 1-based like in Canvas.
+    """
+
+    __slots__ = ()
+
+    FLAT = False
+
+    def __init__(self, width: int, height: int) -> None:
+        self.width = width
+        self.height = height
+        self.stride = width
+        self.origin = 0
+        self.cells = [([0], [ord(BLANK)]) for _ in range(height)]
+        self.dirty = None
+
+    def runs(self) -> int:
+        """Returns number of runs of all rows."""
+        return sum(len(starts) for starts, _ in self.cells)
+
+    def paint(self, row_id: int, left: int, end: int, value: int) -> None:
+        """Gives cells from 0-based left to end - 1 of the row one color and merges equal neighbours."""
+        starts, colors = self.cells[row_id - 1]
+        first = bisect_right(starts, left) - 1
+        last = bisect_right(starts, end - 1) - 1
+        new_starts, new_colors = [left], [value]
+        if end < self.width and (last + 1 == len(starts) or starts[last + 1] != end):
+            new_starts.append(end)
+            new_colors.append(colors[last])
+        if starts[first] < left:
+            first += 1
+        starts[first:last + 1] = new_starts
+        colors[first:last + 1] = new_colors
+        if first + 1 < len(starts) and colors[first + 1] == value:
+            del starts[first + 1], colors[first + 1]
+        if first > 0 and colors[first - 1] == value:
+            del starts[first], colors[first]
+
+    def get(self, cell_id: int, row_id: int) -> str:
+        starts, colors = self.cells[row_id - 1]
+        return chr(colors[bisect_right(starts, cell_id - 1) - 1])
+
+    def set(self, cell_id: int, row_id: int, color: str) -> None:
+        self.paint(row_id, cell_id - 1, cell_id, ord(color))
+        self.touch(cell_id, row_id, cell_id, row_id)
+
+    def hline(self, cell_1: int, cell_2: int, row_id: int, color: str = STROKE) -> None:
+        """Inserts one run into the row."""
+        self.paint(row_id, cell_1 - 1, cell_2, ord(color))
+        self.touch(cell_1, row_id, cell_2, row_id)
+
+    def vline(self, cell_id: int, row_1: int, row_2: int, color: str = STROKE) -> None:
+        value = ord(color)
+        for row_id in range(row_1, row_2 + 1):
+            self.paint(row_id, cell_id - 1, cell_id, value)
+        self.touch(cell_id, row_1, cell_id, row_2)
+
+    def fill_rect(self, left: int, top: int, right: int, bottom: int, color: str = STROKE) -> None:
+        """Inserts one run into every row of the box."""
+        box = clip_box((left, top, right, bottom), self.width, self.height)
+        if box is not None:
+            left, top, right, bottom = box
+            value = ord(color)
+            for row_id in range(top, bottom + 1):
+                self.paint(row_id, left - 1, right, value)
+            self.touch(left, top, right, bottom)
+
+    def flood_fill(self, cell_id: int, row_id: int, color: str, connectivity: int = 8) -> list:
+        """Fills the area connected to the cell run by run, returns filled (row, left, right) spans.
+
+        Runs of the target color in the neighbouring rows which overlap a filled run, widened by
+        one cell for 8-connectivity, are found by bisection and visited once. The runs are
+        recolored when the whole area is known.
+        """
+        if connectivity not in CONNECTIVITIES:
+            raise ValueError(f'Connectivity must be one of {CONNECTIVITIES}, got {connectivity}.')
+        starts, colors = self.cells[row_id - 1]
+        run = bisect_right(starts, cell_id - 1) - 1
+        target, value = colors[run], ord(color)
+        if target == value:
+            return []
+        reach = 1 if connectivity == 8 else 0
+        width, last_row = self.width, self.height - 1
+        seen = {(row_id - 1, run)}
+        stack = [(row_id - 1, run)]
+        spans = []
+        while stack:
+            row, run = stack.pop()
+            starts = self.cells[row][0]
+            left = starts[run]
+            end = starts[run + 1] if run + 1 < len(starts) else width
+            spans.append((row, left, end - 1))
+            low, high = left - reach, end - 1 + reach
+            for next_row in (row - 1, row + 1):
+                if not 0 <= next_row <= last_row:
+                    continue
+                next_starts, next_colors = self.cells[next_row]
+                next_run = max(bisect_right(next_starts, low) - 1, 0)
+                while next_run < len(next_starts) and next_starts[next_run] <= high:
+                    if next_colors[next_run] == target and (next_row, next_run) not in seen:
+                        seen.add((next_row, next_run))
+                        stack.append((next_row, next_run))
+                    next_run += 1
+        for row, left, right in spans:
+            self.paint(row + 1, left, right + 1, value)
+        self.touch(min(left for _, left, _ in spans) + 1, min(row for row, _, _ in spans) + 1,
+                   max(right for _, _, right in spans) + 1, max(row for row, _, _ in spans) + 1)
+        return [(row + 1, left + 1, right + 1) for row, left, right in spans]
+
+    def row_part(self, row_id: int, left: int, right: int) -> bytes:
+        """Expands cells from left to right of the row."""
+        starts, colors = self.cells[row_id - 1]
+        run = bisect_right(starts, left - 1) - 1
+        parts = []
+        position = left - 1
+        while position < right:
+            end = min(starts[run + 1] if run + 1 < len(starts) else self.width, right)
+            parts.append(bytes((colors[run],)) * (end - position))
+            position = end
+            run += 1
+        return b''.join(parts)
+
+    def row(self, row_id: int) -> bytes:
+        return self.row_part(row_id, 1, self.width)
+
+    def load_row(self, row_id: int, cells: bytes) -> None:
+        starts, colors = [], []
+        for run in RUNS.finditer(cells):
+            starts.append(run.start())
+            colors.append(cells[run.start()])
+        self.cells[row_id - 1] = starts, colors
+
+    def region(self, box: tuple) -> list:
+        left, top, right, bottom = box
+        return [self.row_part(row_id, left, right) for row_id in range(top, bottom + 1)]
+
+    def render_into(self, frame: bytearray) -> None:
+        """Expands the runs of every row straight into its line of the frame."""
+        line, width = self.width + 3, self.width
+        position = line + 1
+        for starts, colors in self.cells:
+            ends = starts[1:]
+            ends.append(width)
+            for start, end, color in zip(starts, ends, colors):
+                frame[position + start:position + end] = bytes((color,)) * (end - start)
+            position += line
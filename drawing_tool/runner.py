@@ -0,0 +1,151 @@
+"""Runs many instruction files across worker processes and reports throughput and errors.
+
+Run from the drawing_tool directory: python runner.py jobs/ --workers 8 --report report.json
+The source is either a directory, every *.txt file of which is a job, or a manifest with
+one "input_path [output_path]" per line, relative paths are relative to the manifest.
+"""
+import argparse
+import json
+import os
+import sys
+from collections import namedtuple
+from functools import partial
+from time import perf_counter
+from typing import Optional
+
+from backends import BACKENDS, get_canvas_class
+from main import OUTPUT_MODES, format_error, main
+
+Job = namedtuple('Job', 'input_path output_path')
+JobResult = namedtuple('JobResult', 'input_path output_path seconds bytes_written errors failure')
+
+OUTPUT_SUFFIX = '.output.txt'
+
+
+def output_path_of(input_path: str, output_dir: Optional[str] = None) -> str:
+    """Returns default output path of the input, next to it unless output_dir is given."""
+    directory, name = os.path.split(input_path)
+    return os.path.join(output_dir or directory, os.path.splitext(name)[0] + OUTPUT_SUFFIX)
+
+
+def collect_jobs(source: str, output_dir: Optional[str] = None) -> list:
+    """Returns jobs of a directory of *.txt files or of a manifest file."""
+    if os.path.isdir(source):
+        return [Job(os.path.join(source, name), output_path_of(os.path.join(source, name), output_dir))
+                for name in sorted(os.listdir(source))
+                if name.endswith('.txt') and not name.endswith(OUTPUT_SUFFIX)]
+    base = os.path.dirname(source)
+    jobs = []
+    with open(source, 'r') as file:
+        for line in file:
+            paths = line.split()
+            if not paths or paths[0].startswith('#'):
+                continue
+            input_path = os.path.join(base, paths[0])
+            if len(paths) > 1:
+                output_path = os.path.join(output_dir or base, paths[1])
+            else:
+                output_path = output_path_of(input_path, output_dir)
+            jobs.append(Job(input_path, output_path))
+    return jobs
+
+
+def run_job(job: Job, output_mode: str = 'full', backend: str = 'bytearray',
+            flush_every: int = 0) -> JobResult:
+    """Draws one job into its own output file, which is truncated first.
+
+    Skipped instructions are reported as errors, an exception which stopped the job is its failure.
+    """
+    start = perf_counter()
+    errors, failure = [], None
+    try:
+        open(job.output_path, 'w').close()
+        errors = [format_error(error)
+                  for error in main(job.input_path, job.output_path, output_mode, flush_every, backend)]
+    except Exception as error:
+        failure = f'{type(error).__name__}: {error}'
+    bytes_written = os.path.getsize(job.output_path) if os.path.exists(job.output_path) else 0
+    return JobResult(job.input_path, job.output_path, perf_counter() - start, bytes_written, errors, failure)
+
+
+def run_batch(jobs: list, workers: int = 1, chunk_size: int = 1, **options) -> list:
+    """Runs the jobs and returns their results in the order of the jobs.
+
+    Jobs are sent to the workers in chunks of chunk_size to save round trips on small jobs,
+    one worker runs them in this process without a pool.
+    """
+    execute = partial(run_job, **options)
+    if workers == 1:
+        return [execute(job) for job in jobs]
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(workers) as executor:
+        return list(executor.map(execute, jobs, chunksize=chunk_size))
+
+
+def report(results: list, seconds: float) -> dict:
+    """Aggregates results of a batch which took seconds of wall time."""
+    bytes_written = sum(result.bytes_written for result in results)
+    return {
+        'jobs': len(results),
+        'failed_jobs': sum(result.failure is not None for result in results),
+        'jobs_with_errors': sum(bool(result.errors) for result in results),
+        'instruction_errors': sum(len(result.errors) for result in results),
+        'wall_seconds': seconds,
+        'job_seconds': sum(result.seconds for result in results),
+        'jobs_per_second': len(results) / seconds if seconds else 0.0,
+        'bytes_written': bytes_written,
+        'megabytes_per_second': bytes_written / seconds / 10 ** 6 if seconds else 0.0,
+        'errors': {result.input_path: ([result.failure] if result.failure else []) + result.errors
+                   for result in results if result.failure or result.errors},
+    }
+
+
+def parse_arguments(arguments: list = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Draws many instruction files in parallel.')
+    parser.add_argument('source', help='directory of *.txt instruction files or a manifest of them')
+    parser.add_argument('--output-dir', help='where output files go (default: next to every input)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='number of worker processes (default: %(default)s)')
+    parser.add_argument('--chunk-size', type=int, default=4, metavar='JOBS',
+                        help='jobs sent to a worker at once (default: %(default)s)')
+    parser.add_argument('--output-mode', choices=OUTPUT_MODES, default='full',
+                        help='what is written after every command (default: %(default)s)')
+    parser.add_argument('--backend', choices=BACKENDS, default='bytearray',
+                        help='canvas storage (default: %(default)s)')
+    parser.add_argument('--report', dest='report_path', metavar='PATH',
+                        help='write the aggregate report as JSON to PATH')
+    parsed = parser.parse_args(arguments)
+    if parsed.workers < 1 or parsed.chunk_size < 1:
+        parser.error('--workers and --chunk-size must be positive.')
+    try:
+        get_canvas_class(parsed.backend)
+    except ImportError as error:
+        parser.error(str(error))
+    return parsed
+
+
+def run(arguments: list = None) -> int:
+    """Runs the batch from command line arguments, returns the exit status."""
+    parsed = parse_arguments(arguments)
+    jobs = collect_jobs(parsed.source, parsed.output_dir)
+    if parsed.output_dir:
+        os.makedirs(parsed.output_dir, exist_ok=True)
+    start = perf_counter()
+    results = run_batch(jobs, parsed.workers, parsed.chunk_size,
+                        output_mode=parsed.output_mode, backend=parsed.backend)
+    summary = report(results, perf_counter() - start)
+    if parsed.report_path:
+        with open(parsed.report_path, 'w') as file:
+            json.dump(summary, file, indent=2)
+            file.write('\n')
+    print(f'{summary["jobs"]} jobs in {summary["wall_seconds"]:.2f}s ({summary["jobs_per_second"]:.1f} jobs/s), '
+          f'{summary["failed_jobs"]} failed, {summary["instruction_errors"]} instruction errors')
+    for input_path, errors in summary['errors'].items():
+        for error in errors:
+            print(f'ERROR! {input_path}: {error}')
+    return 1 if summary['failed_jobs'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(run())
@@ -0,0 +1,136 @@
+"""Drawing sessions over a Unix or localhost TCP socket, canvases stay in memory between commands.
+
+Run from the drawing_tool directory: python server.py --unix /tmp/drawing.sock
+A client opens a session with the "C w h" line and then sends one instruction per line.
+Frames or diffs come back in the format of the output file and a skipped instruction is
+answered with an "ERROR! ..." line. "U [n]" and "Z [n]" undo and redo the latest commands.
+In final mode the frame is sent when the client closes its side of the connection.
+"""
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Optional
+
+from backends import BACKENDS, get_canvas_class
+from functions import initialize_canvas
+from journal import UNDO_STEPS, Journal
+from main import OUTPUT_MODES, execute, output_command
+from validation import CommandError, Fill, parse_canvas, parse_instruction
+from writer import FrameWriter
+
+MAX_CELLS = 10 ** 8
+# Fills of smaller canvases are cheaper to run in the event loop than to hand to a thread.
+OFFLOAD_CELLS = 2 ** 16
+
+
+class StreamFile:
+    """The part of a binary file FrameWriter uses, writing into an asyncio stream.
+
+    Flushing is left to the session which drains the stream after every command.
+    """
+
+    def __init__(self, stream: asyncio.StreamWriter) -> None:
+        self.write = stream.write
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+async def handle_session(reader: asyncio.StreamReader, stream: asyncio.StreamWriter, executor: ThreadPoolExecutor,
+                         output_mode: str = 'full', backend: str = 'bytearray', max_cells: int = MAX_CELLS,
+                         undo_steps: int = UNDO_STEPS) -> None:
+    """Runs one session, commands of a session are executed one after another and can be undone."""
+    try:
+        try:
+            cleaned_data = parse_canvas((await reader.readline()).decode())
+        except CommandError as error:
+            stream.write(f'ERROR! {error}\n'.encode())
+            return
+        if cleaned_data[0] * cleaned_data[1] > max_cells:
+            stream.write(f'ERROR! Canvas is larger than {max_cells} cells.\n'.encode())
+            return
+        canvas = initialize_canvas(cleaned_data, backend)
+        offload = cleaned_data[0] * cleaned_data[1] >= OFFLOAD_CELLS
+        loop = asyncio.get_running_loop()
+        apply = Journal(undo_steps).wrap_execute(execute) if undo_steps else execute
+        writer = FrameWriter(file=StreamFile(stream), flush_every=0)
+        if output_mode != 'final':
+            writer.write_frame(canvas)
+            await stream.drain()
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                command = parse_instruction(line.decode().split(), cleaned_data)
+                if offload and type(command) is Fill:
+                    await loop.run_in_executor(executor, apply, canvas, command)
+                else:
+                    apply(canvas, command)
+            except CommandError as error:
+                stream.write(f'ERROR! {error}\n'.encode())
+            else:
+                output_command(writer, canvas, output_mode)
+            await stream.drain()
+        if output_mode == 'final':
+            writer.write_frame(canvas)
+    except ConnectionError:
+        pass
+    finally:
+        try:
+            await stream.drain()
+        except ConnectionError:
+            pass
+        stream.close()
+
+
+async def start_server(unix_path: Optional[str] = None, host: str = '127.0.0.1', port: int = 0,
+                       executor: Optional[ThreadPoolExecutor] = None, **options) -> asyncio.AbstractServer:
+    """Starts listening on the Unix socket if a path is given, otherwise on the TCP port."""
+    handle = partial(handle_session, executor=executor, **options)
+    if unix_path:
+        return await asyncio.start_unix_server(handle, unix_path)
+    return await asyncio.start_server(handle, host, port)
+
+
+async def serve(unix_path: Optional[str], host: str, port: int, workers: Optional[int], **options) -> None:
+    with ThreadPoolExecutor(workers) as executor:
+        server = await start_server(unix_path, host, port, executor, **options)
+        print('Listening on', ', '.join(str(socket.getsockname()) for socket in server.sockets))
+        async with server:
+            await server.serve_forever()
+
+
+def parse_arguments(arguments: list = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Serves drawing sessions over a socket.')
+    parser.add_argument('--unix', dest='unix_path', metavar='PATH', help='listen on a Unix socket at PATH')
+    parser.add_argument('--host', default='127.0.0.1', help='TCP host (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=8765, help='TCP port (default: %(default)s)')
+    parser.add_argument('--output-mode', choices=OUTPUT_MODES, default='full',
+                        help='what is sent after every command (default: %(default)s)')
+    parser.add_argument('--backend', choices=BACKENDS, default='bytearray',
+                        help='canvas storage (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='threads running large fills (default: chosen by ThreadPoolExecutor)')
+    parser.add_argument('--max-cells', type=int, default=MAX_CELLS,
+                        help='largest canvas a session may open (default: %(default)s)')
+    parser.add_argument('--undo-steps', type=int, default=UNDO_STEPS,
+                        help='latest commands of a session U and Z can undo and redo, 0 turns it off '
+                             '(default: %(default)s)')
+    parsed = parser.parse_args(arguments)
+    try:
+        get_canvas_class(parsed.backend)
+    except ImportError as error:
+        parser.error(str(error))
+    return parsed
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(serve(**vars(parse_arguments())))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,62 @@
+import unittest
+from random import Random
+from batch import StrokeBatch, merge_segments
+from canvas import Canvas
+from functions import add_line, add_rectangle, get_coordinates_to_draw_rect_with_addline_function
+from validation import Line, Rectangle
+
+
+class MergeSegmentsTest(unittest.TestCase):
+
+    def test_merge_segments_joins_overlapping_and_touching_segments(self):
+        self.assertListEqual(merge_segments([(7, 9), (1, 3), (2, 5), (6, 6), (11, 12)]), [[1, 9], [11, 12]])
+
+
+class StrokeBatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.random = Random(8)
+
+    def random_command(self, width: int, height: int):
+        cell_1, cell_2 = self.random.randint(1, width), self.random.randint(1, width)
+        row_1, row_2 = self.random.randint(1, height), self.random.randint(1, height)
+        kind = self.random.choice('HVR')
+        if kind == 'H':
+            return Line(cell_1, row_1, cell_2, row_1)
+        if kind == 'V':
+            return Line(cell_1, row_1, cell_1, row_2)
+        return Rectangle(cell_1, row_1, cell_2, row_2)
+
+    def test_flush_paints_same_cells_as_commands_one_by_one(self):
+        for _ in range(50):
+            width, height = self.random.randint(1, 40), self.random.randint(1, 40)
+            expected, canvas, batch = Canvas(width, height), Canvas(width, height), StrokeBatch()
+            for _ in range(self.random.randint(1, 30)):
+                command = self.random_command(width, height)
+                batch.add(command)
+                if type(command) is Line:
+                    add_line(expected, command)
+                else:
+                    add_rectangle(expected, get_coordinates_to_draw_rect_with_addline_function(command))
+            batch.flush(canvas)
+            self.assertEqual(canvas.render(), expected.render())
+
+    def test_flush_merges_collinear_lines_and_empties_batch(self):
+        canvas, batch = Canvas(10, 3), StrokeBatch()
+        for command in (Line(1, 1, 3, 1), Line(4, 1, 6, 1), Line(5, 1, 2, 1), Line(9, 1, 10, 1)):
+            batch.add(command)
+        self.assertEqual(len(batch), 4)
+        self.assertEqual(batch.flush(canvas), 2)
+        self.assertEqual(canvas.row(1), b'xxxxxx  xx')
+        self.assertEqual(len(batch), 0)
+
+    def test_is_full_after_limit_segments(self):
+        batch = StrokeBatch(limit=4)
+        batch.add(Line(1, 1, 2, 1))
+        self.assertFalse(batch.is_full())
+        batch.add(Rectangle(1, 1, 3, 3))
+        self.assertTrue(batch.is_full())
+
+
+if __name__ == '__main__':
+    unittest.main()
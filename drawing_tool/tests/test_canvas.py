@@ -0,0 +1,107 @@
+import unittest
+from random import Random
+from backends import get_canvas_class
+from canvas import Canvas, line_runs
+
+
+class CanvasTest(unittest.TestCase):
+
+    def setUp(self):
+        self.canvas = Canvas(5, 3)
+
+    def test_get_and_set_use_instruction_coordinates(self):
+        self.canvas.set(5, 3, 'o')
+        self.assertEqual(self.canvas.get(5, 3), 'o')
+        self.assertEqual(self.canvas.cells[-1], ord('o'))
+
+    def test_hline_paints_only_given_cells(self):
+        self.canvas.hline(2, 4, 2)
+        self.assertEqual(self.canvas.row(2), b' xxx ')
+        self.assertEqual(self.canvas.row(1), b'     ')
+
+    def test_vline_paints_only_given_cells(self):
+        self.canvas.vline(3, 1, 2, 'o')
+        self.assertListEqual([self.canvas.get(3, row) for row in range(1, 4)], ['o', 'o', ' '])
+
+    def test_render_adds_border(self):
+        self.canvas.set(1, 1, 'x')
+        self.assertEqual(self.canvas.render(), b'-------\n|x    |\n|     |\n|     |\n-------\n')
+
+    def test_take_dirty_returns_box_of_changes_once(self):
+        self.canvas.hline(2, 3, 1)
+        self.canvas.vline(4, 2, 3)
+        self.assertTupleEqual(self.canvas.take_dirty(), (2, 1, 4, 3))
+        self.assertIsNone(self.canvas.take_dirty())
+
+    def test_region_returns_cells_of_box(self):
+        self.canvas.vline(4, 2, 3)
+        self.assertListEqual(self.canvas.region((3, 2, 4, 3)), [b' x', b' x'])
+
+    def test_fill_rect_is_clipped_to_canvas(self):
+        self.canvas.fill_rect(4, 0, 9, 2, 'o')
+        self.assertListEqual(self.canvas.region((1, 1, 5, 3)), [b'   oo', b'   oo', b'     '])
+        self.assertTupleEqual(self.canvas.take_dirty(), (4, 1, 5, 2))
+        self.canvas.fill_rect(6, 1, 9, 3)
+        self.assertIsNone(self.canvas.take_dirty())
+
+    def test_line_paints_bresenham_runs(self):
+        canvas = Canvas(9, 5)
+        canvas.line(9, 5, 1, 1)
+        self.assertListEqual(canvas.region((1, 1, 9, 5)),
+                             [b'x        ', b' xx      ', b'   xx    ', b'     xx  ', b'       xx'])
+        self.assertListEqual(line_runs(1, 1, 9, 5), line_runs(9, 5, 1, 1))
+        self.assertListEqual(line_runs(2, 1, 3, 5), [(2, 1, 2, 2), (3, 3, 3, 5)])
+
+    def test_diagonal_is_clipped_to_canvas(self):
+        self.canvas.line(0, 4, 4, 0, 'o')
+        self.assertListEqual(self.canvas.region((1, 1, 5, 3)), [b'  o  ', b' o   ', b'o    '])
+        self.assertTupleEqual(self.canvas.take_dirty(), (1, 1, 3, 3))
+
+
+class StrokePrimitivesTest(unittest.TestCase):
+    """Every backend paints the same cells as a cell by cell reference."""
+
+    def reference(self, width: int, height: int, strokes: list) -> list:
+        grid = [[' '] * width for _ in range(height)]
+        for kind, (cell_1, row_1, cell_2, row_2), color in strokes:
+            if kind == 'rect':
+                cells = [(cell_id, row_id) for row_id in range(row_1, row_2 + 1) for cell_id in range(cell_1, cell_2 + 1)]
+            else:
+                steps = max(abs(cell_2 - cell_1), abs(row_2 - row_1))
+                if abs(cell_2 - cell_1) >= abs(row_2 - row_1) and cell_1 > cell_2 or \
+                        abs(cell_2 - cell_1) < abs(row_2 - row_1) and row_1 > row_2:
+                    cell_1, row_1, cell_2, row_2 = cell_2, row_2, cell_1, row_1
+                # Distances from the end the line starts at are rounded half up, like Bresenham's midpoint test.
+                cells = [tuple(start + (1 if end > start else -1) * ((abs(end - start) * 2 * step + steps) // (2 * steps))
+                               if steps else start for start, end in ((cell_1, cell_2), (row_1, row_2)))
+                         for step in range(steps + 1)]
+            for cell_id, row_id in cells:
+                if 0 < cell_id <= width and 0 < row_id <= height:
+                    grid[row_id - 1][cell_id - 1] = color
+        return [''.join(row).encode() for row in grid]
+
+    def test_backends_paint_reference_cells(self):
+        random = Random(2020)
+        for _ in range(100):
+            width, height = random.randint(1, 20), random.randint(1, 20)
+            strokes = []
+            for _ in range(10):
+                cell_1, row_1 = random.randint(-3, width + 3), random.randint(-3, height + 3)
+                cell_2, row_2 = random.randint(-3, width + 3), random.randint(-3, height + 3)
+                if random.random() < 0.3:
+                    strokes.append(('rect', (min(cell_1, cell_2), min(row_1, row_2), max(cell_1, cell_2),
+                                             max(row_1, row_2)), random.choice('xo')))
+                else:
+                    if random.random() < 0.3:
+                        row_2 = row_1 + random.choice((1, -1)) * (cell_2 - cell_1)
+                    strokes.append(('line', (cell_1, row_1, cell_2, row_2), random.choice('xo')))
+            expected = self.reference(width, height, strokes)
+            for backend in ('bytearray', 'numpy', 'tiled', 'mmap', 'rle'):
+                canvas = get_canvas_class(backend)(width, height)
+                for kind, box, color in strokes:
+                    (canvas.fill_rect if kind == 'rect' else canvas.line)(*box, color)
+                self.assertListEqual(canvas.region((1, 1, width, height)), expected, (backend, strokes))
+
+
+if __name__ == '__main__':
+    unittest.main()
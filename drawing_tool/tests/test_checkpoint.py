@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import main as main_module
+from canvas import Canvas
+from checkpoint import read_checkpoint, write_checkpoint
+from main import main
+from tiled_canvas import TiledCanvas
+from validation import CommandError
+
+SCRIPT = 'C 20 4\nL 1 2 6 2\nL 6 3 6 4\nQ 1\nR 14 1 18 3\nB 10 3 o\nL 1 1 1 4\nB 1 1 -\nR 2 2 5 3\n'
+
+
+class CheckpointTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.input = self.path('input.txt')
+        self.checkpoint = self.path('checkpoint')
+        with open(self.input, 'w') as file:
+            file.write(SCRIPT)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+    def read(self, path: str) -> bytes:
+        with open(path, 'rb') as file:
+            return file.read()
+
+    def crash_after(self, commands: int, output: str, output_mode: str, backend: str) -> None:
+        """Runs main with checkpoints until the given number of commands has been executed."""
+        execute, calls = main_module.execute, []
+
+        def crashing_execute(canvas, command):
+            if len(calls) == commands:
+                raise RuntimeError('killed')
+            calls.append(command)
+            return execute(canvas, command)
+
+        with patch('main.execute', crashing_execute), self.assertRaises(RuntimeError):
+            main(self.input, output, output_mode, backend=backend, checkpoint_path=self.checkpoint,
+                 checkpoint_every=2)
+
+    def test_resumed_run_writes_same_output_and_errors(self):
+        for backend in ('bytearray', 'tiled'):
+            for output_mode in ('full', 'diff', 'final'):
+                expected_output, output = self.path(f'expected-{output_mode}'), self.path(f'output-{output_mode}')
+                expected_errors = main(self.input, expected_output, output_mode, backend=backend)
+                # Strokes of final mode are batched, only the fills go through execute.
+                self.crash_after(1 if output_mode == 'final' else 5, output, output_mode, backend)
+                self.assertGreater(read_checkpoint(self.checkpoint).line_number, 2)
+                errors = main(self.input, output, output_mode, backend=backend, checkpoint_path=self.checkpoint,
+                              checkpoint_every=2, resume=True)
+                self.assertEqual(self.read(output), self.read(expected_output))
+                self.assertListEqual([(error.line_number, str(error)) for error in errors],
+                                     [(error.line_number, str(error)) for error in expected_errors])
+                self.assertFalse(os.path.exists(self.checkpoint))
+                os.remove(output)
+                os.remove(expected_output)
+
+    def test_resume_without_checkpoint_runs_from_start(self):
+        main(self.input, self.path('expected'), 'final')
+        main(self.input, self.path('output'), 'final', checkpoint_path=self.checkpoint, resume=True)
+        self.assertEqual(self.read(self.path('output')), self.read(self.path('expected')))
+
+    def test_checkpoint_round_trip_is_memory_mappable_raw_cells(self):
+        canvas = Canvas(5, 3)
+        canvas.hline(1, 5, 2, 'o')
+        write_checkpoint(self.checkpoint, canvas, 7, 42, 99, [CommandError('Wrong', 3)])
+        data = self.read(self.checkpoint)
+        self.assertIn(b'     ooooo     ', data)
+        restored = TiledCanvas(5, 3, tile_size=2)
+        saved = read_checkpoint(self.checkpoint, restored)
+        self.assertEqual((saved.line_number, saved.input_offset, saved.output_size), (7, 42, 99))
+        self.assertEqual([(error.line_number, error.message) for error in saved.errors], [(3, 'Wrong')])
+        self.assertEqual(restored.render(), canvas.render())
+
+    def test_checkpoint_of_other_canvas_size_is_refused(self):
+        write_checkpoint(self.checkpoint, Canvas(5, 3), 2, 0, 0, [])
+        with self.assertRaises(CommandError):
+            read_checkpoint(self.checkpoint, Canvas(3, 5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+from importlib.util import find_spec
+from random import Random
+from backends import get_canvas_class
+from fill import scanline_fill
+
+
+def reference_fill(grid: list, cell_id: int, row_id: int, color: str, connectivity: int) -> None:
+    """Pixel by pixel fill of a list of lists, used as the expected result."""
+    to_replace = grid[row_id][cell_id]
+    if to_replace == color:
+        return
+    steps = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+    if connectivity == 8:
+        steps += [(-1, -1), (1, -1), (-1, 1), (1, 1)]
+    stack = [(cell_id, row_id)]
+    while stack:
+        cell_id, row_id = stack.pop()
+        if 0 <= row_id < len(grid) and 0 <= cell_id < len(grid[0]) and grid[row_id][cell_id] == to_replace:
+            grid[row_id][cell_id] = color
+            stack.extend((cell_id + step_x, row_id + step_y) for step_x, step_y in steps)
+
+
+class ScanlineFillTest(unittest.TestCase):
+    backend = 'bytearray'
+
+    def setUp(self):
+        self.random = Random(2020)
+        self.Canvas = get_canvas_class(self.backend)
+
+    def random_canvas(self, width: int, height: int):
+        canvas = self.Canvas(width, height)
+        for row_id in range(1, height + 1):
+            for cell_id in range(1, width + 1):
+                if self.random.random() < 0.4:
+                    canvas.set(cell_id, row_id, 'x')
+        return canvas
+
+    def test_fill_matches_pixel_fill_for_both_connectivities(self):
+        for connectivity in (4, 8):
+            for _ in range(30):
+                width, height = self.random.randint(1, 30), self.random.randint(1, 30)
+                canvas = self.random_canvas(width, height)
+                grid = [list(canvas.row(row_id).decode()) for row_id in range(1, height + 1)]
+                cell_id, row_id = self.random.randint(1, width), self.random.randint(1, height)
+                canvas.flood_fill(cell_id, row_id, 'o', connectivity)
+                reference_fill(grid, cell_id - 1, row_id - 1, 'o', connectivity)
+                self.assertListEqual([canvas.row(row).decode() for row in range(1, height + 1)],
+                                     [''.join(line) for line in grid])
+
+    def test_four_connectivity_does_not_pass_diagonal_gaps(self):
+        for connectivity, expected in ((4, ' '), (8, 'o')):
+            canvas = self.Canvas(3, 3)
+            canvas.hline(1, 2, 2)
+            canvas.set(3, 1, 'x')
+            canvas.flood_fill(3, 3, 'o', connectivity)
+            self.assertEqual(canvas.get(1, 1), expected)
+
+    def test_fill_returns_filled_spans(self):
+        canvas = self.Canvas(4, 2)
+        canvas.hline(2, 4, 1)
+        self.assertListEqual(sorted(canvas.flood_fill(1, 2, 'o', 4)), [(1, 1, 1), (2, 1, 4)])
+
+    def test_fill_respects_row_stride_and_origin(self):
+        cells = bytearray(b'#######    ##    #######')
+        spans = scanline_fill(cells, 7, 6, 4, 2, [(0, 0)], ord(' '), ord('o'))
+        self.assertEqual(cells, bytearray(b'#######oooo##oooo#######'))
+        self.assertEqual(len(spans), 2)
+
+    def test_unknown_connectivity_raises_ValueError(self):
+        with self.assertRaises(ValueError):
+            self.Canvas(2, 2).flood_fill(1, 1, 'o', 6)
+
+
+@unittest.skipUnless(find_spec('numpy'), 'numpy is not installed')
+class NumpyFillTest(ScanlineFillTest):
+    backend = 'numpy'
+
+
+if __name__ == '__main__':
+    unittest.main()
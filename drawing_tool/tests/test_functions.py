@@ -1,31 +1,42 @@
+import io
 import unittest
 from unittest.mock import patch, mock_open
+from importlib.util import find_spec
 from random import randint as rd
+from canvas import Canvas
 from functions import (
     initialize_canvas,
     get_instructions,
+    read_instructions,
     get_coordinates_to_draw_rect_with_addline_function,
     to_flood_fill,
     add_line,
     add_rectangle,
     draw_into_output,
+    draw_diff_into_output,
 )
 
 
 class InitializeCanvasTest(unittest.TestCase):
+    backend = 'bytearray'
 
     def setUp(self):
         self.cleaned_data = rd(1, 100), rd(1, 100)
 
-    def test_initialize_canvas_returns_list(self):
-        self.assertIsInstance(initialize_canvas(self.cleaned_data), list)
+    def test_initialize_canvas_returns_canvas(self):
+        self.assertIsInstance(initialize_canvas(self.cleaned_data, self.backend), Canvas)
 
     def test_initialize_canvas_returns_correct_output(self):
         width, height = self.cleaned_data
         dashes = ['-' * (width + 2)]
-        body = [(['|'] + [' ' for _ in range(width)] + ['|']) for _ in range(height)]
+        body = ['|' + ' ' * width + '|' for _ in range(height)]
         canvas = dashes + body + dashes
-        self.assertListEqual(initialize_canvas(self.cleaned_data), canvas)
+        self.assertListEqual(initialize_canvas(self.cleaned_data, self.backend).lines(), canvas)
+
+    def test_initialize_canvas_stores_one_byte_per_cell(self):
+        width, height = self.cleaned_data
+        cells = initialize_canvas(self.cleaned_data, self.backend).cells
+        self.assertEqual(memoryview(cells).nbytes, width * height)
 
 
 class GetInstructionsTest(unittest.TestCase):
@@ -38,6 +49,13 @@ class GetInstructionsTest(unittest.TestCase):
     def test_get_instructions_returns_correct_output(self):
         self.assertListEqual(get_instructions(), ['R 10 4 5 4'])
 
+    def test_read_instructions_reads_lines_lazily(self):
+        file = io.StringIO('R 10 4 5 4\nB 1 1 o\n')
+        instructions = read_instructions(file)
+        self.assertListEqual(next(instructions), ['R', '10', '4', '5', '4'])
+        self.assertEqual(file.readline(), 'B 1 1 o\n')
+        self.assertListEqual(list(instructions), [])
+
 
 class GetCoordinatesTest(unittest.TestCase):
 
@@ -59,32 +77,48 @@ class GetCoordinatesTest(unittest.TestCase):
 
 
 class WithoutReturnFunctionsTest(unittest.TestCase):
+    backend = 'bytearray'
 
     def setUp(self):
         self.width, self.height = rd(10, 100), rd(10, 100)
         self.dashes = ['-' * (self.width + 2)]
-        self.body = [(['|'] + [' ' for _ in range(self.width)] + ['|']) for _ in range(self.height)]
-        self.canvas = self.dashes + self.body + self.dashes
+        self.canvas = initialize_canvas((self.width, self.height), self.backend)
         self.control_body = [(['|'] + [' ' for _ in range(self.width)] + ['|']) for _ in range(self.height)]
         self.control_canvas = self.dashes + self.control_body + self.dashes
 
+    @staticmethod
+    def join(canvas: list) -> list:
+        return [''.join(line) for line in canvas]
+
     def test_to_flood_fill_add_correct_values_to_canvas(self):
         control_body = [(['|'] + ['o' for _ in range(self.width)] + ['|']) for _ in range(self.height)]
         control_canvas = self.dashes + control_body + self.dashes
         to_flood_fill(self.canvas, 1, 1, 'o')
-        self.assertListEqual(self.canvas, control_canvas)
+        self.assertListEqual(self.canvas.lines(), self.join(control_canvas))
+
+    def test_to_flood_fill_with_same_color_keeps_canvas(self):
+        to_flood_fill(self.canvas, 1, 1, ' ')
+        self.assertListEqual(self.canvas.lines(), self.join(self.control_canvas))
+
+    def test_to_flood_fill_stops_at_lines(self):
+        add_line(self.canvas, (1, 5, self.width, 5))
+        to_flood_fill(self.canvas, 1, 1, 'o')
+        for row in range(1, 5):
+            self.control_canvas[row][1:-1] = ['o'] * self.width
+        self.control_canvas[5][1:-1] = ['x'] * self.width
+        self.assertListEqual(self.canvas.lines(), self.join(self.control_canvas))
 
     def test_addline_add_horizontal_line_correct_to_canvas(self):
         for cell in range(1, 11):
             self.control_canvas[1][cell] = 'x'
-        add_line(self.canvas, (1, 1, 10, 1))
-        self.assertListEqual(self.canvas, self.control_canvas)
+        add_line(self.canvas, (10, 1, 1, 1))
+        self.assertListEqual(self.canvas.lines(), self.join(self.control_canvas))
 
     def test_addline_add_vertical_line_correct_to_canvas(self):
         for row in range(1, 11):
             self.control_canvas[row][5] = 'x'
         add_line(self.canvas, (5, 1, 5, 10))
-        self.assertListEqual(self.canvas, self.control_canvas)
+        self.assertListEqual(self.canvas.lines(), self.join(self.control_canvas))
 
     def test_add_rectangle_add_correct_values_to_canvas(self):
         for cell in range(2, 8):
@@ -94,7 +128,7 @@ class WithoutReturnFunctionsTest(unittest.TestCase):
             self.control_canvas[row][2] = 'x'
             self.control_canvas[row][7] = 'x'
         add_rectangle(self.canvas, ((2, 2, 7, 2), (2, 5, 7, 5), (2, 2, 2, 5), (7, 2, 7, 5)))
-        self.assertListEqual(self.canvas, self.control_canvas)
+        self.assertListEqual(self.canvas.lines(), self.join(self.control_canvas))
 
     def test_draw_into_output_write_into_correct_file(self):
         m = mock_open()
@@ -108,13 +142,67 @@ class WithoutReturnFunctionsTest(unittest.TestCase):
             result = f.readlines()
             given_result = ''.join(result)
             expected_result = ''
-            for line in self.canvas:
+            for line in self.control_canvas:
                 expected_result += (''.join(line) + '\n')
 
         with open('output.txt', 'w'):
             pass
         self.assertMultiLineEqual(given_result, expected_result)
 
+    def test_draw_diff_into_output_write_only_changed_box(self):
+        add_line(self.canvas, (2, 3, 2, 4))
+        m = mock_open()
+        with patch('builtins.open', m):
+            draw_diff_into_output(self.canvas, self.canvas.take_dirty())
+            draw_diff_into_output(self.canvas, self.canvas.take_dirty())
+        m.assert_called_with('output.txt', 'a')
+        written = ''.join(call.args[0] for call in m().write.call_args_list)
+        self.assertEqual(written, '@ 2 3 2 4\nx\nx\n@\n')
+
+
+@unittest.skipUnless(find_spec('numpy'), 'numpy is not installed')
+class NumpyInitializeCanvasTest(InitializeCanvasTest):
+    backend = 'numpy'
+
+
+@unittest.skipUnless(find_spec('numpy'), 'numpy is not installed')
+class NumpyWithoutReturnFunctionsTest(WithoutReturnFunctionsTest):
+    backend = 'numpy'
+
+
+class TiledInitializeCanvasTest(InitializeCanvasTest):
+    backend = 'tiled'
+
+    def test_initialize_canvas_stores_one_byte_per_cell(self):
+        self.assertEqual(initialize_canvas(self.cleaned_data, self.backend).allocated_tiles(), 0)
+
+
+class TiledWithoutReturnFunctionsTest(WithoutReturnFunctionsTest):
+    backend = 'tiled'
+
+
+class MmapInitializeCanvasTest(InitializeCanvasTest):
+    backend = 'mmap'
+
+    def test_initialize_canvas_stores_one_byte_per_cell(self):
+        canvas = initialize_canvas(self.cleaned_data, self.backend)
+        self.assertEqual(canvas.cells[:], canvas.render())
+
+
+class MmapWithoutReturnFunctionsTest(WithoutReturnFunctionsTest):
+    backend = 'mmap'
+
+
+class RleInitializeCanvasTest(InitializeCanvasTest):
+    backend = 'rle'
+
+    def test_initialize_canvas_stores_one_byte_per_cell(self):
+        self.assertEqual(initialize_canvas(self.cleaned_data, self.backend).runs(), self.cleaned_data[1])
+
+
+class RleWithoutReturnFunctionsTest(WithoutReturnFunctionsTest):
+    backend = 'rle'
+
 
 if __name__ == '__main__':
     unittest.main()
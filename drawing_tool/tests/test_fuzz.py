@@ -0,0 +1,70 @@
+import unittest
+from random import Random
+from unittest.mock import patch
+from benchmarks import fuzz
+from functions import initialize_canvas
+from validation import Fill, Redo, Undo, parse_instruction
+
+
+class FuzzTest(unittest.TestCase):
+
+    def test_engines_agree_with_reference_on_every_generator(self):
+        divergences, timings = fuzz.fuzz(1, 1, 23, 17, 80, sorted(fuzz.GENERATORS), frame_every=10)
+        self.assertListEqual(divergences, [])
+        self.assertIn('reference', timings)
+        self.assertIn('bytearray', timings)
+        self.assertIn('final-optimize', timings)
+
+    def test_oracle_draws_every_command(self):
+        oracle = fuzz.Oracle(6, 4)
+        for line in ('R 1 1 4 3', 'D 1 4 6 1', 'B 2 2 o', 'F 6 4 5 4', 'U 2', 'Z', 'B 6 4 c'):
+            oracle.apply(parse_instruction(line.split(), (6, 4)))
+        self.assertListEqual(oracle.frame(), [
+            b'--------', b'|xxxxcx|', b'|xooxxc|', b'|xxxxcc|', b'|xccccc|', b'--------'])
+        self.assertEqual(oracle.apply(Fill(1, 1, 'x')), None)
+        self.assertEqual(oracle.apply(Fill(2, 2, 'b')), (2, 2, 3, 2))
+
+    def test_generators_mix_in_undo_and_redo(self):
+        lines = fuzz.with_undo(fuzz.random_script(20, 20, 400, Random(1)), Random(1))
+        self.assertTrue(any(line.startswith('U') for line in lines))
+        self.assertTrue(any(line.startswith('Z') for line in lines))
+
+    def test_undo_ignored_by_journal_engine_diverges(self):
+        def forgetful_journal(cleaned_data):
+            from main import execute
+
+            def skip_undo(canvas, command):
+                if type(command) not in (Undo, Redo):
+                    execute(canvas, command)
+            return initialize_canvas(cleaned_data), skip_undo
+
+        with patch.object(fuzz, 'engines', lambda pool=None: {'journal': forgetful_journal}):
+            divergences, _ = fuzz.fuzz(4, 2, 12, 9, 60, ['random'], ['journal'])
+        self.assertTrue(divergences)
+        self.assertRegex(divergences[0][3], r'^step \d+ "[UZ]')
+
+    def test_generators_are_reproducible_from_seed(self):
+        for name, generator in fuzz.GENERATORS.items():
+            with self.subTest(generator=name):
+                self.assertListEqual(generator(30, 20, 50, Random(7)), generator(30, 20, 50, Random(7)))
+
+    def test_divergence_reports_seed_and_step(self):
+        def broken_engine(cleaned_data):
+            from main import execute
+
+            def skip_fills(canvas, command):
+                if type(command) is not Fill:
+                    execute(canvas, command)
+            return initialize_canvas(cleaned_data), skip_fills
+
+        with patch.object(fuzz, 'engines', lambda pool=None: {'broken': broken_engine}):
+            divergences, _ = fuzz.fuzz(3, 2, 10, 10, 30, ['maze'], ['broken'])
+        self.assertEqual(len(divergences), 2)
+        generator, script_seed, name, message = divergences[0]
+        self.assertEqual((generator, name), ('maze', 'broken'))
+        self.assertEqual(script_seed, Random(3).randrange(2 ** 32))
+        self.assertRegex(message, r'^step \d+ "B ')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import json
+import os
+import tempfile
+import unittest
+from instrumentation import CommandStats
+from main import main
+
+
+class ProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.input = os.path.join(self.directory.name, 'input.txt')
+        self.output = os.path.join(self.directory.name, 'output.txt')
+        self.profile = os.path.join(self.directory.name, 'profile.json')
+        with open(self.input, 'w') as file:
+            file.write('C 20 4\nL 1 2 6 2\nL 6 3 6 4\nR 14 1 18 3\nB 10 3 o\nQ 1\n')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_profiled(self, output_mode: str) -> dict:
+        main(self.input, self.output, output_mode, profile_path=self.profile)
+        with open(self.profile) as file:
+            return json.load(file)
+
+    def test_profile_counts_commands_cells_and_bytes(self):
+        report = self.run_profiled('full')
+        self.assertEqual({name: stats['count'] for name, stats in report['commands'].items()},
+                         {'Error': 1, 'Fill': 1, 'Line': 2, 'Rectangle': 1})
+        self.assertEqual(report['commands']['Line']['cells'], 8)
+        self.assertEqual(report['commands']['Rectangle']['cells'], 12)
+        self.assertEqual(report['commands']['Fill']['cells'], 47)
+        self.assertEqual(report['bytes_written'], os.path.getsize(self.output))
+        self.assertSetEqual(set(report['phases_seconds']), {'parse', 'draw', 'fill', 'output'})
+
+    def test_profile_in_final_mode_counts_batched_strokes(self):
+        report = self.run_profiled('final')
+        self.assertEqual(report['commands']['Line']['count'], 2)
+        self.assertEqual(report['bytes_written'], os.path.getsize(self.output))
+
+    def test_without_profile_path_nothing_is_written(self):
+        main(self.input, self.output, 'full')
+        self.assertFalse(os.path.exists(self.profile))
+
+
+class CommandStatsTest(unittest.TestCase):
+
+    def test_reservoir_is_bounded_and_percentiles_are_ordered(self):
+        stats = CommandStats(limit=100)
+        for number in range(1000):
+            stats.add(number / 1000, 1)
+        self.assertEqual(len(stats.samples), 100)
+        self.assertEqual(stats.count, 1000)
+        self.assertEqual(stats.longest, 0.999)
+        self.assertLessEqual(stats.percentile(0.5), stats.percentile(0.99))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+from random import Random
+from backends import get_canvas_class
+from journal import Journal, stroke_boxes
+from main import execute, main
+from validation import CommandError, Diagonal, Fill, FilledRectangle, Line, Rectangle, Redo, Undo, parse_instruction
+
+
+class JournalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.random = Random(2020)
+
+    def random_command(self, width: int, height: int):
+        cell_1, cell_2 = self.random.randint(1, width), self.random.randint(1, width)
+        row_1, row_2 = self.random.randint(1, height), self.random.randint(1, height)
+        kind = self.random.random()
+        if kind < 0.3:
+            return Line(cell_1, row_1, cell_2, row_1) if self.random.random() < 0.5 else Line(cell_1, row_1, cell_1, row_2)
+        if kind < 0.5:
+            return Rectangle(cell_1, row_1, cell_2, row_2)
+        if kind < 0.55:
+            return FilledRectangle(cell_1, row_1, cell_2, row_2)
+        if kind < 0.65:
+            return Diagonal(cell_1, row_1, cell_2, row_2)
+        return Fill(cell_1, row_1, self.random.choice('ox -'))
+
+    def test_undo_restores_and_redo_repeats_every_step(self):
+        for backend in ('bytearray', 'tiled', 'rle'):
+            with self.subTest(backend=backend):
+                canvas = get_canvas_class(backend)(17, 11)
+                journal = Journal(limit=1000)
+                apply = journal.wrap_execute(execute)
+                frames = [canvas.render()]
+                for _ in range(60):
+                    apply(canvas, self.random_command(17, 11))
+                    frames.append(canvas.render())
+                for frame in reversed(frames[:-1]):
+                    apply(canvas, Undo(1))
+                    self.assertEqual(canvas.render(), frame)
+                apply(canvas, Redo(60))
+                self.assertEqual(canvas.render(), frames[-1])
+                apply(canvas, Undo(25))
+                self.assertEqual(canvas.render(), frames[-26])
+
+    def test_steps_keep_only_changed_cells(self):
+        canvas = get_canvas_class('bytearray')(10, 10)
+        journal = Journal()
+        apply = journal.wrap_execute(execute)
+        apply(canvas, Line(1, 5, 10, 5))
+        apply(canvas, Line(5, 1, 5, 10))
+        self.assertEqual(journal.done[-1].segments, [(5, 1, 5, 4, ' '), (5, 6, 5, 10, ' ')])
+        apply(canvas, Fill(1, 1, 'o'))
+        self.assertEqual(journal.done[-1].segments, [(1, row, 4, row, ' ') for row in range(1, 5)])
+
+    def test_new_command_drops_redo_and_limit_drops_oldest(self):
+        canvas = get_canvas_class('bytearray')(5, 5)
+        journal = Journal(limit=2)
+        apply = journal.wrap_execute(execute)
+        for row_id in (1, 2, 3):
+            apply(canvas, Line(1, row_id, 5, row_id))
+        apply(canvas, Undo(5))
+        self.assertEqual(canvas.row(1), b'xxxxx')
+        self.assertEqual(canvas.row(2), b'     ')
+        apply(canvas, Line(1, 5, 5, 5))
+        apply(canvas, Redo(1))
+        self.assertEqual(canvas.row(2), b'     ')
+
+    def test_stroke_boxes_cover_rectangle_cells_once(self):
+        for command in (Rectangle(2, 2, 6, 5), Rectangle(6, 5, 2, 2), Rectangle(3, 1, 3, 4), Rectangle(1, 3, 4, 4)):
+            cells = [(cell_id, row_id) for left, top, right, bottom in stroke_boxes(command)
+                     for row_id in range(top, bottom + 1) for cell_id in range(left, right + 1)]
+            canvas = get_canvas_class('bytearray')(8, 8)
+            execute(canvas, command)
+            painted = [(cell_id, row_id) for row_id in range(1, 9) for cell_id in range(1, 9)
+                       if canvas.get(cell_id, row_id) == 'x']
+            self.assertCountEqual(cells, painted)
+
+    def test_parse_undo_and_redo(self):
+        self.assertEqual(parse_instruction(['U'], (3, 3)), Undo(1))
+        self.assertEqual(parse_instruction(['Z', '4'], (3, 3)), Redo(4))
+        for instruction in (['U', '0'], ['Z', 'a'], ['U', '1', '2']):
+            with self.assertRaises(CommandError):
+                parse_instruction(instruction, (3, 3))
+
+    def test_main_undoes_instructions_only_with_journal(self):
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, 'input.txt')
+            with open(input_path, 'w') as file:
+                file.write('C 4 2\nL 1 1 4 1\nB 1 2 o\nU 2\nZ\n')
+            for undo_steps, expected in ((10, b'xxxx\n    '), (0, b'xxxx\noooo')):
+                output_path = os.path.join(directory, f'{undo_steps}.txt')
+                errors = main(input_path, output_path, output_mode='final', undo_steps=undo_steps)
+                with open(output_path, 'rb') as file:
+                    self.assertIn(expected.replace(b'\n', b'|\n|'), file.read())
+                self.assertEqual([error.line_number for error in errors], [] if undo_steps else [4, 5])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from io import StringIO
+from main import parse_arguments, serve_jobs
+
+DRAWING_TOOL = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StartupTest(unittest.TestCase):
+
+    def test_import_leaves_out_modules_of_optional_features(self):
+        optional = ['argparse', 'bz2', 'checkpoint', 'concurrent.futures', 'gzip', 'instrumentation', 'journal',
+                    'lzma', 'multiprocessing', 'optimizer', 'parallel_fill', 'region_index']
+        code = f'import sys, main; print(" ".join(m for m in {optional} if m in sys.modules))'
+        loaded = subprocess.run([sys.executable, '-c', code], cwd=DRAWING_TOOL, capture_output=True, text=True,
+                                check=True)
+        self.assertEqual(loaded.stdout.strip(), '')
+
+
+class ServeJobsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.input = os.path.join(self.directory.name, 'input.txt')
+        self.output = os.path.join(self.directory.name, 'output.txt')
+        with open(self.input, 'w') as file:
+            file.write('C 4 2\nL 1 1 4 1\nQ\nB 1 2 o\n')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def serve(self, lines: list) -> tuple:
+        output = StringIO()
+        failed = serve_jobs(lines, output)
+        return failed, [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_every_job_gets_a_result_line(self):
+        job = f'--input {self.input} --output {self.output} --output-mode final\n'
+        failed, results = self.serve([job, '\n', '# comment\n', job])
+        self.assertEqual(failed, 0)
+        self.assertListEqual([result['line'] for result in results], [1, 4])
+        self.assertListEqual(results[1]['errors'], ['line 3: Wrong Command "Q".'])
+        with open(self.output) as file:
+            self.assertEqual(file.read(), '------\n|xxxx|\n|oooo|\n------\n' * 2)
+
+    def test_command_line_prints_errors_like_jobs(self):
+        printed = subprocess.run([sys.executable, 'main.py', '--input', self.input, '--output', self.output],
+                                 cwd=DRAWING_TOOL, capture_output=True, text=True, check=True)
+        _, results = self.serve([f'--input {self.input} --output {self.output}\n'])
+        self.assertEqual(printed.stdout, ''.join(f'ERROR! {error}\n' for error in results[0]['errors']))
+        self.assertEqual(printed.stdout, 'ERROR! line 3: Wrong Command "Q".\n')
+
+    def test_invalid_options_fail_only_their_job(self):
+        failed, results = self.serve(['--resume\n', '--jobs\n', '--help\n', "--input 'x\n",
+                                      f'--input {self.input} --output {self.output}\n'])
+        self.assertEqual(failed, 4)
+        self.assertTrue(results[0]['failure'].endswith('error: --resume requires --checkpoint.'))
+        self.assertListEqual([result['failure'] for result in results[1:]], [
+            '--jobs can not be an option of a job.',
+            '--help is not a job.',
+            'ValueError: No closing quotation',
+            None,
+        ])
+
+    def test_jobs_take_no_other_options(self):
+        with self.assertRaises(SystemExit):
+            parse_arguments(['--jobs', '--output-mode', 'final'])
+        self.assertTrue(parse_arguments(['--jobs']).jobs)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+from canvas import Canvas
+from mmap_canvas import MmapCanvas
+from writer import FrameWriter
+from tests.test_fill import ScanlineFillTest
+
+
+class MmapFillTest(ScanlineFillTest):
+    backend = 'mmap'
+
+
+class MmapCanvasTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'canvas.txt')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_backing_file_is_the_rendered_frame(self):
+        canvas, expected = MmapCanvas(6, 4, self.path), Canvas(6, 4)
+        for drawn in (canvas, expected):
+            drawn.hline(1, 6, 2)
+            drawn.vline(3, 2, 4)
+            drawn.flood_fill(6, 4, 'o')
+        canvas.close()
+        with open(self.path, 'rb') as file:
+            self.assertEqual(file.read(), expected.render())
+
+    def test_region_and_rows_skip_the_border(self):
+        canvas = MmapCanvas(4, 3)
+        canvas.vline(4, 1, 3, 'o')
+        self.assertEqual(canvas.row(2), b'   o')
+        self.assertEqual(canvas.region((3, 1, 4, 3)), [b' o', b' o', b' o'])
+        self.assertEqual(canvas.take_dirty(), (4, 1, 4, 3))
+
+    def test_writer_writes_frames_from_the_mapping(self):
+        canvas = MmapCanvas(3, 2)
+        output = os.path.join(self.directory.name, 'output.txt')
+        with FrameWriter(output) as writer:
+            writer.write_frame(canvas)
+            canvas.set(2, 2, 'o')
+            writer.write_frame(canvas)
+        with open(output, 'rb') as file:
+            self.assertEqual(file.read(), b'-----\n|   |\n|   |\n-----\n-----\n|   |\n| o |\n-----\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
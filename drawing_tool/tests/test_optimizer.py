@@ -0,0 +1,108 @@
+import json
+import os
+import tempfile
+import unittest
+from random import Random
+from main import main
+from optimizer import Optimizer, Strokes
+from validation import Fill, Line, Rectangle
+
+
+class OptimizerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.input_path = os.path.join(self.directory.name, 'input.txt')
+        self.random = Random(2020)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def draw(self, script: str, optimize: bool) -> tuple:
+        """Returns the final frame and the profile of the script."""
+        with open(self.input_path, 'w') as file:
+            file.write(script)
+        output_path = os.path.join(self.directory.name, f'{optimize}.txt')
+        profile_path = os.path.join(self.directory.name, f'{optimize}.json')
+        open(output_path, 'w').close()
+        main(self.input_path, output_path, 'final', profile_path=profile_path, optimize=optimize)
+        with open(output_path, 'rb') as file, open(profile_path) as profile:
+            return file.read(), json.load(profile)
+
+    def random_script(self, width: int, height: int, length: int) -> str:
+        lines = [f'C {width} {height}']
+        seeds = [(self.random.randint(1, width), self.random.randint(1, height)) for _ in range(4)]
+        for _ in range(length):
+            cell_1, cell_2 = self.random.randint(1, width), self.random.randint(1, width)
+            row_1, row_2 = self.random.randint(1, height), self.random.randint(1, height)
+            kind = self.random.random()
+            if kind < 0.3:
+                lines.append(f'L {cell_1} {row_1} {cell_2} {row_1}' if self.random.random() < 0.5
+                             else f'L {cell_1} {row_1} {cell_1} {row_2}')
+            elif kind < 0.45:
+                lines.append(f'R {cell_1} {row_1} {cell_2} {row_2}')
+            elif kind < 0.5:
+                lines.append(f'{self.random.choice("FD")} {cell_1} {row_1} {cell_2} {row_2}')
+            else:
+                cell_id, row_id = self.random.choice(seeds) if self.random.random() < 0.7 else (cell_1, row_1)
+                lines.append(f'B {cell_id} {row_id} {self.random.choice("ox -abc")}')
+        return '\n'.join(lines) + '\n'
+
+    def test_random_scripts_keep_final_frame(self):
+        removed = 0
+        for _ in range(150):
+            script = self.random_script(self.random.randint(1, 12), self.random.randint(1, 9), 40)
+            frame, _ = self.draw(script, False)
+            optimized, profile = self.draw(script, True)
+            self.assertEqual(optimized, frame, script)
+            removed += sum(profile['optimizer']['removed'].values())
+        self.assertGreater(removed, 100)
+
+    def test_removes_covered_strokes_and_repeated_fills(self):
+        script = 'C 10 5\nR 1 1 10 5\nL 3 1 7 1\nL 10 2 10 4\nB 5 3 a\nB 5 3 b\nB 5 3 b\nL 2 5 9 5\nB 1 1 o\nL 1 1 1 5\n'
+        frame, _ = self.draw(script, False)
+        optimized, profile = self.draw(script, True)
+        self.assertEqual(optimized, frame)
+        self.assertEqual(profile['optimizer'], {'commands': 9, 'removed': {'Fill': 2, 'Line': 3},
+                                                'stroke_cells_saved': 5 + 3 + 8})
+
+    def test_profile_counts_held_fills(self):
+        script = 'C 20 4\nL 1 2 6 2\nB 10 3 o\nR 14 1 18 3\nB 1 1 c\n'
+        _, profile = self.draw(script, False)
+        _, optimized = self.draw(script, True)
+        self.assertEqual(optimized['commands']['Fill']['cells'], profile['commands']['Fill']['cells'])
+        self.assertEqual(optimized['commands']['Fill']['count'], 2)
+        self.assertEqual(optimized['cells_touched'], profile['cells_touched'])
+        self.assertGreater(optimized['commands']['Fill']['total_seconds'], 0)
+
+    def test_fill_of_known_other_color_keeps_stroke_cells(self):
+        optimizer = Optimizer()
+        self.assertTrue(optimizer.keep_stroke(Line(1, 2, 5, 2)))
+        self.assertTrue(optimizer.keep_fill(Fill(1, 1, 'o')))
+        self.assertFalse(optimizer.keep_stroke(Line(2, 2, 4, 2)))
+        self.assertTrue(optimizer.keep_fill(Fill(3, 2, 'o')))
+        self.assertTrue(optimizer.keep_stroke(Line(2, 2, 4, 2)))
+        self.assertEqual(optimizer.color(1, 1), 'o')
+        self.assertEqual(optimizer.color(3, 2), 'x')
+        self.assertIsNone(optimizer.color(5, 2))
+
+    def test_strokes_join_touching_segments(self):
+        strokes = Strokes()
+        for left, right in ((5, 7), (1, 2), (3, 4), (10, 12)):
+            strokes.add(left, 1, right, 1)
+        self.assertEqual(strokes.rows[1], ([1, 10], [7, 12]))
+        self.assertTrue(strokes.covers(2, 1, 7, 1))
+        self.assertFalse(strokes.covers(6, 1, 10, 1))
+        strokes.add(3, 2, 3, 4)
+        self.assertTrue(strokes.covers(3, 3, 3, 3))
+        self.assertTrue(strokes.covers(3, 1, 3, 1))
+
+    def test_rectangle_is_removed_only_if_all_sides_are_painted(self):
+        optimizer = Optimizer()
+        self.assertTrue(optimizer.keep_stroke(Rectangle(1, 1, 4, 4)))
+        self.assertFalse(optimizer.keep_stroke(Rectangle(4, 4, 1, 1)))
+        self.assertTrue(optimizer.keep_stroke(Rectangle(1, 1, 4, 5)))
+
+
+if __name__ == '__main__':
+    unittest.main()
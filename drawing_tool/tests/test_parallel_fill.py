@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+from random import Random
+from canvas import Canvas
+from main import execute, main
+from mmap_canvas import MmapCanvas
+from parallel_fill import ParallelFill
+from validation import Fill, Line
+
+
+class ParallelFillTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.parallel = ParallelFill(workers=3, min_cells=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.parallel.close()
+
+    def setUp(self):
+        self.random = Random(2020)
+
+    def random_pair(self, canvas_class, width: int, height: int) -> tuple:
+        canvases = canvas_class(width, height), Canvas(width, height)
+        for row_id in range(1, height + 1):
+            for cell_id in range(1, width + 1):
+                if self.random.random() < 0.4:
+                    for canvas in canvases:
+                        canvas.set(cell_id, row_id, 'x')
+        return canvases
+
+    def test_same_cells_as_serial_fill_for_both_connectivities(self):
+        for canvas_class in (Canvas, MmapCanvas):
+            for connectivity in (4, 8):
+                for _ in range(15):
+                    width, height = self.random.randint(1, 25), self.random.randint(2, 25)
+                    parallel, serial = self.random_pair(canvas_class, width, height)
+                    cell_id, row_id = self.random.randint(1, width), self.random.randint(1, height)
+                    color = self.random.choice('ox')
+                    spans = self.parallel.flood_fill(parallel, cell_id, row_id, color, connectivity)
+                    expected = serial.flood_fill(cell_id, row_id, color, connectivity)
+                    self.assertEqual(parallel.render(), serial.render())
+                    self.assertListEqual(sorted(spans), sorted(expected))
+                    self.assertEqual(parallel.take_dirty(), serial.take_dirty())
+
+    def test_area_winding_through_all_bands_is_filled(self):
+        parallel, serial = Canvas(9, 12), Canvas(9, 12)
+        for canvas in (parallel, serial):
+            for row_id in range(2, 12, 2):
+                if row_id % 4:
+                    canvas.hline(1, 8, row_id)
+                else:
+                    canvas.hline(2, 9, row_id)
+        spans = self.parallel.flood_fill(parallel, 1, 12, 'o', 4)
+        self.assertListEqual(sorted(spans), sorted(serial.flood_fill(1, 12, 'o', 4)))
+        self.assertEqual(parallel.render(), serial.render())
+
+    def test_wrapped_execute_returns_filled_cells(self):
+        canvas = Canvas(10, 4)
+        apply = self.parallel.wrap_execute(execute)
+        apply(canvas, Line(1, 2, 10, 2))
+        self.assertEqual(apply(canvas, Fill(3, 4, 'o')), 20)
+        self.assertEqual(canvas.get(10, 3), 'o')
+        self.assertEqual(canvas.get(1, 1), ' ')
+
+    def test_main_with_fill_workers_writes_same_output(self):
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, 'input.txt')
+            with open(input_path, 'w') as file:
+                file.write('C 1100 1000\nR 10 10 900 990\nL 1 500 1100 500\nB 1 1 o\nB 20 20 -\n')
+            outputs = []
+            for fill_workers in (0, 2):
+                output_path = os.path.join(directory, f'output-{fill_workers}.txt')
+                main(input_path, output_path, 'final', fill_workers=fill_workers)
+                with open(output_path, 'rb') as file:
+                    outputs.append(file.read())
+            self.assertEqual(outputs[0], outputs[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
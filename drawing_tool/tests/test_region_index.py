@@ -0,0 +1,125 @@
+import os
+import tempfile
+import unittest
+from random import Random
+from canvas import Canvas
+from functions import add_line, add_rectangle, get_coordinates_to_draw_rect_with_addline_function, to_flood_fill
+from main import execute, main
+from parallel_fill import ParallelFill
+from region_index import RegionIndex
+from tests.test_fill import reference_fill
+from validation import Fill, Line, Rectangle
+
+
+class RegionIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.random = Random(2020)
+
+    def random_command(self, width: int, height: int):
+        cell_1, cell_2 = self.random.randint(1, width), self.random.randint(1, width)
+        row_1, row_2 = self.random.randint(1, height), self.random.randint(1, height)
+        kind = self.random.random()
+        if kind < 0.2:
+            return Line(cell_1, row_1, cell_2, row_1) if self.random.random() < 0.5 else Line(cell_1, row_1, cell_1, row_2)
+        if kind < 0.35:
+            return Rectangle(cell_1, row_1, cell_2, row_2)
+        return Fill(cell_1, row_1, self.random.choice('ox -'))
+
+    def assert_components_are_exact(self, canvas: Canvas, index: RegionIndex) -> None:
+        """Every kept component has to be exactly the area a fresh fill of its cell finds."""
+        for component in index.components.values():
+            grid = [list(canvas.row(row_id).decode()) for row_id in range(1, canvas.height + 1)]
+            row_id, left, _ = component.spans()[0]
+            self.assertEqual(grid[row_id - 1][left - 1], component.color)
+            reference_fill(grid, left - 1, row_id - 1, '\0', component.connectivity)
+            found = {(cell_id + 1, row + 1) for row, line in enumerate(grid) for cell_id, cell in enumerate(line)
+                     if cell == '\0'}
+            kept = {(cell_id, row) for row, left, right in component.spans() for cell_id in range(left, right + 1)}
+            self.assertSetEqual(found, kept)
+
+    def test_random_scripts_match_plain_fills_and_keep_exact_components(self):
+        for connectivity in (4, 8):
+            for _ in range(40):
+                width, height = self.random.randint(1, 25), self.random.randint(1, 25)
+                plain, indexed, index = Canvas(width, height), Canvas(width, height), RegionIndex(limit=4)
+                apply = index.wrap_execute(execute)
+                for _ in range(30):
+                    command = self.random_command(width, height)
+                    if type(command) is Fill:
+                        self.assertEqual(index.fill(indexed, *command, connectivity),
+                                         to_flood_fill(plain, *command, connectivity))
+                    else:
+                        apply(indexed, command)
+                        execute(plain, command)
+                    self.assertEqual(indexed.render(), plain.render())
+                    self.assert_components_are_exact(indexed, index)
+
+    def test_repeated_fills_of_a_region_are_repaints(self):
+        canvas, index = Canvas(20, 10), RegionIndex()
+        add_rectangle(canvas, get_coordinates_to_draw_rect_with_addline_function((3, 2, 12, 8)))
+        for color in 'oco':
+            self.assertEqual(index.fill(canvas, 5, 5, color), 8 * 5)
+        self.assertEqual((index.misses, index.hits), (1, 2))
+        self.assertEqual(canvas.get(4, 3), 'o')
+
+    def test_stroke_through_component_drops_it(self):
+        canvas, index = Canvas(10, 3), RegionIndex()
+        index.fill(canvas, 1, 1, 'o')
+        index.wrap_execute(execute)(canvas, Line(5, 1, 5, 3))
+        self.assertEqual(index.fill(canvas, 1, 1, 'c'), 12)
+        self.assertEqual(index.misses, 2)
+
+    def test_fill_merging_with_same_color_is_not_kept(self):
+        canvas, index = Canvas(5, 1), RegionIndex()
+        add_line(canvas, (3, 1, 3, 1))
+        index.fill(canvas, 1, 1, 'x', 4)
+        self.assertEqual(len(index.components), 0)
+
+    def test_misses_are_searched_by_the_given_flood_fill(self):
+        canvas, expected = Canvas(12, 6), Canvas(12, 6)
+        for target in (canvas, expected):
+            add_rectangle(target, get_coordinates_to_draw_rect_with_addline_function((3, 2, 9, 5)))
+        with ParallelFill(workers=2, min_cells=0) as parallel:
+            calls = []
+
+            def flood_fill(*arguments):
+                calls.append(arguments[1:])
+                return parallel.flood_fill(*arguments)
+
+            index = RegionIndex(flood_fill=flood_fill)
+            for color in 'oco':
+                index.fill(canvas, 5, 3, color)
+        for color in 'oco':
+            to_flood_fill(expected, 5, 3, color)
+        self.assertListEqual(calls, [(5, 3, 'o', 8)])
+        self.assertEqual(index.hits, 2)
+        self.assertEqual(canvas.render(), expected.render())
+
+    def test_undo_without_journal_is_reported(self):
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, 'input.txt')
+            with open(input_path, 'w') as file:
+                file.write('C 5 5\nL 1 1 3 1\nU\n')
+            errors = main(input_path, os.path.join(directory, 'output.txt'), region_index=True)
+        self.assertEqual([(error.line_number, str(error)) for error in errors],
+                         [(3, 'Undo and redo need the journal, run with --undo-steps.')])
+
+    def test_main_with_region_index_writes_same_output(self):
+        script = 'C 20 6\nR 2 2 12 5\nB 5 3 o\nB 5 3 c\nL 7 1 7 6\nB 5 3 o\nB 15 1 -\nB 5 3 x\nB 3 3 c\n'
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, 'input.txt')
+            with open(input_path, 'w') as file:
+                file.write(script)
+            for output_mode in ('full', 'diff', 'final'):
+                outputs = []
+                for region_index in (False, True):
+                    output_path = os.path.join(directory, f'{output_mode}-{region_index}.txt')
+                    main(input_path, output_path, output_mode, region_index=region_index)
+                    with open(output_path, 'rb') as file:
+                        outputs.append(file.read())
+                self.assertEqual(outputs[0], outputs[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
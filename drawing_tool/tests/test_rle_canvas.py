@@ -0,0 +1,54 @@
+import unittest
+from random import Random
+from canvas import Canvas
+from rle_canvas import RleCanvas
+from tests.test_fill import ScanlineFillTest
+
+
+class RleFillTest(ScanlineFillTest):
+    backend = 'rle'
+
+
+class RleCanvasTest(unittest.TestCase):
+
+    def setUp(self):
+        self.random = Random(2020)
+
+    def test_lines_are_interval_insertions_merging_equal_runs(self):
+        canvas = RleCanvas(100000, 2)
+        canvas.hline(10, 20, 1)
+        canvas.hline(21, 30, 1)
+        canvas.hline(5, 12, 1, ' ')
+        self.assertEqual(canvas.cells[0], ([0, 12, 30], [32, 120, 32]))
+        canvas.hline(1, 100000, 1)
+        self.assertEqual(canvas.cells[0], ([0], [120]))
+        self.assertEqual(canvas.runs(), 2)
+
+    def test_matches_contiguous_canvas_on_random_drawings(self):
+        for connectivity in (4, 8):
+            for _ in range(20):
+                width, height = self.random.randint(1, 30), self.random.randint(1, 30)
+                rle, plain = RleCanvas(width, height), Canvas(width, height)
+                for _ in range(15):
+                    cell_1, cell_2 = sorted(self.random.randint(1, width) for _ in range(2))
+                    row_1, row_2 = sorted(self.random.randint(1, height) for _ in range(2))
+                    color = self.random.choice('xo ')
+                    for canvas in (rle, plain):
+                        canvas.hline(cell_1, cell_2, row_1, color)
+                        canvas.vline(cell_2, row_1, row_2, color)
+                    cell_id, row_id = self.random.randint(1, width), self.random.randint(1, height)
+                    self.assertEqual(sorted(rle.flood_fill(cell_id, row_id, 'c', connectivity)),
+                                     sorted(plain.flood_fill(cell_id, row_id, 'c', connectivity)))
+                self.assertEqual(rle.render(), plain.render())
+                self.assertEqual(rle.region((1, 1, width, height)), plain.region((1, 1, width, height)))
+                self.assertEqual(rle.take_dirty(), plain.take_dirty())
+
+    def test_load_row_compresses_cells_into_runs(self):
+        canvas = RleCanvas(6, 1)
+        canvas.load_row(1, b'xx  oo')
+        self.assertEqual(canvas.cells[0], ([0, 2, 4], [120, 32, 111]))
+        self.assertEqual(canvas.row(1), b'xx  oo')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+import unittest
+from runner import Job, collect_jobs, report, run, run_batch
+
+
+class RunnerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.jobs = os.path.join(self.directory.name, 'jobs')
+        os.mkdir(self.jobs)
+        self.write('a.txt', 'C 4 2\nL 1 1 4 1\n')
+        self.write('b.txt', 'C 3 1\nB 1 1 o\nL 1 1 2 2\n')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name: str, text: str) -> str:
+        path = os.path.join(self.jobs, name)
+        with open(path, 'w') as file:
+            file.write(text)
+        return path
+
+    def read(self, path: str) -> str:
+        with open(path, 'r') as file:
+            return file.read()
+
+    def test_collect_jobs_of_directory_skips_outputs(self):
+        self.write('a.output.txt', '')
+        self.assertListEqual(collect_jobs(self.jobs), [
+            Job(os.path.join(self.jobs, 'a.txt'), os.path.join(self.jobs, 'a.output.txt')),
+            Job(os.path.join(self.jobs, 'b.txt'), os.path.join(self.jobs, 'b.output.txt')),
+        ])
+
+    def test_collect_jobs_of_manifest_resolves_relative_paths(self):
+        manifest = self.write('manifest', '# comment\na.txt first.out\n\nb.txt\n')
+        self.assertListEqual(collect_jobs(manifest, '/out'), [
+            Job(os.path.join(self.jobs, 'a.txt'), '/out/first.out'),
+            Job(os.path.join(self.jobs, 'b.txt'), '/out/b.output.txt'),
+        ])
+
+    def test_run_batch_draws_every_job_into_its_own_output(self):
+        for workers in (1, 2):
+            results = run_batch(collect_jobs(self.jobs), workers, output_mode='final')
+            self.assertEqual(self.read(results[0].output_path), '------\n|xxxx|\n|    |\n------\n')
+            self.assertEqual(self.read(results[1].output_path), '-----\n|ooo|\n-----\n')
+            self.assertListEqual(results[1].errors, ['line 3: Wrong Line instruction "L 1 1 2 2".'])
+
+    def test_missing_output_directory_fails_only_its_job(self):
+        jobs = collect_jobs(self.jobs)
+        jobs[0] = Job(jobs[0].input_path, os.path.join(self.directory.name, 'missing', 'a.out'))
+        results = run_batch(jobs)
+        self.assertIn('FileNotFoundError', results[0].failure)
+        self.assertIsNone(results[1].failure)
+        summary = report(results, 1.0)
+        self.assertEqual(summary['failed_jobs'], 1)
+        self.assertEqual(summary['instruction_errors'], 1)
+        self.assertEqual(summary['bytes_written'], results[1].bytes_written)
+
+    def test_run_writes_report(self):
+        path = os.path.join(self.directory.name, 'report.json')
+        output_dir = os.path.join(self.directory.name, 'out')
+        status = run([self.jobs, '--output-dir', output_dir, '--workers', '1', '--report', path])
+        self.assertEqual(status, 0)
+        with open(path) as file:
+            summary = json.load(file)
+        self.assertEqual(summary['jobs'], 2)
+        self.assertEqual(sorted(os.listdir(output_dir)), ['a.output.txt', 'b.output.txt'])
+
+
+if __name__ == '__main__':
+    unittest.main()
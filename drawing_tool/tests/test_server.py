@@ -0,0 +1,73 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from main import main
+from server import start_server
+
+SCRIPT = 'C 20 4\nL 1 2 6 2\nL 6 3 6 4\nQ 1\nR 14 1 18 3\nB 10 3 o\n'
+
+
+class ServerTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.executor = ThreadPoolExecutor(2)
+
+    async def asyncTearDown(self):
+        self.executor.shutdown()
+
+    async def session(self, server, script: str) -> bytes:
+        host, port = server.sockets[0].getsockname()[:2]
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(script.encode())
+        writer.write_eof()
+        answer = await reader.read()
+        writer.close()
+        return answer
+
+    def expected(self, output_mode: str) -> bytes:
+        with tempfile.TemporaryDirectory() as directory:
+            input_path, output_path = os.path.join(directory, 'input.txt'), os.path.join(directory, 'output.txt')
+            with open(input_path, 'w') as file:
+                file.write(SCRIPT)
+            main(input_path, output_path, output_mode)
+            with open(output_path, 'rb') as file:
+                return file.read()
+
+    async def test_session_answers_like_the_output_file(self):
+        for output_mode in ('full', 'diff', 'final'):
+            server = await start_server(executor=self.executor, output_mode=output_mode)
+            async with server:
+                answer = await self.session(server, SCRIPT)
+            self.assertEqual(answer.replace(b'ERROR! Wrong Command "Q 1".\n', b''), self.expected(output_mode))
+            self.assertIn(b'ERROR! Wrong Command "Q 1".\n', answer)
+
+    async def test_sessions_run_side_by_side_with_offloaded_fills(self):
+        server = await start_server(executor=self.executor, output_mode='final')
+        async with server:
+            big, small = await asyncio.gather(
+                self.session(server, 'C 400 400\nL 1 200 400 200\nB 1 1 o\n'),
+                self.session(server, 'C 2 1\nB 1 1 o\n'))
+        self.assertEqual(small, b'----\n|oo|\n----\n')
+        self.assertEqual(big.count(b'o'), 400 * 199)
+
+    async def test_session_undoes_and_redoes_commands(self):
+        server = await start_server(executor=self.executor, output_mode='final')
+        async with server:
+            self.assertEqual(await self.session(server, 'C 3 1\nL 1 1 2 1\nB 3 1 o\nU 2\nZ\n'),
+                             b'-----\n|xx |\n-----\n')
+        server = await start_server(executor=self.executor, output_mode='final', undo_steps=0)
+        async with server:
+            self.assertEqual(await self.session(server, 'C 3 1\nU\n'),
+                             b'ERROR! Undo and redo need the journal, run with --undo-steps.\n-----\n|   |\n-----\n')
+
+    async def test_invalid_or_too_large_canvas_closes_session(self):
+        server = await start_server(executor=self.executor, max_cells=100)
+        async with server:
+            self.assertEqual(await self.session(server, 'C 0 4\n'), b'ERROR! Invalid Canvas instruction\n')
+            self.assertEqual(await self.session(server, 'C 20 20\n'), b'ERROR! Canvas is larger than 100 cells.\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
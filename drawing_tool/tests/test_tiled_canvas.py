@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+from functools import partial
+from random import Random
+from canvas import Canvas
+from tiled_canvas import TiledCanvas
+from writer import FrameWriter
+from tests.test_fill import ScanlineFillTest
+
+
+class TiledFillTest(ScanlineFillTest):
+    """Runs the fill tests on 4 x 4 tiles, so fills cross many tile edges and corners."""
+
+    def setUp(self):
+        super().setUp()
+        self.Canvas = partial(TiledCanvas, tile_size=4)
+
+
+class TiledCanvasTest(unittest.TestCase):
+
+    def setUp(self):
+        self.random = Random(2020)
+
+    def test_tiles_are_allocated_only_when_drawn_on(self):
+        canvas = TiledCanvas(1000, 1000, tile_size=100)
+        self.assertEqual(canvas.allocated_tiles(), 0)
+        canvas.hline(150, 250, 5)
+        canvas.vline(999, 1, 150)
+        self.assertEqual(canvas.allocated_tiles(), 4)
+        self.assertEqual(canvas.get(201, 5), 'x')
+        self.assertEqual(canvas.get(999, 101), 'x')
+        self.assertEqual(canvas.get(1, 1), ' ')
+
+    def test_fill_of_untouched_tiles_does_not_allocate_them(self):
+        canvas = TiledCanvas(1000, 1000, tile_size=100)
+        canvas.hline(1, 1000, 500)
+        canvas.take_dirty()
+        spans = canvas.flood_fill(1, 1, 'o')
+        self.assertEqual(canvas.allocated_tiles(), 10)
+        self.assertEqual(sum(right - left + 1 for _, left, right in spans), 1000 * 499)
+        self.assertEqual(canvas.get(1000, 499), 'o')
+        self.assertEqual(canvas.get(1, 501), ' ')
+        self.assertEqual(canvas.take_dirty(), (1, 1, 1000, 499))
+
+    def test_matches_contiguous_canvas_with_ragged_edge_tiles(self):
+        for connectivity in (4, 8):
+            tiled, plain = TiledCanvas(23, 17, tile_size=5), Canvas(23, 17)
+            for _ in range(40):
+                cell_1, cell_2 = sorted(self.random.randint(1, 23) for _ in range(2))
+                row_1, row_2 = sorted(self.random.randint(1, 17) for _ in range(2))
+                for canvas in (tiled, plain):
+                    canvas.hline(cell_1, cell_2, row_1)
+                    canvas.vline(cell_1, row_1, row_2)
+            for _ in range(5):
+                cell_id, row_id = self.random.randint(1, 23), self.random.randint(1, 17)
+                color = self.random.choice('ox ')
+                tiled_spans = tiled.flood_fill(cell_id, row_id, color, connectivity)
+                plain_spans = plain.flood_fill(cell_id, row_id, color, connectivity)
+                self.assertEqual(sum(right - left + 1 for _, left, right in tiled_spans),
+                                 sum(right - left + 1 for _, left, right in plain_spans))
+                self.assertEqual(tiled.render(), plain.render())
+                self.assertEqual(tiled.region((3, 2, 20, 15)), plain.region((3, 2, 20, 15)))
+
+    def test_writer_streams_tiled_frames(self):
+        tiled, plain = TiledCanvas(30, 20, tile_size=8), Canvas(30, 20)
+        for canvas in (tiled, plain):
+            canvas.hline(3, 27, 9)
+            canvas.flood_fill(1, 1, 'o')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'output.txt')
+            with FrameWriter(path) as writer:
+                writer.write_frame(tiled)
+                self.assertEqual(writer.bytes_written, tiled.frame_size())
+            with open(path, 'rb') as file:
+                self.assertEqual(file.read(), plain.render())
+
+
+if __name__ == '__main__':
+    unittest.main()
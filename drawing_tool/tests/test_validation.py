@@ -6,6 +6,14 @@ from validation import (
     line_validator,
     rectangle_validator,
     flood_fill_validator,
+    parse_canvas,
+    parse_instruction,
+    CommandError,
+    Line,
+    Rectangle,
+    Fill,
+    FilledRectangle,
+    Diagonal,
 )
 
 
@@ -48,6 +56,13 @@ class CanvasValidationTest(unittest.TestCase):
     def test_canvas_instruction_validator_react_to_empty_string(self):
         self.assertRaises(IndexError, canvas_instruction_validator())
 
+    def test_canvas_instruction_validator_validates_given_header_without_reading_file(self):
+        m = mock_open()
+        with patch('builtins.open', m):
+            self.assertTupleEqual(canvas_instruction_validator('C 20 6\n'), (20, 6))
+            self.assertIsNone(canvas_instruction_validator('C 20\n'))
+        m.assert_not_called()
+
 
 class PreValidateInstructionTest(unittest.TestCase):
 
@@ -259,5 +274,45 @@ class FloodFillValidatorTest(unittest.TestCase):
         self.assertRaises(ValueError, flood_fill_validator(self.cleaned_data, parameters_2))
 
 
+class ParseInstructionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cleaned_data = 20, 6
+
+    def test_parse_canvas_returns_size(self):
+        self.assertTupleEqual(parse_canvas('C 20 6\n'), (20, 6))
+
+    def test_parse_canvas_raises_CommandError(self):
+        for header in ('', 'C 0 6', 'C 2', 'R 2 2', 'C ² 2'):
+            with self.assertRaises(CommandError):
+                parse_canvas(header)
+
+    def test_parse_instruction_returns_typed_commands(self):
+        self.assertEqual(parse_instruction(['L', '1', '2', '6', '2'], self.cleaned_data), Line(1, 2, 6, 2))
+        self.assertEqual(parse_instruction(['R', '14', '1', '18', '3'], self.cleaned_data), Rectangle(14, 1, 18, 3))
+        self.assertEqual(parse_instruction(['B', '10', '3', 'o'], self.cleaned_data), Fill(10, 3, 'o'))
+        self.assertIsInstance(parse_instruction(['B', '10', '3', 'o'], self.cleaned_data), Fill)
+        self.assertEqual(parse_instruction(['F', '4', '5', '2', '1'], self.cleaned_data), FilledRectangle(4, 5, 2, 1))
+        self.assertEqual(parse_instruction(['D', '1', '1', '7', '3'], self.cleaned_data), Diagonal(1, 1, 7, 3))
+
+    def test_parse_instruction_raises_CommandError_with_message(self):
+        cases = (
+            ([], 'Empty instruction.'),
+            (['Q', '1', '1', '1'], 'Wrong Command "Q 1 1 1".'),
+            (['L', '1', '1', '2', '2'], 'Wrong Line instruction "L 1 1 2 2".'),
+            (['R', '1', '1', '21', '2'], 'Wrong Rectangle instruction "R 1 1 21 2".'),
+            (['B', '1', '1', 'oo'], 'Wrong Bucket instruction B 1 1 oo.'),
+            (['B', '1', '0', 'o'], 'Wrong Bucket instruction B 1 0 o.'),
+            (['F', '1', '1', '2', '7'], 'Wrong Filled Rectangle instruction "F 1 1 2 7".'),
+            (['D', '1', '1', '2'], 'Wrong Diagonal instruction "D 1 1 2".'),
+            (['U', '\u00b2'], 'Wrong Undo instruction "U \u00b2".'),
+            (['Z', '9' * 5000], f'Wrong Redo instruction "Z {"9" * 5000}".'),
+        )
+        for instruction, message in cases:
+            with self.assertRaises(CommandError) as context:
+                parse_instruction(instruction, self.cleaned_data)
+            self.assertEqual(str(context.exception), message)
+
+
 if __name__ == '__main__':
     unittest.main()
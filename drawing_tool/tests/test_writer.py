@@ -0,0 +1,136 @@
+import gzip
+import lzma
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from canvas import Canvas
+from rle_canvas import RleCanvas
+from writer import RECORD, BinaryFrameWriter, FrameWriter, open_writer, read_records
+
+
+class FrameWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'output.txt')
+        self.canvas = Canvas(4, 2)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def read(self) -> bytes:
+        with open(self.path, 'rb') as file:
+            return file.read()
+
+    def test_write_frame_writes_every_frame_with_border(self):
+        with FrameWriter(self.path) as writer:
+            writer.write_frame(self.canvas)
+            self.canvas.hline(1, 4, 2, 'o')
+            writer.write_frame(self.canvas)
+        self.assertEqual(self.read(), self.canvas.render().replace(b'oooo', b'    ') + self.canvas.render())
+
+    def test_write_diff_writes_changed_box(self):
+        self.canvas.vline(2, 1, 2)
+        with FrameWriter(self.path) as writer:
+            writer.write_diff(self.canvas, self.canvas.take_dirty())
+            writer.write_diff(self.canvas, self.canvas.take_dirty())
+        self.assertEqual(self.read(), b'@ 2 1 2 2\nx\nx\n@\n')
+
+    def test_flush_every_zero_keeps_frames_buffered_until_close(self):
+        writer = FrameWriter(self.path, flush_every=0)
+        writer.write_frame(self.canvas)
+        self.assertEqual(self.read(), b'')
+        writer.close()
+        self.assertEqual(self.read(), self.canvas.render())
+        self.assertEqual(writer.bytes_written, self.canvas.frame_size())
+
+    def test_flush_every_frame_makes_frame_visible_at_once(self):
+        with FrameWriter(self.path, flush_every=1) as writer:
+            writer.write_frame(self.canvas)
+            self.assertEqual(self.read(), self.canvas.render())
+
+
+class OutputFormatTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'output')
+        self.canvas = Canvas(5, 3)
+        self.canvas.hline(1, 3, 2)
+        self.canvas.flood_fill(5, 3, 'o')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def records(self) -> list:
+        with open(self.path, 'rb') as file:
+            return list(read_records(file))
+
+    def test_compressed_text_output_appends_streams(self):
+        for _ in range(2):
+            with open_writer(self.path, compression='gzip') as writer:
+                writer.write_frame(self.canvas)
+        with gzip.open(self.path) as file:
+            self.assertEqual(file.read(), self.canvas.render() * 2)
+
+    def test_compressed_binary_output(self):
+        with open_writer(self.path, output_format='rle', compression='xz') as writer:
+            writer.write_frame(self.canvas)
+        with lzma.open(self.path) as file:
+            self.assertEqual(list(read_records(file)), [(b'F', (1, 1, 5, 3), self.canvas.region((1, 1, 5, 3)))])
+
+    def test_binary_frames_decode_to_cells(self):
+        for encoding in ('raw', 'rle'):
+            for canvas in (self.canvas, RleCanvas(5, 3)):
+                with self.subTest(encoding=encoding, canvas=type(canvas).__name__):
+                    open(self.path, 'wb').close()
+                    with BinaryFrameWriter(self.path, encoding=encoding) as writer:
+                        writer.write_frame(canvas)
+                    self.assertEqual(self.records(), [(b'F', (1, 1, 5, 3), canvas.region((1, 1, 5, 3)))])
+
+    def test_binary_diffs_hold_changed_box(self):
+        self.canvas.take_dirty()
+        self.canvas.vline(4, 1, 3, 'z')
+        with BinaryFrameWriter(self.path, encoding='rle') as writer:
+            writer.write_diff(self.canvas, self.canvas.take_dirty())
+            writer.write_diff(self.canvas, self.canvas.take_dirty())
+        self.assertEqual(self.records(), [(b'D', (4, 1, 4, 3), [b'z', b'z', b'z']), (b'D', None, [])])
+
+    def test_record_length_over_4_gib(self):
+        header = RECORD.pack(b'F', 0, 1, 1, 70000, 70000, 70000 * 70000)
+        self.assertEqual(RECORD.unpack(header), (b'F', 0, 1, 1, 70000, 70000, 70000 * 70000))
+        self.assertGreater(70000 * 70000, 2 ** 32)
+
+    def test_records_render_one_band_at_a_time(self):
+        heights = []
+
+        class CountedCanvas(RleCanvas):
+            def region(self, box: tuple) -> list:
+                heights.append(box[3] - box[1] + 1)
+                return super().region(box)
+
+        canvas = CountedCanvas(5, 7)
+        canvas.vline(2, 1, 7, 'z')
+        canvas.hline(1, 5, 4, 'o')
+        for encoding in ('raw', 'rle'):
+            with self.subTest(encoding=encoding), patch('writer.BAND_ROWS', 2):
+                open(self.path, 'wb').close()
+                heights.clear()
+                with BinaryFrameWriter(self.path, encoding=encoding) as writer:
+                    writer.write_frame(canvas)
+                self.assertEqual(max(heights), 2)
+                self.assertEqual(self.records(), [(b'F', (1, 1, 5, 7), RleCanvas.region(canvas, (1, 1, 5, 7)))])
+
+    def test_rle_frame_is_smaller_than_raw(self):
+        canvas = Canvas(100, 100)
+        for encoding in ('raw', 'rle'):
+            with BinaryFrameWriter(os.path.join(self.directory.name, encoding), encoding=encoding) as writer:
+                writer.write_frame(canvas)
+                if encoding == 'raw':
+                    raw_size = writer.bytes_written
+        self.assertLess(writer.bytes_written * 10, raw_size)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,297 @@
+from canvas import BLANK, STROKE, Canvas, clip_box
+from fill import CONNECTIVITIES, scanline_fill
+
+TILE_SIZE = 128
+
+
+class TiledCanvas(Canvas):
+    """Canvas split into square tiles which get their own storage only when drawn on.
+
+    A tile is either an int, the color of every cell of a tile nobody drew on yet, or a
+    bytearray of tile_size * tile_size cells. Tiles of the last column and row are stored
+    full size too, only their cells inside the canvas are used. Memory grows with the
+    number of tiles the lines cross instead of the canvas area, so very large sparse
+    canvases fit. Coordinates are 1-based like in Canvas.
+    """
+
+    __slots__ = ('tile_size', 'columns', 'rows')
+
+    STREAMED = True
+    FLAT = False
+
+    def __init__(self, width: int, height: int, tile_size: int = TILE_SIZE) -> None:
+        self.width = width
+        self.height = height
+        self.stride = tile_size
+        self.origin = 0
+        self.tile_size = tile_size
+        self.columns = -(-width // tile_size)
+        self.rows = -(-height // tile_size)
+        self.cells = [ord(BLANK)] * (self.columns * self.rows)
+        self.dirty = None
+
+    def allocated_tiles(self) -> int:
+        """Returns number of tiles which have their own storage."""
+        return sum(type(tile) is not int for tile in self.cells)
+
+    def tile_shape(self, tile_id: int) -> tuple:
+        """Returns number of used cells and rows of the tile."""
+        size = self.tile_size
+        tile_column, tile_row = tile_id % self.columns, tile_id // self.columns
+        return min(size, self.width - tile_column * size), min(size, self.height - tile_row * size)
+
+    def materialize(self, tile_id: int) -> bytearray:
+        """Returns cells of the tile, a uniform tile gets its own storage first."""
+        tile = self.cells[tile_id]
+        if type(tile) is int:
+            tile = self.cells[tile_id] = bytearray((tile,)) * (self.tile_size * self.tile_size)
+        return tile
+
+    def get(self, cell_id: int, row_id: int) -> str:
+        size = self.tile_size
+        tile = self.cells[(row_id - 1) // size * self.columns + (cell_id - 1) // size]
+        if type(tile) is int:
+            return chr(tile)
+        return chr(tile[(row_id - 1) % size * size + (cell_id - 1) % size])
+
+    def set(self, cell_id: int, row_id: int, color: str) -> None:
+        size = self.tile_size
+        tile_id = (row_id - 1) // size * self.columns + (cell_id - 1) // size
+        if self.cells[tile_id] != ord(color):
+            self.materialize(tile_id)[(row_id - 1) % size * size + (cell_id - 1) % size] = ord(color)
+        self.touch(cell_id, row_id, cell_id, row_id)
+
+    def hline(self, cell_1: int, cell_2: int, row_id: int, color: str = STROKE) -> None:
+        """Paints the row part of every tile the line crosses with one slice assignment."""
+        size, value = self.tile_size, ord(color)
+        first_tile = (row_id - 1) // size * self.columns
+        offset = (row_id - 1) % size * size
+        cell = cell_1 - 1
+        while cell < cell_2:
+            tile_column = cell // size
+            end = min(cell_2, (tile_column + 1) * size)
+            if self.cells[first_tile + tile_column] != value:
+                start = offset + cell - tile_column * size
+                self.materialize(first_tile + tile_column)[start:start + end - cell] = bytes((value,)) * (end - cell)
+            cell = end
+        self.touch(cell_1, row_id, cell_2, row_id)
+
+    def vline(self, cell_id: int, row_1: int, row_2: int, color: str = STROKE) -> None:
+        """Paints the column part of every tile the line crosses with one strided slice assignment."""
+        size, value = self.tile_size, ord(color)
+        tile_column, local_cell = (cell_id - 1) // size, (cell_id - 1) % size
+        row = row_1 - 1
+        while row < row_2:
+            tile_row = row // size
+            end = min(row_2, (tile_row + 1) * size)
+            tile_id = tile_row * self.columns + tile_column
+            if self.cells[tile_id] != value:
+                start = (row - tile_row * size) * size + local_cell
+                count = end - row
+                self.materialize(tile_id)[start:start + (count - 1) * size + 1:size] = bytes((value,)) * count
+            row = end
+        self.touch(cell_id, row_1, cell_id, row_2)
+
+    def fill_rect(self, left: int, top: int, right: int, bottom: int, color: str = STROKE) -> None:
+        """Makes tiles the box covers whole uniform and paints its rows inside the other tiles."""
+        box = clip_box((left, top, right, bottom), self.width, self.height)
+        if box is None:
+            return
+        size, value = self.tile_size, ord(color)
+        for tile_row in range((box[1] - 1) // size, (box[3] - 1) // size + 1):
+            for tile_column in range((box[0] - 1) // size, (box[2] - 1) // size + 1):
+                tile_id = tile_row * self.columns + tile_column
+                used_cells, used_rows = self.tile_shape(tile_id)
+                first_cell, first_row = max(box[0] - 1 - tile_column * size, 0), max(box[1] - 1 - tile_row * size, 0)
+                last_cell = min(box[2] - tile_column * size, used_cells)
+                last_row = min(box[3] - tile_row * size, used_rows)
+                if self.cells[tile_id] == value:
+                    continue
+                if (first_cell, first_row, last_cell, last_row) == (0, 0, used_cells, used_rows):
+                    self.cells[tile_id] = value
+                    continue
+                tile, cells = self.materialize(tile_id), bytes((value,)) * (last_cell - first_cell)
+                for row in range(first_row, last_row):
+                    tile[row * size + first_cell:row * size + last_cell] = cells
+        self.touch(*box)
+
+    def flood_fill(self, cell_id: int, row_id: int, color: str, connectivity: int = 8) -> list:
+        """Fills the area connected to the cell tile by tile, returns filled (row, left, right) spans.
+
+        A uniform tile of the target color is recolored as a whole without storage of its own,
+        other tiles are filled with scanline_fill. Filled cells on the edges of a tile become
+        seeds of the neighbouring tiles, which are processed until no new seeds appear.
+        """
+        if connectivity not in CONNECTIVITIES:
+            raise ValueError(f'Connectivity must be one of {CONNECTIVITIES}, got {connectivity}.')
+        target, value = ord(self.get(cell_id, row_id)), ord(color)
+        if target == value:
+            return []
+        size, columns = self.tile_size, self.columns
+        reach = 1 if connectivity == 8 else 0
+        start_tile = (row_id - 1) // size * columns + (cell_id - 1) // size
+        pending = {start_tile: {((cell_id - 1) % size, (row_id - 1) % size)}}
+        stack = [start_tile]
+        spans, whole_tiles = [], []
+
+        while stack:
+            tile_id = stack.pop()
+            seeds = pending.pop(tile_id)
+            tile = self.cells[tile_id]
+            tile_width, tile_height = self.tile_shape(tile_id)
+            tile_column, tile_row = tile_id % columns, tile_id // columns
+            if type(tile) is int:
+                if tile != target:
+                    continue
+                self.cells[tile_id] = value
+                whole_tiles.append(tile_id)
+                tile_spans = [(row, 0, tile_width - 1) for row in (0, tile_height - 1)]
+                left_rows = right_rows = range(tile_height)
+            else:
+                tile_spans = scanline_fill(tile, 0, size, tile_width, tile_height, list(seeds),
+                                           target, value, connectivity)
+                if not tile_spans:
+                    continue
+                cell_offset, row_offset = tile_column * size + 1, tile_row * size + 1
+                spans.extend((row + row_offset, left + cell_offset, right + cell_offset)
+                             for row, left, right in tile_spans)
+                left_rows = [row for row, left, _ in tile_spans if left == 0]
+                right_rows = [row for row, _, right in tile_spans if right == tile_width - 1]
+
+            last_row, last_column = tile_row == self.rows - 1, tile_column == columns - 1
+            seeds_of = {}
+            for row, left, right in tile_spans:
+                if row == 0 and tile_row > 0:
+                    seeds = self.seeds_of(seeds_of, tile_id - columns, target)
+                    if seeds is not None:
+                        seeds.update((cell, size - 1) for cell in
+                                     range(max(left - reach, 0), min(right + reach + 1, tile_width)))
+                if row == tile_height - 1 and not last_row:
+                    seeds = self.seeds_of(seeds_of, tile_id + columns, target)
+                    if seeds is not None:
+                        seeds.update((cell, 0) for cell in
+                                     range(max(left - reach, 0), min(right + reach + 1, tile_width)))
+                if reach:
+                    for step_y, edge in ((-1, 0), (1, tile_height - 1)):
+                        if row != edge or (tile_row == 0 if step_y < 0 else last_row):
+                            continue
+                        if left == 0 and tile_column > 0:
+                            seeds = self.seeds_of(seeds_of, tile_id + step_y * columns - 1, target)
+                            if seeds is not None:
+                                seeds.add((size - 1, 0 if step_y > 0 else size - 1))
+                        if right == tile_width - 1 and not last_column:
+                            seeds = self.seeds_of(seeds_of, tile_id + step_y * columns + 1, target)
+                            if seeds is not None:
+                                seeds.add((0, 0 if step_y > 0 else size - 1))
+            for rows, cell, step in ((left_rows, size - 1, -1), (right_rows, 0, 1)):
+                if not rows or not 0 <= tile_column + step < columns:
+                    continue
+                seeds = self.seeds_of(seeds_of, tile_id + step, target)
+                if seeds is not None:
+                    for row in rows:
+                        seeds.update((cell, seed_row) for seed_row in
+                                     range(max(row - reach, 0), min(row + reach + 1, tile_height)))
+            for neighbour, neighbour_seeds in seeds_of.items():
+                if neighbour in pending:
+                    pending[neighbour] |= neighbour_seeds
+                else:
+                    pending[neighbour] = neighbour_seeds
+                    stack.append(neighbour)
+
+        spans.extend(whole_tile_spans(self, whole_tiles))
+        if spans:
+            self.touch(min(left for _, left, _ in spans), min(row for row, _, _ in spans),
+                       max(right for _, _, right in spans), max(row for row, _, _ in spans))
+        return spans
+
+    def seeds_of(self, seeds_of: dict, tile_id: int, target: int):
+        """Returns seed set of a neighbouring tile the fill spreads to, None if it needs no seeds.
+
+        A uniform tile of the target color is filled as a whole, so it only has to be queued.
+        """
+        tile = self.cells[tile_id]
+        if type(tile) is int:
+            if tile == target:
+                seeds_of.setdefault(tile_id, set())
+            return None
+        return seeds_of.setdefault(tile_id, set())
+
+    def row(self, row_id: int) -> bytes:
+        return self.row_part(row_id, 1, self.width)
+
+    def row_part(self, row_id: int, left: int, right: int) -> bytes:
+        """Returns cells from left to right of the row joined from the tiles they lie on."""
+        size = self.tile_size
+        first_tile = (row_id - 1) // size * self.columns
+        offset = (row_id - 1) % size * size
+        parts = []
+        cell = left - 1
+        while cell < right:
+            tile_column = cell // size
+            end = min(right, (tile_column + 1) * size)
+            tile = self.cells[first_tile + tile_column]
+            if type(tile) is int:
+                parts.append(bytes((tile,)) * (end - cell))
+            else:
+                start = offset + cell - tile_column * size
+                parts.append(tile[start:start + end - cell])
+            cell = end
+        return b''.join(parts)
+
+    def load_row(self, row_id: int, cells: bytes) -> None:
+        """Replaces cells of the row, tiles the row part of which matches their color stay uniform."""
+        size = self.tile_size
+        first_tile = (row_id - 1) // size * self.columns
+        offset = (row_id - 1) % size * size
+        for tile_column in range(self.columns):
+            part = cells[tile_column * size:(tile_column + 1) * size]
+            tile = self.cells[first_tile + tile_column]
+            if type(tile) is int and part == bytes((tile,)) * len(part):
+                continue
+            self.materialize(first_tile + tile_column)[offset:offset + len(part)] = part
+
+    def region(self, box: tuple) -> list:
+        left, top, right, bottom = box
+        return [self.row_part(row_id, left, right) for row_id in range(top, bottom + 1)]
+
+    def render_into(self, frame: bytearray) -> None:
+        line, width = self.width + 3, self.width
+        position = line + 1
+        for row_id in range(1, self.height + 1):
+            frame[position:position + width] = self.row(row_id)
+            position += line
+
+    def frame_chunks(self):
+        """Yields the rendered canvas one band of tile rows at a time, the border included."""
+        border = b'-' * (self.width + 2) + b'\n'
+        yield border
+        for first_row in range(1, self.height + 1, self.tile_size):
+            last_row = min(first_row + self.tile_size, self.height + 1)
+            yield b''.join(b'|' + self.row(row_id) + b'|\n' for row_id in range(first_row, last_row))
+        yield border
+
+
+def whole_tile_spans(canvas: TiledCanvas, tile_ids: list) -> list:
+    """Returns 1-based spans of tiles recolored as a whole, neighbouring tiles of a row share spans."""
+    spans = []
+    size, columns = canvas.tile_size, canvas.columns
+    for tile_row, tile_column, last_column in tile_runs(sorted(tile_ids), columns):
+        first_row = tile_row * size + 1
+        last_row = min(first_row + size - 1, canvas.height)
+        left, right = tile_column * size + 1, min((last_column + 1) * size, canvas.width)
+        spans.extend((row_id, left, right) for row_id in range(first_row, last_row + 1))
+    return spans
+
+
+def tile_runs(tile_ids: list, columns: int):
+    """Yields (tile_row, first_column, last_column) of runs of consecutive sorted tile ids in a tile row."""
+    if not tile_ids:
+        return
+    first = last = tile_ids[0]
+    for tile_id in tile_ids[1:]:
+        if tile_id == last + 1 and tile_id % columns:
+            last = tile_id
+            continue
+        yield first // columns, first % columns, last % columns
+        first = last = tile_id
+    yield first // columns, first % columns, last % columns
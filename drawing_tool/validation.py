@@ -1,30 +1,161 @@
-from typing import Optional
+from collections import namedtuple
+from typing import Optional, Union
 
+Line = namedtuple('Line', 'cell_1 row_1 cell_2 row_2')
+Rectangle = namedtuple('Rectangle', 'cell_1 row_1 cell_2 row_2')
+Fill = namedtuple('Fill', 'cell_id row_id color')
+FilledRectangle = namedtuple('FilledRectangle', 'cell_1 row_1 cell_2 row_2')
+Diagonal = namedtuple('Diagonal', 'cell_1 row_1 cell_2 row_2')
+Undo = namedtuple('Undo', 'steps')
+Redo = namedtuple('Redo', 'steps')
+Command = Union[Line, Rectangle, Fill, FilledRectangle, Diagonal, Undo, Redo]
 
-def canvas_instruction_validator() -> Optional[tuple]:
+
+class CommandError(ValueError):
+    """Instruction which can not be executed, line_number is set by the caller who read it."""
+
+    def __init__(self, message: str, line_number: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.message = message
+        self.line_number = line_number
+
+
+def parse_canvas(header: str) -> tuple:
+    line = header.split()
+    if not line:
+        raise CommandError('Canvas instruction does not exist.')
+    if line[0] == 'C' and len(line) == 3 and line[1].isdigit() and line[2].isdigit():
+        try:
+            width, height = int(line[1]), int(line[2])
+        except ValueError:
+            pass
+        else:
+            if width and height:
+                return width, height
+    raise CommandError('Invalid Canvas instruction')
+
+
+def parse_instruction(instruction: list, cleaned_data: tuple) -> Command:
+    """Validates the split instruction once and returns it as a command with int coordinates."""
+    if not instruction:
+        raise CommandError('Empty instruction.')
+    parser = PARSERS.get(instruction[0])
+    if parser is None or len(instruction) not in WORD_COUNTS[instruction[0]]:
+        raise CommandError(f'Wrong Command "{" ".join(instruction)}".')
+    return parser(cleaned_data, instruction[1:])
+
+
+def to_coordinates(cleaned_data: tuple, parameters: list) -> Optional[list]:
+    """Returns parameters as ints if all of them are cell_id, row_id pairs inside the canvas."""
+    width, height = cleaned_data
+    if not all(parameter.isdigit() for parameter in parameters):
+        return None
     try:
-        with open('input.txt', 'r') as file:
-            line = file.readline().split()
-            if line[0] == 'C' and len(line) == 3:
-                if line[1].isdigit() and line[2].isdigit() and int(line[1]) and int(line[2]):
-                    return int(line[1]), int(line[2])
-                else:
-                    raise ValueError
-            else:
-                raise ValueError
-    except IndexError:
-        print('ERROR! Canvas instruction does not exist.')
+        coordinates = [int(parameter) for parameter in parameters]
+    except ValueError:
+        return None
+    for cell_id, row_id in zip(coordinates[::2], coordinates[1::2]):
+        if not (0 < cell_id <= width and 0 < row_id <= height):
+            return None
+    return coordinates
+
+
+def parse_line(cleaned_data: tuple, parameters: list) -> Line:
+    coordinates = to_coordinates(cleaned_data, parameters) if len(parameters) == 4 else None
+    if coordinates is None or (coordinates[0] != coordinates[2] and coordinates[1] != coordinates[3]):
+        raise CommandError(f'Wrong Line instruction "L {" ".join(parameters)}".')
+    return Line(*coordinates)
+
+
+def parse_rectangle(cleaned_data: tuple, parameters: list) -> Rectangle:
+    coordinates = to_coordinates(cleaned_data, parameters) if len(parameters) == 4 else None
+    if coordinates is None:
+        raise CommandError(f'Wrong Rectangle instruction "R {" ".join(parameters)}".')
+    return Rectangle(*coordinates)
+
+
+def parse_fill(cleaned_data: tuple, parameters: list) -> Fill:
+    coordinates = to_coordinates(cleaned_data, parameters[:2]) if len(parameters) == 3 else None
+    color = parameters[-1]
+    if coordinates is None or len(color) != 1 or not color.isascii():
+        raise CommandError(f'Wrong Bucket instruction B {" ".join(parameters)}.')
+    return Fill(coordinates[0], coordinates[1], color)
+
+
+def parse_filled_rectangle(cleaned_data: tuple, parameters: list) -> FilledRectangle:
+    coordinates = to_coordinates(cleaned_data, parameters) if len(parameters) == 4 else None
+    if coordinates is None:
+        raise CommandError(f'Wrong Filled Rectangle instruction "F {" ".join(parameters)}".')
+    return FilledRectangle(*coordinates)
+
+
+def parse_diagonal(cleaned_data: tuple, parameters: list) -> Diagonal:
+    """Any two cells make a line, it does not have to be horizontal or vertical."""
+    coordinates = to_coordinates(cleaned_data, parameters) if len(parameters) == 4 else None
+    if coordinates is None:
+        raise CommandError(f'Wrong Diagonal instruction "D {" ".join(parameters)}".')
+    return Diagonal(*coordinates)
+
+
+def parse_steps(name: str, letter: str, parameters: list) -> int:
+    """Returns the optional positive number of steps of an undo or redo, 1 by default."""
+    if not parameters:
+        return 1
+    try:
+        steps = int(parameters[0]) if parameters[0].isdigit() else 0
+    except ValueError:
+        steps = 0
+    if not steps:
+        raise CommandError(f'Wrong {name} instruction "{letter} {parameters[0]}".')
+    return steps
+
+
+def parse_undo(cleaned_data: tuple, parameters: list) -> Undo:
+    return Undo(parse_steps('Undo', 'U', parameters))
+
+
+def parse_redo(cleaned_data: tuple, parameters: list) -> Redo:
+    return Redo(parse_steps('Redo', 'Z', parameters))
+
+
+PARSERS = {
+    'L': parse_line,
+    'R': parse_rectangle,
+    'B': parse_fill,
+    'F': parse_filled_rectangle,
+    'D': parse_diagonal,
+    'U': parse_undo,
+    'Z': parse_redo,
+}
+# Numbers of words an instruction may have, the command letter included, the rest is checked by its parser.
+WORD_COUNTS = {
+    'L': range(4, 6),
+    'R': range(4, 6),
+    'B': range(4, 6),
+    'F': range(4, 6),
+    'D': range(4, 6),
+    'U': range(1, 3),
+    'Z': range(1, 3),
+}
+
+
+def canvas_instruction_validator(header: Optional[str] = None) -> Optional[tuple]:
+    try:
+        if header is None:
+            with open('input.txt', 'r') as file:
+                header = file.readline()
+        return parse_canvas(header)
     except FileNotFoundError:
         print('ERROR! No such file or directory: "input.txt"')
-    except ValueError:
-        print('ERROR! Invalid Canvas instruction')
+    except CommandError as error:
+        print(f'ERROR! {error}')
     except:
         print('ERROR!')
 
 
 def pre_validate_instruction(instruction: list) -> Optional[tuple]:
     try:
-        if instruction[0] in ('B', 'L', 'R') and 3 < len(instruction) < 6:
+        if instruction[0] in PARSERS and len(instruction) in WORD_COUNTS[instruction[0]]:
             return instruction[0], instruction[1:]
         else:
             raise ValueError
@@ -37,55 +168,20 @@ def pre_validate_instruction(instruction: list) -> Optional[tuple]:
 
 def line_validator(cleaned_data: tuple, parameters: list) -> Optional[list]:
     try:
-        width, height = cleaned_data
-        if len(parameters) == 4:
-            if parameters[0].isdigit() and parameters[1].isdigit() and \
-                    parameters[2].isdigit() and parameters[3].isdigit():
-                if 0 < int(parameters[0]) <= width and 0 < int(parameters[1]) <= height and \
-                        0 < int(parameters[2]) <= width and 0 < int(parameters[3]) <= height:
-                    if parameters[0] == parameters[2] or parameters[1] == parameters[3]:
-                        return [int(parameter) for parameter in parameters]
-                    else:
-                        raise ValueError
-                else:
-                    raise ValueError
-            else:
-                raise ValueError
-        else:
-            raise ValueError
-    except:
-        print(f'ERROR! Wrong Line instruction "L {" ".join(parameters)}".')
+        return list(parse_line(cleaned_data, parameters))
+    except CommandError as error:
+        print(f'ERROR! {error}')
 
 
 def rectangle_validator(cleaned_data: tuple, parameters: list) -> Optional[list]:
     try:
-        width, height = cleaned_data
-        if len(parameters) == 4:
-            if parameters[0].isdigit() and parameters[1].isdigit() and \
-                    parameters[2].isdigit() and parameters[3].isdigit():
-                if 0 < int(parameters[0]) <= width and 0 < int(parameters[1]) <= height and \
-                        0 < int(parameters[2]) <= width and 0 < int(parameters[3]) <= height:
-                    return [int(parameter) for parameter in parameters]
-                else:
-                    raise ValueError
-            else:
-                raise ValueError
-        else:
-            raise ValueError
-    except ValueError:
-        print(f'ERROR! Wrong Rectangle instruction "R {" ".join(parameters)}".')
+        return list(parse_rectangle(cleaned_data, parameters))
+    except CommandError as error:
+        print(f'ERROR! {error}')
 
 
 def flood_fill_validator(cleaned_data: tuple, parameters: list) -> Optional[tuple]:
     try:
-        width, height = cleaned_data
-        if len(parameters) == 3:
-            if parameters[0].isdigit() and parameters[1].isdigit() and \
-                    0 < int(parameters[0]) <= width and 0 < int(parameters[1]) <= height and parameters[2]:
-                return int(parameters[0]), int(parameters[1]), parameters[2]
-            else:
-                raise ValueError
-        else:
-            raise ValueError
-    except ValueError:
-        print(f'ERROR! Wrong Bucket instruction B {" ".join(parameters)}.')
+        return tuple(parse_fill(cleaned_data, parameters))
+    except CommandError as error:
+        print(f'ERROR! {error}')
@@ -0,0 +1,169 @@
+import struct
+from importlib import import_module
+from typing import BinaryIO, Iterator, Optional
+
+from canvas import Canvas
+from rle_canvas import RUNS
+
+OUTPUT_FORMATS = ('text', 'raw', 'rle')
+# Modules of the compressions, imported only when one is used. Every compressed file appended
+# to starts a new stream, the tools read them all one after another.
+COMPRESSIONS = {'gzip': 'gzip', 'bz2': 'bz2', 'xz': 'lzma'}
+# kind (b'F' frame, b'D' diff), encoding (0 raw, 1 rle), left, top, right, bottom, payload length
+# in bytes, 64-bit as a raw frame of a large canvas is over 4 GiB. A diff which changed nothing has
+# a zero box and no payload.
+RECORD = struct.Struct('<cB2xIIIIQ')
+RUN = struct.Struct('<IB')
+# Rows of a raw frame written with one call.
+BAND_ROWS = 256
+
+
+class FrameWriter:
+    """Writes frames of the canvas into one file kept open for the whole run.
+
+    Every frame is rendered into one reused buffer and written with a single call.
+    The file is flushed after every flush_every frames, 0 means only when it is closed.
+    An already opened binary file can be given instead of the path.
+    """
+
+    def __init__(self, path: str = 'output.txt', flush_every: int = 1, file: Optional[BinaryIO] = None) -> None:
+        self.path = path
+        self.flush_every = flush_every
+        self.file = open(path, 'ab') if file is None else file
+        self.frame = None
+        self.frames = 0
+        self.bytes_written = 0
+
+    def __enter__(self) -> 'FrameWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def write_frame(self, canvas: Canvas) -> None:
+        """Writes the whole canvas including the border.
+
+        A streamed canvas is written part by part as it renders, without a frame buffer.
+        """
+        if canvas.STREAMED:
+            for chunk in canvas.frame_chunks():
+                self.file.write(chunk)
+                self.bytes_written += len(chunk)
+            self.count_frame()
+            return
+        if self.frame is None or len(self.frame) != canvas.frame_size():
+            self.frame = bytearray(canvas.render())
+        else:
+            canvas.render_into(self.frame)
+        self.write(self.frame)
+
+    def write_diff(self, canvas: Canvas, box: Optional[tuple]) -> None:
+        """Writes the changed box in the format of functions.draw_diff_into_output."""
+        if box is None:
+            self.write(b'@\n')
+        else:
+            rows = canvas.region(box)
+            rows.append(b'')
+            self.write(b'@ %d %d %d %d\n' % box + b'\n'.join(rows))
+
+    def write(self, data) -> None:
+        self.file.write(data)
+        self.bytes_written += len(data)
+        self.count_frame()
+
+    def count_frame(self) -> None:
+        self.frames += 1
+        if self.flush_every and self.frames % self.flush_every == 0:
+            self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class BinaryFrameWriter(FrameWriter):
+    """Writes frames and diffs as RECORD headers followed by the cells of their box without a border.
+
+    Cells are written row by row either raw, one byte each, or run-length encoded as RUN
+    pairs of run length and color, every row of the box starting new runs. Records are
+    written in bands of BAND_ROWS rows, a raw whole canvas stored without gaps in one call.
+    The runs of an rle record are counted band by band before they are written, so no more
+    than a band is ever rendered at once.
+    """
+
+    def __init__(self, path: str = 'output.bin', flush_every: int = 1, file: Optional[BinaryIO] = None,
+                 encoding: str = 'raw') -> None:
+        super().__init__(path, flush_every, file)
+        self.rle = encoding == 'rle'
+
+    def write_frame(self, canvas: Canvas) -> None:
+        self.write_record(b'F', canvas, (1, 1, canvas.width, canvas.height))
+
+    def write_diff(self, canvas: Canvas, box: Optional[tuple]) -> None:
+        if box is None:
+            self.write(RECORD.pack(b'D', self.rle, 0, 0, 0, 0, 0))
+        else:
+            self.write_record(b'D', canvas, box)
+
+    def write_record(self, kind: bytes, canvas: Canvas, box: tuple) -> None:
+        left, top, right, bottom = box
+        if self.rle:
+            runs = sum(len(RUNS.findall(row)) for band in bands(box) for row in canvas.region(band))
+            self.file.write(RECORD.pack(kind, 1, *box, runs * RUN.size))
+            self.bytes_written += RECORD.size
+            for band in bands(box):
+                for row in canvas.region(band):
+                    payload = b''.join([RUN.pack(run.end() - run.start(), run.group()[0])
+                                        for run in RUNS.finditer(row)])
+                    self.file.write(payload)
+                    self.bytes_written += len(payload)
+            self.count_frame()
+            return
+        self.file.write(RECORD.pack(kind, 0, *box, (right - left + 1) * (bottom - top + 1)))
+        self.bytes_written += RECORD.size
+        if type(canvas.cells) is bytearray and canvas.stride == canvas.width and box == (1, 1, canvas.width,
+                                                                                          canvas.height):
+            self.file.write(canvas.cells)
+            self.bytes_written += len(canvas.cells)
+        else:
+            for band in bands(box):
+                rows = b''.join(canvas.region(band))
+                self.file.write(rows)
+                self.bytes_written += len(rows)
+        self.count_frame()
+
+
+def bands(box: tuple) -> Iterator[tuple]:
+    """Yields boxes of up to BAND_ROWS rows which together make the box."""
+    left, top, right, bottom = box
+    for first_row in range(top, bottom + 1, BAND_ROWS):
+        yield left, first_row, right, min(first_row + BAND_ROWS - 1, bottom)
+
+
+def open_writer(path: str = 'output.txt', flush_every: int = 1, output_format: str = 'text',
+                compression: Optional[str] = None) -> FrameWriter:
+    """Returns the writer of the output format appending to the file, compressed if asked."""
+    file = import_module(COMPRESSIONS[compression]).open(path, 'ab') if compression else None
+    if output_format == 'text':
+        return FrameWriter(path, flush_every, file)
+    return BinaryFrameWriter(path, flush_every, file, output_format)
+
+
+def read_records(file: BinaryIO) -> Iterator[tuple]:
+    """Yields (kind, box, cells) of the records of a binary output file, cells of a box row by row.
+
+    The box of a diff which changed nothing is None.
+    """
+    while True:
+        header = file.read(RECORD.size)
+        if not header:
+            return
+        kind, encoding, left, top, right, bottom, length = RECORD.unpack(header)
+        payload = file.read(length)
+        if encoding:
+            payload = b''.join(bytes((color,)) * count for count, color in RUN.iter_unpack(payload))
+        if not left:
+            yield kind, None, []
+            continue
+        width = right - left + 1
+        yield kind, (left, top, right, bottom), [payload[start:start + width]
+                                                 for start in range(0, len(payload), width)]